@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status as fast_status, Query
+from fastapi.concurrency import run_in_threadpool
 from core.auth import get_current_user
 from core.db import DB
+from core.async_db import ADB
 from core.models.base import DATA_STATUS
 from core.models.article import Article,ArticleBase
 from sqlalchemy import and_, or_, desc
 from .base import success_response, error_response
 from core.config import cfg
 from apis.base import format_search_kw
-from core.print import print_warning, print_info, print_error, print_success
+from core.search import search_index
+from core.pagination import keyset_page
+import core.article_stats as article_stats
+from core.feed_cache import feed_cache
+from core.print import print_error, print_success
 router = APIRouter(prefix=f"/articles", tags=["文章管理"])
 
 
@@ -16,25 +22,30 @@ router = APIRouter(prefix=f"/articles", tags=["文章管理"])
 async def clean_orphan_articles(
     current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
-    try:
+    def clean(session):
         from core.models.feed import Feed
-        from core.models.article import Article
+        from core.models.article import Article, ArticleContent
         
         # 找出Articles表中mp_id不在Feeds表中的记录
         subquery = session.query(Feed.id).subquery()
-        deleted_count = session.query(Article)\
-            .filter(~Article.mp_id.in_(subquery))\
+        orphan_ids = [row[0] for row in session.query(Article.id).filter(~Article.mp_id.in_(subquery))]
+        with article_stats.track(session, orphan_ids):
+            deleted_count = session.query(Article)\
+                .filter(~Article.mp_id.in_(subquery))\
+                .delete(synchronize_session=False)
+        # 同时删除这些文章的正文
+        session.query(ArticleContent)\
+            .filter(~ArticleContent.article_id.in_(session.query(Article.id)))\
             .delete(synchronize_session=False)
-        
-        session.commit()
+        return deleted_count
+    try:
+        deleted_count = await run_in_threadpool(DB.write, clean)
         
         return success_response({
             "message": "清理无效文章成功",
             "deleted_count": deleted_count
         })
     except Exception as e:
-        session.rollback()
         print(f"清理无效文章错误: {str(e)}")
         raise HTTPException(
             status_code=fast_status.HTTP_201_CREATED,
@@ -50,7 +61,7 @@ async def clean_duplicate(
 ):
     try:
         from tools.clean import clean_duplicate_articles
-        (msg, deleted_count) =clean_duplicate_articles()
+        (msg, deleted_count) =await run_in_threadpool(clean_duplicate_articles)
         return success_response({
             "message": msg,
             "deleted_count": deleted_count
@@ -74,108 +85,97 @@ async def get_articles(
     search: str = Query(None),
     mp_id: str = Query(None),
     has_content:bool=Query(False),
+    cursor: str = Query(None, description="分页游标，传入上一页返回的next_cursor，传入后忽略offset"),
+    with_total: bool = Query(True, description="是否统计总数，翻页时可关闭以减少查询"),
     current_user: dict = Depends(get_current_user)
 ):
-    with DB.session_scope(auto_commit=False) as session:
-        try:
-            model = Article if has_content else ArticleBase
+    def _query(session):
+        model = Article if has_content else ArticleBase
 
-            # 构建查询条件
-            query = session.query(model)
+        # 构建查询条件
+        query = session.query(model)
+        if has_content:
+            # 正文保存在单独的表中，批量加载
+            query = query.options(*Article.load_content())
 
-            if status:
-                query = query.filter(model.status == status)
-            else:
-                query = query.filter(model.status != DATA_STATUS.DELETED)
+        if status:
+            query = query.filter(model.status == status)
+        else:
+            query = query.filter(model.status != DATA_STATUS.DELETED)
 
-            if mp_id:
-                query = query.filter(model.mp_id == mp_id)
+        if mp_id:
+            query = query.filter(model.mp_id == mp_id)
 
-            if search:
+        score = None
+        if search:
+            # 优先使用全文索引，不支持时按标题模糊查询
+            found = search_index.search(session, search)
+            if found is not None:
+                query = query.join(found, found.c.article_id == model.id)
+                score = found.c.score
+            else:
                 query = query.filter(format_search_kw(search, model=model))
 
-            # 获取总数
-            total = query.count()
-
-            query = (
-                query.order_by(model.created_at.desc())
-                .offset(offset)
-                .limit(limit)
-            )
-
-            # 分页查询（按发布时间降序）
-            articles = query.all()
+        # 获取总数，未搜索时从统计表读取，不执行COUNT
+        total = None
+        if with_total:
+            if not search:
+                total = article_stats.article_count(session, mp_id=mp_id, status=status)
+            if total is None:
+                total = query.count()
 
-            # 打印生成的 SQL 语句（包含分页参数）
-            print_warning(
-                query.statement.compile(compile_kwargs={"literal_binds": True})
-            )
+        # 分页查询（按创建时间降序），传入游标时从上一页最后一条之后查询，不使用OFFSET
+        if score is not None:
+            # 搜索结果按相关度排序
+            rows, next_cursor = keyset_page(query.add_columns(score), [score, model.id], cursor=cursor, limit=limit, offset=offset,
+                                            key=lambda row: (row[1], row[0].id))
+            articles = [row[0] for row in rows]
+        else:
+            articles, next_cursor = keyset_page(query, [model.created_at, model.id], cursor=cursor, limit=limit, offset=offset)
 
-            # 查询公众号名称
-            from core.models.feed import Feed
+        # 公众号名称从缓存读取，未命中的一次查询加载
+        feeds = feed_cache.get_many([article.mp_id for article in articles], session=session)
 
-            mp_names = {}
-            for article in articles:
-                if article.mp_id and article.mp_id not in mp_names:
-                    feed = (
-                        session.query(Feed)
-                        .filter(Feed.id == article.mp_id)
-                        .first()
-                    )
-                    mp_names[article.mp_id] = feed.mp_name if feed else "未知公众号"
+        # 查询哪些文章已有简报（批量查询，提高性能）
+        from core.models.brief import Brief
+        article_ids = [article.id for article in articles]
+        brief_article_keys = set()
+        if article_ids:  # 避免空列表查询
+            briefs = session.query(Brief.article_key).filter(
+                Brief.article_key.in_(article_ids)
+            ).all()
+            brief_article_keys = {str(brief[0]) for brief in briefs}
 
-            # 查询哪些文章已有简报（批量查询，提高性能）
-            from core.models.brief import Brief
-            article_ids = [article.id for article in articles]
-            brief_article_keys = set()
-            if article_ids:  # 避免空列表查询
-                briefs = session.query(Brief.article_key).filter(
-                    Brief.article_key.in_(article_ids)
-                ).all()
-                brief_article_keys = {brief[0] for brief in briefs}
-                # 调试日志：打印查询到的简报数量
-                print_info(f"文章列表查询：共{len(article_ids)}篇文章，其中{len(brief_article_keys)}篇有简报")
-                # 打印所有brief的article_key（用于调试）
-                if brief_article_keys:
-                    print_info(f"数据库中的brief.article_key列表: {list(brief_article_keys)[:5]}...")  # 只打印前5个
-                # 打印所有article.id（用于调试）
-                print_info(f"查询的文章ID列表: {article_ids[:5]}...")  # 只打印前5个
-            
-            # 合并公众号名称和简报状态到文章列表
-            article_list = []
-            for article in articles:
+        # 合并公众号名称和简报状态到文章列表
+        article_list = []
+        for article in articles:
+            if has_content:
+                article_dict = article.to_dict()
+            else:
                 article_dict = dict(article.__dict__)
                 article_dict.pop("_sa_instance_state", None)
-                article_dict["mp_name"] = mp_names.get(article.mp_id, "未知公众号")
-                # 确保类型一致，都转换为字符串进行比较
-                article_id_str = str(article.id)
-                brief_keys_str = {str(key) for key in brief_article_keys}
-                has_brief = article_id_str in brief_keys_str
-                article_dict["has_brief"] = bool(has_brief)  # 显式转换为布尔值
-                # 调试日志：打印匹配情况
-                if has_brief:
-                    print_info(f"✓ 文章 {article_id_str[:50]} 有简报 (article.id={article_id_str}, type={type(article.id).__name__})")
-                else:
-                    # 检查是否有类似的article_key（可能是格式问题）
-                    matching_keys = [key for key in brief_keys_str if article_id_str in key or key in article_id_str]
-                    if matching_keys:
-                        print_warning(f"⚠ 文章 {article_id_str[:50]} 没有匹配的简报，但发现相似的article_key: {matching_keys}")
-                article_list.append(article_dict)
-
-            from .base import success_response
+            article_dict["mp_name"] = feeds.get(article.mp_id, {}).get("mp_name") or "未知公众号"
+            article_dict["has_brief"] = str(article.id) in brief_article_keys
+            article_list.append(article_dict)
+        return {"list": article_list, "total": total, "next_cursor": next_cursor}
 
-            return success_response({"list": article_list, "total": total})
-        except HTTPException as e:
-            session.rollback()
-            raise e
-        except Exception as e:
-            session.rollback()
-            raise HTTPException(
-                status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
-                detail=error_response(
-                    code=50001, message=f"获取文章列表失败: {str(e)}"
-                ),
-            )
+    try:
+        # 在异步会话中查询，慢查询不阻塞事件循环
+        return success_response(await ADB.run(_query))
+    except HTTPException as e:
+        raise e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=fast_status.HTTP_400_BAD_REQUEST,
+            detail=error_response(code=40001, message=str(e)),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
+            detail=error_response(
+                code=50001, message=f"获取文章列表失败: {str(e)}"
+            ),
+        )
 
 @router.get("/{article_id}", summary="获取文章详情")
 async def get_article_detail(
@@ -184,56 +184,57 @@ async def get_article_detail(
     include_brief: bool = Query(False, description="是否包含AI简报"),
     # current_user: dict = Depends(get_current_user)
 ):
-    # 使用上下文管理器确保 session 被正确清理（只读操作，不需要 commit）
-    with DB.session_scope(auto_commit=False) as session:
-        try:
-            article = session.query(Article).filter(Article.id==article_id).filter(Article.status != DATA_STATUS.DELETED).first()
-            if not article:
-                from .base import error_response
-                raise HTTPException(
-                    status_code=fast_status.HTTP_404_NOT_FOUND,
-                    detail=error_response(
-                        code=40401,
-                        message="文章不存在"
-                    )
-                )
-            
-            result = dict(article.__dict__)
-            result.pop("_sa_instance_state", None)
-            
-            # 如果需要包含简报
-            if include_brief:
-                from core.models.brief import Brief
-                brief = session.query(Brief).filter(Brief.article_key == article_id).first()
-                if brief:
-                    result['brief'] = brief.to_dict()
-                else:
-                    result['brief'] = None
-            
-            return success_response(result)
-        except HTTPException as e:
-            raise e
-        except Exception as e:
-            raise HTTPException(
-                status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
-                detail=error_response(
-                    code=50001,
-                    message=f"获取文章详情失败: {str(e)}"
-                )
-            )   
+    def _query(session):
+        article = session.query(Article).filter(Article.id==article_id).filter(Article.status != DATA_STATUS.DELETED).first()
+        if not article:
+            return None
+        result = article.to_dict()
+
+        # 如果需要包含简报
+        if include_brief:
+            from core.models.brief import Brief
+            brief = session.query(Brief).filter(Brief.article_key == article_id).first()
+            result['brief'] = brief.to_dict() if brief else None
+        return result
+
+    try:
+        result = await ADB.run(_query)
+    except Exception as e:
+        raise HTTPException(
+            status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
+            detail=error_response(
+                code=50001,
+                message=f"获取文章详情失败: {str(e)}"
+            )
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=fast_status.HTTP_404_NOT_FOUND,
+            detail=error_response(
+                code=40401,
+                message="文章不存在"
+            )
+        )
+    return success_response(result)
 
 @router.delete("/{article_id}", summary="删除文章")
 async def delete_article(
     article_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
-    try:
-        from core.models.article import Article
-        
-        # 检查文章是否存在
+    def delete(session):
         article = session.query(Article).filter(Article.id == article_id).first()
         if not article:
+            return False
+        # 逻辑删除文章（更新状态为deleted）
+        with article_stats.track(session, [article_id]):
+            article.status = DATA_STATUS.DELETED
+            if cfg.get("article.true_delete", False):
+                session.delete(article)
+        return True
+    try:
+        # 检查文章是否存在
+        if not await run_in_threadpool(DB.write, delete):
             raise HTTPException(
                 status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
                 detail=error_response(
@@ -241,15 +242,9 @@ async def delete_article(
                     message="文章不存在"
                 )
             )
-        # 逻辑删除文章（更新状态为deleted）
-        article.status = DATA_STATUS.DELETED
-        if cfg.get("article.true_delete", False):
-            session.delete(article)
-        session.commit()
         
         return success_response(None, message="文章已标记为删除")
     except Exception as e:
-        session.rollback()
         raise HTTPException(
             status_code=fast_status.HTTP_406_NOT_ACCEPTABLE,
             detail=error_response(
@@ -293,7 +288,7 @@ async def get_next_article(
                 )
             )
         
-        return success_response(next_article)
+        return success_response(next_article.to_dict())
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -340,7 +335,7 @@ async def get_prev_article(
                 )
             )
         
-        return success_response(prev_article)
+        return success_response(prev_article.to_dict())
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from core.models.config_management import ConfigManagement
-from core.db  import DB
+from core.db  import DB, detach
 from core.auth import get_current_user
 from .base import  success_response, error_response
 from core.config import cfg
@@ -60,9 +60,8 @@ def create_config(
     config_data: ConfigManagementCreate = Body(...),
     current_user: dict = Depends(get_current_user)
 ):
-    db=DB.get_session()
     """创建配置项"""
-    try:
+    def create(db):
         # 检查config_key是否已存在
         existing_config = db.query(ConfigManagement).filter(ConfigManagement.config_key == config_data.config_key).first()
         if existing_config:
@@ -74,11 +73,10 @@ def create_config(
             description=config_data.description
         )
         db.add(db_config)
-        db.commit()
-        db.refresh(db_config)
-        return success_response(data=db_config)
+        return detach(db, db_config)
+    try:
+        return success_response(data=DB.write(create))
     except Exception as e:
-        db.rollback()
         return error_response(code=500, message=str(e))
 
 @router.put("/{config_key}", summary="更新配置项")
@@ -87,9 +85,8 @@ def update_config(
     config_data: ConfigManagementCreate = Body(...),
     current_user: dict = Depends(get_current_user)
 ):
-    db=DB.get_session()
     """更新配置项"""
-    try:
+    def update(db):
         db_config = db.query(ConfigManagement).filter(ConfigManagement.config_key == config_key).first()
         if not db_config:
             raise HTTPException(status_code=404, detail="Config not found")
@@ -98,12 +95,10 @@ def update_config(
             db_config.config_value = config_data.config_value
         if config_data.description is not None:
             db_config.description = config_data.description
-        
-        db.commit()
-        db.refresh(db_config)
-        return success_response(data=db_config)
+        return detach(db, db_config)
+    try:
+        return success_response(data=DB.write(update))
     except Exception as e:
-        db.rollback()
         return error_response(code=500, message=str(e))
 
 @router.delete("/{config_key}",summary="删除配置项")
@@ -111,16 +106,15 @@ def delete_config(
     config_key: str,
     current_user: dict = Depends(get_current_user)
 ):
-    db=DB.get_session()
     """删除配置项"""
-    try:
+    def delete(db):
         db_config = db.query(ConfigManagement).filter(ConfigManagement.config_key == config_key).first()
         if not db_config:
             raise HTTPException(status_code=404, detail="Config not found")
         
         db.delete(db_config)
-        db.commit()
+    try:
+        DB.write(delete)
         return success_response(message="Config deleted successfully")
     except Exception as e:
-        db.rollback()
         return error_response(code=500, message=str(e))
\ No newline at end of file
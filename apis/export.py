@@ -2,8 +2,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, UploadFile, File,Request
 from fastapi.responses import FileResponse
 from starlette.background import BackgroundTask
+from fastapi.concurrency import run_in_threadpool
 from core.auth import get_current_user
 from core.db import DB
+import core.article_stats as article_stats
+from core.feed_cache import feed_cache
 from core.wx import search_Biz
 from .base import success_response, error_response
 from datetime import datetime
@@ -97,6 +100,8 @@ async def import_mps(
         imported = 0
         updated = 0
         skipped = 0
+        # 需要写入的记录，统一通过写入线程提交
+        changed = []
 
         for row in csv_reader:
             mp_id = row["id"]
@@ -110,11 +115,13 @@ async def import_mps(
             existing = session.query(Feed).filter(Feed.faker_id == faker_id).first()
 
             if existing:
-                # 更新现有记录
+                # 更新现有记录(从读取会话中移除，避免自动flush写库)
+                session.expunge(existing)
                 existing.mp_cover = mp_cover
                 existing.mp_intro = mp_intro
                 existing.status = status_val
                 existing.faker_id = faker_id
+                changed.append(existing)
                 updated += 1
             else:
                 # 创建新记录
@@ -131,10 +138,15 @@ async def import_mps(
                 if mp.id == None:
                     _mp_id=base64.b64decode(faker_id).decode("utf-8")
                     mp.id=f"MP_WXS_{_mp_id}"
-                session.add(mp)
+                changed.append(mp)
                 imported += 1
 
-        session.commit()
+        def save(write_session):
+            for item in changed:
+                write_session.merge(item)
+            article_stats.feeds_changed(write_session, imported)
+        await run_in_threadpool(DB.write, save)
+        feed_cache.invalidate()
 
         return success_response({
             "message": "导入公众号列表成功",
@@ -293,6 +305,8 @@ async def import_tags(
         imported = 0
         updated = 0
         skipped = 0
+        # 需要写入的记录，统一通过写入线程提交
+        changed = []
 
         for row in csv_reader:
             tag_id = row.get("id")
@@ -315,12 +329,15 @@ async def import_tags(
             mps_id_str = row.get("mps_id") or "[]"
 
             if existing_tag:
+                # 从读取会话中移除，避免自动flush写库
+                session.expunge(existing_tag)
                 existing_tag.name = tag_name
                 existing_tag.cover = cover
                 existing_tag.intro = intro
                 existing_tag.status = status_val
                 existing_tag.mps_id = mps_id_str
                 existing_tag.updated_at = datetime.now()
+                changed.append(existing_tag)
                 updated += 1
             else:
                 new_tag = Tags(
@@ -333,10 +350,13 @@ async def import_tags(
                     created_at=datetime.now(),
                     updated_at=datetime.now()
                 )
-                session.add(new_tag)
+                changed.append(new_tag)
                 imported += 1
 
-        session.commit()
+        def save(write_session):
+            for item in changed:
+                write_session.merge(item)
+        await run_in_threadpool(DB.write, save)
 
         return success_response({
             "message": "导入标签列表成功",
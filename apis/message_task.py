@@ -8,11 +8,12 @@ from typing import List, Optional
 from core.print import print_error, print_info
 # 2. 第三方库导入
 from fastapi import APIRouter, Depends, HTTPException, status,Body,Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 # 3. 本地应用/模块导入
 from core.auth import get_current_user
-from core.db import DB
+from core.db import DB, detach
 from core.models.message_task import MessageTask
 from .base import success_response, error_response
 
@@ -205,8 +206,7 @@ async def create_message_task(
         400: 请求数据验证失败
         500: 数据库操作异常
     """
-    db=DB.get_session()
-    try:
+    def create(db):
         db_task = MessageTask(
             id=str(uuid.uuid4()),
             message_template=task_data.message_template,
@@ -219,11 +219,10 @@ async def create_message_task(
             status=task_data.status if task_data.status is not None else 0
         )
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-        return success_response(data=db_task)
+        return detach(db, db_task)
+    try:
+        return success_response(data=await run_in_threadpool(DB.write, create))
     except Exception as e:
-        db.rollback()
         print_error(e)
         return error_response(code=500, message=str(e))
 
@@ -233,7 +232,6 @@ async def update_message_task(
     task_data: MessageTaskCreate = Body(...),
     current_user: dict = Depends(get_current_user)
 ):
-    db=DB.get_session()
     """
     更新消息任务
     
@@ -249,7 +247,7 @@ async def update_message_task(
         400: 请求数据验证失败
         500: 数据库操作异常
     """
-    try:
+    def update(db):
         db_task = db.query(MessageTask).filter(MessageTask.id == task_id).first()
         if not db_task:
             raise HTTPException(status_code=404, detail="Message task not found")
@@ -270,11 +268,10 @@ async def update_message_task(
             db_task.message_type = task_data.message_type
         if task_data.name is not None:
             db_task.name = task_data.name
-        db.commit()
-        db.refresh(db_task)
-        return success_response(data=db_task)
+        return detach(db, db_task)
+    try:
+        return success_response(data=await run_in_threadpool(DB.write, update))
     except Exception as e:
-        db.rollback()
         return error_response(code=500, message=str(e))
 @router.put("/job/fresh",summary="重载任务")
 async def fresh_message_task(
@@ -304,15 +301,14 @@ async def delete_message_task(
         404: 消息任务不存在
         500: 数据库操作异常
     """
-    db=DB.get_session()
-    try:
+    def delete(db):
         db_task = db.query(MessageTask).filter(MessageTask.id == task_id).first()
         if not db_task:
             raise HTTPException(status_code=404, detail="Message task not found")
         
         db.delete(db_task)
-        db.commit()
+    try:
+        await run_in_threadpool(DB.write, delete)
         return success_response(message="Message task deleted successfully")
     except Exception as e:
-        db.rollback()
         return error_response(code=500, message=str(e))
\ No newline at end of file
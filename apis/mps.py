@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from fastapi.background import BackgroundTasks
 from typing import Optional, List
 from core.auth import get_current_user
 from core.db import DB
+from core.async_db import ADB
+import core.article_stats as article_stats
+from core.feed_cache import feed_cache
 from core.wx import search_Biz
 from .base import success_response, error_response
 from datetime import datetime
@@ -55,23 +59,28 @@ async def get_mps(
     kw: str = Query(""),
     current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
-    try:
-        from core.models.feed import Feed
+    from core.models.feed import Feed
+    def _query(session):
         query = session.query(Feed)
         if kw:
             query = query.filter(Feed.mp_name.ilike(f"%{kw}%"))
-        total = query.count()
+        # 未搜索时从统计表读取公众号总数
+        total = article_stats.feed_count(session) if not kw else None
+        if total is None:
+            total = query.count()
         mps = query.order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
+        return total, [{
+            "id": mp.id,
+            "mp_name": mp.mp_name,
+            "mp_cover": mp.mp_cover,
+            "mp_intro": mp.mp_intro,
+            "status": mp.status,
+            "created_at": mp.created_at.isoformat()
+        } for mp in mps]
+    try:
+        total, mps = await ADB.run(_query)
         return success_response({
-            "list": [{
-                "id": mp.id,
-                "mp_name": mp.mp_name,
-                "mp_cover": mp.mp_cover,
-                "mp_intro": mp.mp_intro,
-                "status": mp.status,
-                "created_at": mp.created_at.isoformat()
-            } for mp in mps],
+            "list": mps,
             "page": {
                 "limit": limit,
                 "offset": offset,
@@ -120,7 +129,8 @@ async def update_mps(
         def UpArt(mp):
             from core.wx import WxGather
             wx=WxGather().Model()
-            wx.get_Articles(mp.faker_id,Mps_id=mp.id,Mps_title=mp.mp_name,CallBack=UpdateArticle,start_page=start_page,MaxPage=end_page)
+            # 手动指定页数时采集全部页(用于补采历史文章)
+            wx.get_Articles(mp.faker_id,Mps_id=mp.id,Mps_title=mp.mp_name,CallBack=UpdateArticle,start_page=start_page,MaxPage=end_page,Incremental=False)
             result=wx.articles
         import threading
         threading.Thread(target=UpArt,args=(mp,)).start()
@@ -216,17 +226,7 @@ async def add_mp(
         mpx_id = base64.b64decode(mp_id).decode("utf-8")
         local_avatar_path = f"{save_avatar_locally(avatar)}"
         
-        # 初始化变量
-        existing_feed = None
-        feed_id = None
-        feed_mp_name = None
-        feed_mp_cover = None
-        feed_mp_intro = None
-        feed_status = None
-        feed_created_at = None
-        is_new_feed = False
-        
-        with DB.session_scope(auto_commit=True) as session:
+        def save_feed(session):
             # 检查公众号是否已存在
             existing_feed = session.query(Feed).filter(Feed.faker_id == mp_id).first()
             
@@ -236,17 +236,11 @@ async def add_mp(
                 existing_feed.mp_cover = local_avatar_path
                 existing_feed.mp_intro = mp_intro
                 existing_feed.updated_at = now
-                # 在session关闭前保存所有需要的属性值
-                feed_id = existing_feed.id
-                feed_mp_name = existing_feed.mp_name
-                feed_mp_cover = existing_feed.mp_cover
-                feed_mp_intro = existing_feed.mp_intro
-                feed_status = existing_feed.status
-                feed_created_at = existing_feed.created_at
+                feed = existing_feed
                 is_new_feed = False
             else:
                 # 创建新的Feed记录
-                new_feed = Feed(
+                feed = Feed(
                     id=f"MP_WXS_{mpx_id}",
                     mp_name=mp_name,
                     mp_cover= local_avatar_path,
@@ -258,49 +252,49 @@ async def add_mp(
                     update_time=0,
                     sync_time=0,
                 )
-                session.add(new_feed)
-                # 在session关闭前保存所有需要的属性值
-                feed_id = new_feed.id
-                feed_mp_name = new_feed.mp_name
-                feed_mp_cover = new_feed.mp_cover
-                feed_mp_intro = new_feed.mp_intro
-                feed_status = new_feed.status
-                feed_created_at = new_feed.created_at
+                session.add(feed)
+                article_stats.feeds_changed(session, 1)
                 is_new_feed = True
+            # 在session关闭前保存所有需要的属性值
+            return feed.id, feed.mp_name, feed.mp_cover, feed.mp_intro, feed.status, feed.created_at, is_new_feed
+        
+        feed_id, feed_mp_name, feed_mp_cover, feed_mp_intro, feed_status, feed_created_at, is_new_feed = await run_in_threadpool(DB.write, save_feed)
         
         # 确保feed已创建
         if not feed_id:
             raise ValueError("创建或获取Feed失败")
+        feed_cache.invalidate(feed_id)
         
         # 如果提供了标签ID列表，更新相关标签的mps_id（在单独的session中处理）
         if tag_ids and isinstance(tag_ids, list) and len(tag_ids) > 0:
+            def add_to_tags(tag_session):
+                # 准备要添加的公众号信息（使用已保存的值）
+                mp_info = {
+                    "id": feed_id,
+                    "mp_name": feed_mp_name,
+                    "mp_cover": feed_mp_cover
+                }
+                
+                # 遍历所有选中的标签
+                for tag_id in tag_ids:
+                    tag = tag_session.query(TagsModel).filter(TagsModel.id == tag_id).first()
+                    if tag:
+                        # 解析现有的mps_id
+                        try:
+                            mps_list = json.loads(tag.mps_id) if tag.mps_id else []
+                        except:
+                            mps_list = []
+                        
+                        # 检查是否已存在该公众号
+                        mp_exists = any(mp.get("id") == feed_id for mp in mps_list)
+                        
+                        if not mp_exists:
+                            # 添加新公众号到标签
+                            mps_list.append(mp_info)
+                            tag.mps_id = json.dumps(mps_list, ensure_ascii=False)
+                            tag.updated_at = now
             try:
-                with DB.session_scope(auto_commit=True) as tag_session:
-                    # 准备要添加的公众号信息（使用已保存的值）
-                    mp_info = {
-                        "id": feed_id,
-                        "mp_name": feed_mp_name,
-                        "mp_cover": feed_mp_cover
-                    }
-                    
-                    # 遍历所有选中的标签
-                    for tag_id in tag_ids:
-                        tag = tag_session.query(TagsModel).filter(TagsModel.id == tag_id).first()
-                        if tag:
-                            # 解析现有的mps_id
-                            try:
-                                mps_list = json.loads(tag.mps_id) if tag.mps_id else []
-                            except:
-                                mps_list = []
-                            
-                            # 检查是否已存在该公众号
-                            mp_exists = any(mp.get("id") == feed_id for mp in mps_list)
-                            
-                            if not mp_exists:
-                                # 添加新公众号到标签
-                                mps_list.append(mp_info)
-                                tag.mps_id = json.dumps(mps_list, ensure_ascii=False)
-                                tag.updated_at = now
+                await run_in_threadpool(DB.write, add_to_tags)
             except Exception as tag_error:
                 # 标签更新失败不影响订阅号创建，只记录错误
                 from core.print import print_error
@@ -334,7 +328,8 @@ async def add_mp(
                             Mps_id=feed_id,
                             CallBack=UpdateArticle,
                             MaxPage=Max_page,
-                            Mps_title=mp_name
+                            Mps_title=mp_name,
+                            Incremental=False
                         )
                         article_count = wx.all_count() if hasattr(wx, 'all_count') else 0
                         print_info(f"抓取任务完成: 公众号 [{mp_name}], 共抓取 {article_count} 篇文章")
@@ -372,11 +367,16 @@ async def delete_mp(
     mp_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
-    try:
+    def delete(session):
         from core.models.feed import Feed
         mp = session.query(Feed).filter(Feed.id == mp_id).first()
         if not mp:
+            return False
+        session.delete(mp)
+        article_stats.feeds_changed(session, -1)
+        return True
+    try:
+        if not await run_in_threadpool(DB.write, delete):
             raise HTTPException(
                 status_code=status.HTTP_201_CREATED,
                 detail=error_response(
@@ -385,14 +385,12 @@ async def delete_mp(
                 )
             )
         
-        session.delete(mp)
-        session.commit()
+        feed_cache.invalidate(mp_id)
         return success_response({
             "message": "订阅号删除成功",
             "id": mp_id
         })
     except Exception as e:
-        session.rollback()
         print(f"删除订阅号错误: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_201_CREATED,
@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request,Response
 from fastapi import status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from core.db import DB
-from core.rss import RSS
+from core.async_db import ADB
+from core.rss import RSS, CACHE_ENCODINGS
 from core.models.feed import Feed
 import json
 from .base import success_response, error_response
 from core.auth import get_current_user
 from core.config import cfg
 from apis.base import format_search_kw
-from core.print import print_error,print_success
+from core.print import print_error,print_success,print_warning
+from datetime import timezone, timedelta
+from email.utils import parsedate_to_datetime
+from sqlalchemy import func
+from core.pagination import decode_cursor
+from core.rss_feed import FeedSource, latest_time, feed_validators, refresh_in_background, feed_flight
 def verify_rss_access(current_user: dict = Depends(get_current_user)):
     """
     RSS访问认证方法
@@ -26,6 +33,105 @@ def verify_rss_access(current_user: dict = Depends(get_current_user)):
         )
     return current_user
 
+def encoding_etag(etag: str, encoding: str) -> str:
+    """压缩版本使用独立的ETag(如 "xxx-gzip")"""
+    if not etag or not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else f"{etag}-{encoding}"
+
+def strip_encoding_etag(etag: str) -> str:
+    for encoding in CACHE_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+def is_not_modified(request: Request, validators: dict) -> bool:
+    """判断条件请求(If-None-Match/If-Modified-Since)是否可以返回304"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match 优先，按弱比较匹配
+        # 各压缩版本的ETag对应同一内容版本
+        etag = strip_encoding_etag(validators.get("ETag") or "")
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == "*" or strip_encoding_etag(tag) == etag:
+                return True
+        return False
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = validators.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def not_modified_response(validators: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+
+def cached_response(request: Request, content: bytes, meta: dict, cache_status: str = "HIT") -> Response:
+    """直接使用缓存响应，缓存中的ETag同样支持条件请求"""
+    headers = dict(meta.get("headers") or {})
+    encoding = meta.get("encoding")
+    if encoding:
+        headers["ETag"] = encoding_etag(headers.get("ETag"), encoding)
+    if is_not_modified(request, headers):
+        return not_modified_response(headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["X-Cache"] = cache_status
+    return Response(
+        content=content,
+        media_type=meta.get("media_type"),
+        headers=headers
+    )
+
+class FeedStreamingResponse(StreamingResponse):
+    """流式输出订阅源，响应结束时(包括未开始输出或发送失败)确保释放合并调用"""
+
+    def __init__(self, source: FeedSource, call, **kwargs):
+        super().__init__(source.stream(call), **kwargs)
+        self.source = source
+        self.call = call
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # 生成器已正常结束时已释放，这里不会重复执行
+            self.source.release_stream(self.call)
+
+async def stream_response(request: Request, source: FeedSource, call) -> Response:
+    """流式输出订阅源，边生成边返回并写入缓存，内存占用不随文章数量增长"""
+    key = source.rss.rss_file
+    try:
+        validators = await run_in_threadpool(source.prepare_stream)
+    except Exception as e:
+        feed_flight.finish(key, call, error=e)
+        raise
+    if validators is None:
+        feed_flight.finish(key, call, result=(None, None))
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(
+                code=40401,
+                message="公众号不存在"
+            )
+        )
+    if is_not_modified(request, validators):
+        # 缓存仍需更新，交给后台完成
+        source.finish_in_background(call)
+        return not_modified_response(validators)
+    return FeedStreamingResponse(
+        source,
+        call,
+        media_type=source.rss.get_type(),
+        headers=dict(validators, **{"X-Cache": "MISS"})
+    )
+
 router = APIRouter(prefix="/rss",tags=["Rss"])
 feed_router = APIRouter(prefix="/feed",tags=["Feed"])
 
@@ -37,7 +143,7 @@ async def get_rss_source(
     offset: int = Query(0, ge=0),
     # current_user: dict = Depends(verify_rss_access)
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True,content_type=None)
 
 
 
@@ -61,47 +167,53 @@ async def get_rss_feeds(
     # current_user: dict = Depends(get_current_user)
 ):
     rss=RSS(name=f'all_{limit}_{offset}')
-    rss_xml=rss.get_cache()
-    if rss_xml is not None  and is_update==False:
-         return Response(
+    if is_update==False:
+        rss_xml,meta=rss.get_cache_entry(request.headers.get("accept-encoding"))
+        if rss_xml is not None and not rss.is_stale(meta):
+            return cached_response(request,rss_xml,meta)
+    def _stats(session):
+        return session.query(func.max(Feed.created_at),func.max(Feed.updated_at),func.count(Feed.id)).one()
+    def _feeds(session):
+        return session.query(Feed).order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
+    try:
+        rss_domain=cfg.get("rss.base_url",request.base_url)
+        # 条件请求：订阅源列表未变化时直接返回304
+        created_at,updated_at,total = await ADB.run(_stats)
+        last_modified=latest_time(created_at,updated_at)
+        validators=feed_validators(f"feeds|{limit}|{offset}|{rss_domain}|{total}|{last_modified}",last_modified)
+        if is_not_modified(request,validators):
+            return not_modified_response(validators)
+        feeds = await ADB.run(_feeds)
+        # 转换为RSS格式数据
+        # assume CST (UTC+8) for naive timestamps
+        cst = timezone(timedelta(hours=8))
+        rss_list = [{
+            "id": str(feed.id),
+            "title": feed.mp_name,
+            "link":  f"{rss_domain}rss/{feed.id}",
+            "description": feed.mp_intro,
+            "image": feed.mp_cover,
+            "updated": (feed.created_at if getattr(feed.created_at, 'tzinfo', None) is not None else feed.created_at.replace(tzinfo=cst)).isoformat()
+        } for feed in feeds]
+        
+        # 生成RSS XML
+        rss_xml = rss.generate_rss(rss_list, title="WeRSS订阅",link=rss_domain,updated=last_modified)
+        rss.save_cache(rss_xml,{"headers":validators,"media_type":"application/xml","ttl":int(cfg.get("rss.cache_ttl",3600) or 0)})
+        
+        return Response(
             content=rss_xml,
-            media_type="application/xml"
+            media_type="application/xml",
+            headers=validators
         )
-    # 使用上下文管理器确保 session 被正确清理（只读操作，不需要 commit）
-    with DB.session_scope(auto_commit=False) as session:
-        try:
-            total = session.query(Feed).count()
-            feeds = session.query(Feed).order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
-            rss_domain=cfg.get("rss.base_url",request.base_url)
-            # 转换为RSS格式数据
-            from datetime import datetime, timezone, timedelta
-            # assume CST (UTC+8) for naive timestamps
-            cst = timezone(timedelta(hours=8))
-            rss_list = [{
-                "id": str(feed.id),
-                "title": feed.mp_name,
-                "link":  f"{rss_domain}rss/{feed.id}",
-                "description": feed.mp_intro,
-                "image": feed.mp_cover,
-                "updated": (feed.created_at if getattr(feed.created_at, 'tzinfo', None) is not None else feed.created_at.replace(tzinfo=cst)).isoformat()
-            } for feed in feeds]
-            
-            # 生成RSS XML
-            rss_xml = rss.generate_rss(rss_list, title="WeRSS订阅",link=rss_domain)
-            
-            return Response(
-                content=rss_xml,
-                media_type="application/xml"
-            )
-        except Exception as e:
-            print(f"获取RSS订阅列表错误: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_406_NOT_ACCEPTABLE,
-                detail=error_response(
-                    code=50001,
-                    message="获取RSS订阅列表失败"
-                )
+    except Exception as e:
+        print(f"获取RSS订阅列表错误: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=error_response(
+                code=50001,
+                message="获取RSS订阅列表失败"
             )
+        )
 
 @router.get("/content/{content_id}", summary="获取缓存的文章内容")
 async def get_rss_feed(content_id: str):
@@ -141,8 +253,8 @@ async def get_rss_feed(content_id: str):
     </body>
     </html>
     '''
-    text=rss.add_logo_prefix_to_urls(content['content'])
-    html=html.format(title=title,text=text,source=content['mp_name'],publish_time=content['publish_time'])
+    # 缓存的内容中图片地址已添加前缀
+    html=html.format(title=title,text=content['content'],source=content['mp_name'],publish_time=content['publish_time'])
     return Response(
             content=html,
             media_type="text/html"
@@ -168,7 +280,7 @@ async def update_rss_feeds(
         # wx.get_Articles(mp.faker_id,Mps_id=mp.id,CallBack=UpdateArticle)
         # result=wx.articles
 
-        return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True)
+        return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=True,content_type=None)
 
 
 
@@ -181,119 +293,82 @@ async def get_mp_articles_source(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     kw:str="",
-    is_update:bool=True,
+    is_update:bool=False,
     content_type:str=Query(None,alias="ctype"),
-    template:str=None
+    template:str=None,
+    cursor:str=None
     # current_user: dict = Depends(get_current_user)
 ):
-    rss=RSS(name=f'{tag_id}_{feed_id}_{limit}_{offset}',ext=ext)
-    rss.set_content_type(content_type)
-    rss_xml = rss.get_cache()
-    if rss_xml is not None and is_update==False:
-         return Response(
-            content=rss_xml,
-            media_type=rss.get_type()
-        )
-    # 使用上下文管理器确保 session 被正确清理（只读操作，不需要 commit）
-    with DB.session_scope(auto_commit=False) as session:
+    # 游标分页：传入上一页响应头X-Next-Cursor的值，传入后忽略offset
+    if cursor:
         try:
-            from core.models.article import Article
-            from core.models.tags import Tags
-            # 查询公众号信息
-            feed = session.query(Feed)
-            query=session.query(Feed, Article).join(Article, Feed.id == Article.mp_id)
-            rss_domain=cfg.get("rss.base_url",str(request.base_url))
-            if feed_id not in ["all",None]:
-                feed=feed.filter(Feed.id == feed_id).first()
-                query=query.filter(Article.mp_id==feed_id)
-            else:
-                feed=Feed()
-                feed.mp_name=cfg.get("rss.title","WeRss") or "WeRss"
-                feed.mp_intro=cfg.get("rss.description") or "WeRss高效订阅我的公众号"
-                feed.mp_cover=cfg.get("rss.cover") or f"{rss_domain}static/logo.svg"
-                #如果传入了tag_id就加载tag对应的订阅信息
-                if tag_id is not None:
-                    tags=session.query(Tags).filter(Tags.id == tag_id).first()
-                    if tags:
-                        mps_ids = [str(mp['id']) for mp in json.loads(tags.mps_id)] if tags.mps_id else []
-                        query=query.filter(Feed.id.in_(mps_ids))
-                        feed.mp_name = tags.name
-                        feed.mp_intro = tags.intro
-                        feed.mp_cover = f'{rss_domain}{tags.cover}'
-
-            
-            if not feed:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=error_response(
-                        code=40401,
-                        message="公众号不存在"
-                    )
-                )
-          
-            # 查询文章列表
-            total = query.count()
-            # articles = query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
-            if kw!="":
-                query=query.filter(format_search_kw(kw))
-            articles =query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
-            # 转换为RSS格式数据
-            from datetime import datetime, timezone, timedelta
-            cst = timezone(timedelta(hours=8))
-            rss_list = [{
-                "id": str(article.id),
-                "title": article.title or "",
-                "link":  f"{rss_domain}rss/feed/{article.id}" if cfg.get("rss.local",False) else article.url,
-                "description": article.description if article.description != "" else article.title or "",
-                "content": article.content or "",
-                "image": article.pic_url or "",
-                "mp_name":_feed.mp_name or "",
-                "updated": datetime.fromtimestamp(article.publish_time, tz=cst),
-                "feed": {
-                        "id":_feed.id,
-                        "name":_feed.mp_name,
-                        "cover":_feed.mp_cover,
-                        "intro":_feed.mp_intro
-                }
-            } for _feed,article in articles]
-            
-
-            # 缓存文章内容
-            for _feed,article in articles:
-                content_data = {
-                    "id": article.id,
-                    "title": article.title,
-                    "content": article.content,
-                    "publish_time": article.publish_time,
-                    "mp_id": article.mp_id,
-                    "pic_url": article.pic_url,
-                    "mp_name": _feed.mp_name
-                }
-                rss.cache_content(article.id, content_data)
-            # 生成RSS XML
-            rss_xml = rss.generate(rss_list,ext=ext, title=f"{feed.mp_name}",link=rss_domain,description=feed.mp_intro,image_url=feed.mp_cover,template=template)
-            
-            return Response(
-                content=rss_xml,
-                media_type=rss.get_type()
-            )
-        except HTTPException:
-            raise
-        except Exception as e:
-            print_error(f"获取RSS错误:{e}")
-            # 如果出错，尝试返回缓存的 RSS（如果有）
-            if rss_xml:
-                return Response(
-                     content=rss_xml,
-                     media_type=rss.get_type()
-                )
+            decode_cursor(cursor)
+        except ValueError as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
                 detail=error_response(
-                    code=50001,
-                    message=f"获取RSS失败: {str(e)}"
+                    code=40001,
+                    message=str(e)
                 )
             )
+    rss_domain=cfg.get("rss.base_url",str(request.base_url))
+    source=FeedSource(feed_id=feed_id,tag_id=tag_id,ext=ext,limit=limit,offset=offset,kw=kw,content_type=content_type,template=template,domain=rss_domain,cursor=cursor)
+    rss=source.rss
+    rss_xml,meta=rss.get_cache_entry(request.headers.get("accept-encoding"))
+    # 缓存优先：命中直接返回，过期则先返回旧内容并在后台刷新
+    if rss_xml is not None and is_update==False:
+        if not rss.is_stale(meta):
+            return cached_response(request,rss_xml,meta)
+        refresh_in_background(source)
+        return cached_response(request,rss_xml,meta,cache_status="STALE")
+    try:
+        # 相同订阅源的并发请求只生成一次，在线程池中执行避免阻塞事件循环
+        if source.streamable():
+            call,leader=feed_flight.acquire(rss.rss_file)
+            if leader:
+                return await stream_response(request,source,call)
+            shared=True
+            try:
+                result=await run_in_threadpool(feed_flight.wait,call)
+            except TimeoutError as e:
+                # 执行者长时间未完成，不再等待，直接生成
+                print_warning(f"{e}，直接生成: {rss.rss_file}")
+                result=await run_in_threadpool(source.build)
+                shared=False
+            if result is None:
+                # 流式输出完成后内容已写入缓存
+                result=rss.get_cache_entry(request.headers.get("accept-encoding"))
+                if result[0] is None:
+                    # 缓存未写入(如未开启缓存或写入失败)时直接生成
+                    result=await run_in_threadpool(source.build)
+                    shared=False
+            content,shared_meta=result
+        else:
+            (content,shared_meta),shared=await run_in_threadpool(source.build_shared,not is_update)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print_error(f"获取RSS错误:{e}")
+        # 如果出错，尝试返回缓存的 RSS（如果有）
+        if rss_xml:
+            return cached_response(request,rss_xml,meta,cache_status="STALE")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_response(
+                code=50001,
+                message=f"获取RSS失败: {str(e)}"
+            )
+        )
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(
+                code=40401,
+                message="公众号不存在"
+            )
+        )
+    # 条件请求：内容未变化时直接返回304
+    return cached_response(request,content,shared_meta,cache_status="COALESCED" if shared else "MISS")
     
 
 
@@ -306,9 +381,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 
 
 @feed_router.get("/search/{kw}/{feed_id}.{ext}", summary="获取公众号文章源")
@@ -320,9 +396,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 @feed_router.get("/tag/{tag_id}.{ext}", summary="获取公众号文章源")
 async def rss(
     request: Request,
@@ -333,8 +410,9 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 
 
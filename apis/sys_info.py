@@ -58,6 +58,13 @@ async def system_resources(
             message=f"获取系统资源失败: {str(e)}"
         )
 from core.article_lax import laxArticle
+from core.rss_feed import get_feed_stats
+from core.db import engine_registry
+from core.search import search_index
+from core.feed_cache import feed_cache
+from core.wx.engine import gather_engine
+from core.wx.content_pool import content_pool
+from core.http_client import http_client
 from .ver import API_VERSION
 from core.ver import VERSION as CORE_VERSION,LATEST_VERSION
 @router.get("/info", summary="获取系统信息")
@@ -106,6 +113,13 @@ async def get_system_info(
             },
             "article":article_info,
             'queue':TaskQueue.get_queue_info(),
+            'rss':get_feed_stats(),
+            'db':engine_registry.get_stats(),
+            'search':search_index.get_stats(),
+            'feed_cache':feed_cache.get_stats(),
+            'gather':gather_engine.get_stats(),
+            'content_pool':content_pool.get_stats(),
+            'http':http_client.get_stats(),
         }
         return success_response(data=system_info)
     except Exception as e:
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 from datetime import datetime
 from core.models.tags import Tags as TagsModel
 from core.database import get_db
+from core.db import DB, detach
 from sqlalchemy.orm import Session
 from schemas.tags import Tags, TagsCreate
 from .base import success_response, error_response
@@ -68,7 +70,7 @@ async def get_tags(offset: int = 0, limit: int = 100, db: Session = Depends(get_
     summary="创建新标签",
     description="创建一个新的标签"
    )
-async def create_tag(tag: TagsCreate, db: Session = Depends(get_db),cur_user: dict = Depends(get_current_user)):
+async def create_tag(tag: TagsCreate, cur_user: dict = Depends(get_current_user)):
     """
     创建新标签
     
@@ -88,7 +90,7 @@ async def create_tag(tag: TagsCreate, db: Session = Depends(get_db),cur_user: di
     - 失败: 错误响应
     """
     import uuid
-    try:
+    def create(db):
         db_tag = TagsModel(
             id=str(uuid.uuid4()),
             name=tag.name or '',
@@ -100,13 +102,12 @@ async def create_tag(tag: TagsCreate, db: Session = Depends(get_db),cur_user: di
             updated_at=datetime.now()
         )
         db.add(db_tag)
-        db.commit()
-        db.refresh(db_tag)
-        return success_response(data=db_tag)
+        return detach(db, db_tag)
+    try:
+        return success_response(data=await run_in_threadpool(DB.write, create))
     except Exception as e:
          from core.print  import print_error
          print_error(f"创建标签失败: {e}")
-         db.rollback()
          raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_response(
@@ -142,7 +143,7 @@ async def get_tag(tag_id: str, db: Session = Depends(get_db),cur_user: dict = De
     summary="更新标签信息",
     description="根据标签ID更新标签信息",
  )
-async def update_tag(tag_id: str, tag_data: TagsCreate, db: Session = Depends(get_db),cur_user: dict = Depends(get_current_user)):
+async def update_tag(tag_id: str, tag_data: TagsCreate, cur_user: dict = Depends(get_current_user)):
     """
     更新标签信息
     
@@ -162,10 +163,10 @@ async def update_tag(tag_id: str, tag_data: TagsCreate, db: Session = Depends(ge
     - 成功: 包含更新后标签信息的响应
     - 失败: 404错误响应(标签不存在)或500错误响应(服务器错误)
     """
-    try:
+    def update(db):
         tag = db.query(TagsModel).filter(TagsModel.id == tag_id).first()
         if not tag:
-            return error_response(code=404, message="Tag not found")
+            return None
         
         tag.name = tag_data.name
         tag.cover = tag_data.cover
@@ -173,21 +174,22 @@ async def update_tag(tag_id: str, tag_data: TagsCreate, db: Session = Depends(ge
         tag.status = tag_data.status
         tag.mps_id = tag_data.mps_id
         tag.updated_at = datetime.now()
-        
-        db.commit()
-        db.refresh(tag)
+        return detach(db, tag)
+    try:
+        tag = await run_in_threadpool(DB.write, update)
+        if not tag:
+            return error_response(code=404, message="Tag not found")
         return success_response(data=tag)
     except Exception as e:
         from core.print import print_error
         print_error(f"更新标签失败: {e}")
-        db.rollback()
         return error_response(code=500, message=f"更新标签失败: {str(e)}")
 
 @router.delete("/{tag_id}",
     summary="删除标签",
     description="根据标签ID删除标签",
    )
-async def delete_tag(tag_id: str, db: Session = Depends(get_db),cur_user: dict = Depends(get_current_user)):
+async def delete_tag(tag_id: str, cur_user: dict = Depends(get_current_user)):
     """
     删除标签
     
@@ -198,15 +200,17 @@ async def delete_tag(tag_id: str, db: Session = Depends(get_db),cur_user: dict =
     - 成功: 删除成功的响应
     - 失败: 404错误响应(标签不存在)或500错误响应(服务器错误)
     """
-    try:
+    def delete(db):
         tag = db.query(TagsModel).filter(TagsModel.id == tag_id).first()
         if not tag:
-            return error_response(code=status.HTTP_201_CREATED, message="Tag not found")
+            return False
         db.delete(tag)
-        db.commit()
+        return True
+    try:
+        if not await run_in_threadpool(DB.write, delete):
+            return error_response(code=status.HTTP_201_CREATED, message="Tag not found")
         return success_response(message="Tag deleted successfully")
     except Exception as e:
         from core.print import print_error
         print_error(f"删除标签失败: {e}")
-        db.rollback()
         return error_response(code=500, message=f"删除标签失败: {str(e)}")
\ No newline at end of file
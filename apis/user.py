@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 from core.auth import get_current_user
 from core.db import DB
@@ -151,8 +152,8 @@ async def add_user(
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
-        session.add(new_user)
-        session.commit()
+        # 通过写入线程提交
+        await run_in_threadpool(DB.write, lambda write_session: write_session.add(new_user))
 
         return success_response(message="用户添加成功")
     except HTTPException as e:
@@ -215,7 +216,9 @@ async def update_user_info(
             user.role = update_data["role"]
 
         user.updated_at = datetime.now()
-        session.commit()
+        # 从读取会话中移除，通过写入线程提交修改
+        session.expunge(user)
+        await run_in_threadpool(DB.write, lambda write_session: write_session.merge(user))
         return success_response(message="更新成功")
     except HTTPException as e:
         raise e
@@ -286,8 +289,9 @@ async def change_password(
         # 更新密码
         user.password_hash = pwd_context.hash(new_password)
         user.updated_at = datetime.now()
-        session.commit()
-        session.expire(user)
+        # 从读取会话中移除，通过写入线程提交修改
+        session.expunge(user)
+        await run_in_threadpool(DB.write, lambda write_session: write_session.merge(user))
         # 清除用户缓存，确保新密码立即生效
         from core.auth import clear_user_cache
         clear_user_cache(current_user["username"])
@@ -328,7 +332,9 @@ async def upload_avatar(
             ).first()
             if user:
                 user.avatar = f"/{avatar_path}/{current_user['username']}.jpg"
-                session.commit()
+                # 从读取会话中移除，通过写入线程提交修改
+                session.expunge(user)
+                await run_in_threadpool(DB.write, lambda write_session: write_session.merge(user))
         except Exception as e:
             session.rollback()
             raise HTTPException(
@@ -0,0 +1,74 @@
+"""按文章保存的文件缓存
+
+每篇文章一个JSON文件，文件内按槽位(slot)保存缓存内容及其版本，
+进程内再保留一份最近使用的内容，避免重复读文件。
+版本不一致(如文章内容或渲染配置变化)时视为未命中，由调用方重新生成后覆盖。
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from core.print import print_error
+
+
+class ArticleCache:
+    cache_dir = os.path.normpath("data/cache/article")
+
+    def __init__(self, cache_dir: str = None, max_items: int = 2000):
+        if cache_dir is not None:
+            self.cache_dir = os.path.normpath(cache_dir)
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, article_id: str) -> str:
+        path = os.path.normpath(f"{self.cache_dir}/{article_id}.json")
+        if not path.startswith(self.cache_dir):
+            raise ValueError("Invalid cache path: Path traversal detected.")
+        return path
+
+    def _load(self, article_id: str) -> dict:
+        try:
+            with open(self._path(article_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _remember(self, key: tuple, version: str, value: str):
+        with self._lock:
+            self._items[key] = (version, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, article_id: str, slot: str, version: str) -> str:
+        """获取缓存内容，版本不一致时返回None"""
+        key = (article_id, slot)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+        if item is None:
+            item = self._load(article_id).get(slot)
+            if not item:
+                return None
+            item = (item.get("key"), item.get("fragment"))
+            self._remember(key, *item)
+        if item[0] != version:
+            return None
+        return item[1]
+
+    def put(self, article_id: str, slot: str, version: str, value: str):
+        """保存缓存内容，同一文章的其他槽位保持不变"""
+        self._remember((article_id, slot), version, value)
+        try:
+            path = self._path(article_id)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = self._load(article_id)
+            data[slot] = {"key": version, "fragment": value}
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print_error(f"写入文章缓存失败:{e}")
@@ -1,5 +1,4 @@
-from core.models import Article,Feed,DATA_STATUS
-from core.db import DB
+import core.article_stats as article_stats
 import json
 class ArticleInfo():
     #没有内容的文章数量
@@ -21,20 +20,20 @@ def laxArticle():
     """
     info=ArticleInfo()
     try:
-        # 使用 session_scope 确保连接正确关闭
-        with DB.session_scope(auto_commit=False) as session:
-            #获取没有内容的文章数量
-            info.no_content_count=session.query(Article).filter(Article.content == None).count()
-            #所有文章数量
-            info.all_count=session.query(Article).count()
-            #有内容的文章数量
-            info.has_content_count=info.all_count-info.no_content_count
+        # 从统计表读取，不执行COUNT扫描
+        stats = article_stats.summary()
+        #获取没有内容的文章数量
+        info.no_content_count=stats["no_content_count"]
+        #所有文章数量
+        info.all_count=stats["all_count"]
+        #有内容的文章数量
+        info.has_content_count=info.all_count-info.no_content_count
 
-            #获取删除的文章
-            info.wrong_count=session.query(Article).filter(Article.status !=DATA_STATUS.ACTIVE ).count()
+        #获取删除的文章
+        info.wrong_count=stats["wrong_count"]
 
-            #公众号总数
-            info.mp_all_count=session.query(Feed).distinct(Feed.id).count()
+        #公众号总数
+        info.mp_all_count=stats["feed_count"]
     except Exception as e:
         from core.print import print_error
         print_error(f"获取文章统计信息失败: {e}")
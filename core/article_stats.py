@@ -0,0 +1,272 @@
+"""文章数量统计
+
+按公众号在 article_stats 表中保存文章总数、已删除、状态不正常和没有正文的文章数量("*" 为合计)，
+文章新增、修改和删除时在同一事务中更新，统计信息和列表总数直接读取，不再执行 COUNT 扫描。
+定时对账任务重新统计并修正偏差(如直接修改数据库造成的不一致)。
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import func, case
+from core.config import cfg
+from core.models.article import Article
+from core.models.article_stats import ArticleStats
+from core.models.feed import Feed
+from core.models.base import DATA_STATUS
+from core.print import print_info, print_warning, print_error
+
+TOTAL = "*"
+COUNTERS = ("all_count", "deleted_count", "wrong_count", "no_content_count")
+
+
+def _counters(status, has_content) -> tuple:
+    """一篇文章对各项统计的贡献"""
+    return (1, int(status == DATA_STATUS.DELETED), int(status != DATA_STATUS.ACTIVE), int(not has_content))
+
+
+def _key(mp_id) -> str:
+    return mp_id or ""
+
+
+def apply(session, deltas: dict, feed_delta: int = 0):
+    """在会话中累加统计变化
+
+    Args:
+        deltas: {公众号ID: (总数, 已删除, 状态不正常, 没有正文) 的变化量}
+        feed_delta: 公众号数量的变化量
+
+    变化量为0的公众号(如修改了标题或正文)也更新 updated_at，作为RSS版本水位(见 watermark)
+    """
+    totals = [0] * len(COUNTERS)
+    values = []
+    for mp_id, delta in deltas.items():
+        totals = [a + b for a, b in zip(totals, delta)]
+        values.append((_key(mp_id), delta))
+    if not any(totals) and not feed_delta and not values:
+        return
+    now = datetime.now()
+    names = COUNTERS + ("feed_count",)
+    # 合计行由对账任务创建，尚未统计过时跳过，之后对账时一并统计
+    updated = session.query(ArticleStats).filter(ArticleStats.mp_id == TOTAL).update(
+        {**{name: getattr(ArticleStats, name) + value for name, value in zip(names, totals + [feed_delta])}, "updated_at": now},
+        synchronize_session=False)
+    if not updated:
+        return
+    dialect = session.get_bind().dialect.name
+    for mp_id, delta in values:
+        row = dict(zip(COUNTERS, delta), mp_id=mp_id, feed_count=0, updated_at=now)
+        stmt = _upsert(dialect, row)
+        if stmt is not None:
+            session.execute(stmt)
+            continue
+        updated = session.query(ArticleStats).filter(ArticleStats.mp_id == mp_id).update(
+            {**{name: getattr(ArticleStats, name) + row[name] for name in names}, "updated_at": now},
+            synchronize_session=False)
+        if not updated:
+            session.add(ArticleStats(**row))
+
+
+def _upsert(dialect: str, row: dict):
+    """累加统计的 INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE 语句，不支持的数据库返回None"""
+    table = ArticleStats.__table__
+    names = COUNTERS + ("feed_count",)
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(row)
+        return stmt.on_conflict_do_update(index_elements=[table.c.mp_id], set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in names}, "updated_at": stmt.excluded.updated_at})
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(row)
+        return stmt.on_duplicate_key_update(
+            **{name: table.c[name] + stmt.inserted[name] for name in names}, updated_at=stmt.inserted.updated_at)
+    return None
+
+
+def added(session, articles: list):
+    """新增文章
+
+    Args:
+        articles: [(公众号ID, 状态, 是否有正文)]
+    """
+    deltas = {}
+    for mp_id, status, has_content in articles:
+        current = deltas.get(mp_id, (0,) * len(COUNTERS))
+        deltas[mp_id] = tuple(a + b for a, b in zip(current, _counters(status, has_content)))
+    apply(session, deltas)
+
+
+def feeds_changed(session, delta: int):
+    """新增(1)或删除(-1)公众号"""
+    apply(session, {}, feed_delta=delta)
+
+
+def _states(session, article_ids: list) -> dict:
+    if not article_ids:
+        return {}
+    states = {}
+    for start in range(0, len(article_ids), 500):
+        chunk = article_ids[start:start + 500]
+        rows = session.query(Article.id, Article.mp_id, Article.status, Article.has_content()).filter(Article.id.in_(chunk))
+        for article_id, mp_id, status, has_content in rows:
+            states[article_id] = (mp_id, _counters(status, has_content))
+    return states
+
+
+@contextmanager
+def track(session, article_ids: list):
+    """修改或删除文章时使用：比较修改前后的状态，在同一会话中更新统计
+
+    用法:
+        with article_stats.track(session, [article_id]):
+            session.query(Article).filter(Article.id == article_id).update(...)
+    """
+    article_ids = list(article_ids)
+    before = _states(session, article_ids)
+    yield
+    session.flush()
+    after = _states(session, article_ids)
+    deltas = {}
+    for states, sign in ((before, -1), (after, 1)):
+        for mp_id, counters in states.values():
+            current = deltas.get(mp_id, (0,) * len(COUNTERS))
+            deltas[mp_id] = tuple(a + sign * b for a, b in zip(current, counters))
+    apply(session, deltas)
+
+
+def _count_all(session) -> dict:
+    """重新统计(对账使用)"""
+    has_content = Article.has_content()
+    rows = session.query(
+        Article.mp_id,
+        func.count(Article.id),
+        func.sum(case((Article.status == DATA_STATUS.DELETED, 1), else_=0)),
+        func.sum(case((Article.status != DATA_STATUS.ACTIVE, 1), else_=0)),
+        func.sum(case((has_content, 0), else_=1)),
+    ).group_by(Article.mp_id).all()
+    result = {}
+    totals = [0] * len(COUNTERS)
+    for mp_id, *counts in rows:
+        counts = [int(count or 0) for count in counts]
+        key = _key(mp_id)
+        result[key] = [a + b for a, b in zip(result.get(key, [0] * len(COUNTERS)), counts)]
+        totals = [a + b for a, b in zip(totals, counts)]
+    result[TOTAL] = totals + [session.query(Feed).count()]
+    return result
+
+
+def reconcile() -> int:
+    """重新统计并覆盖统计表，返回存在偏差的公众号数量"""
+    from core.db import DB
+
+    def run(session):
+        actual = _count_all(session)
+        stored = {row.mp_id: row for row in session.query(ArticleStats).all()}
+        drift = 0
+        now = datetime.now()
+        for mp_id, counts in actual.items():
+            values = dict(zip(COUNTERS, counts))
+            values["feed_count"] = counts[len(COUNTERS)] if mp_id == TOTAL else 0
+            row = stored.pop(mp_id, None)
+            if row is None:
+                row = ArticleStats(mp_id=mp_id)
+                session.add(row)
+            elif all((getattr(row, name) or 0) == value for name, value in values.items()):
+                # 没有偏差时不修改 updated_at，避免RSS版本变化
+                continue
+            drift += 1
+            for name, value in values.items():
+                setattr(row, name, value)
+            row.updated_at = now
+        for row in stored.values():
+            session.delete(row)
+            drift += 1
+        return drift
+
+    drift = DB.write(run)
+    if drift:
+        print_warning(f"文章统计已修正: {drift}项")
+    return drift
+
+
+def _get(session, mp_id: str):
+    return session.query(ArticleStats).filter(ArticleStats.mp_id == mp_id).first()
+
+
+def summary() -> dict:
+    """合计统计，统计表为空时先重新统计"""
+    from core.db import DB
+    with DB.session_scope(auto_commit=False) as session:
+        row = _get(session, TOTAL)
+        if row is not None:
+            return _to_dict(row)
+    reconcile()
+    with DB.session_scope(auto_commit=False) as session:
+        return _to_dict(_get(session, TOTAL))
+
+
+def watermark(session, mp_ids: list = None):
+    """文章版本水位，文章新增、修改和删除时随统计一起更新，按主键读取不扫描文章表
+
+    Args:
+        mp_ids: 公众号ID列表，为None时取全部公众号的合计
+
+    Returns:
+        (最后更新时间, 版本字符串)，统计表尚未建立(未对账)时返回None
+    """
+    keys = [_key(mp_id) for mp_id in mp_ids or []]
+    rows = session.query(ArticleStats).filter(ArticleStats.mp_id.in_(keys + [TOTAL])).all()
+    total = next((row for row in rows if row.mp_id == TOTAL), None)
+    if total is None:
+        return None
+    rows = [total] if mp_ids is None else sorted((row for row in rows if row.mp_id in keys), key=lambda row: row.mp_id)
+    # 包含各项数量，时间精度只到秒的数据库同一秒内删除文章也会改变版本
+    version = ";".join(f"{row.mp_id}:{row.updated_at.isoformat() if row.updated_at else ''}:"
+                       + ",".join(str(getattr(row, name) or 0) for name in COUNTERS) for row in rows)
+    return max((row.updated_at for row in rows if row.updated_at), default=None), version
+
+
+def _to_dict(row) -> dict:
+    return {name: getattr(row, name) or 0 for name in COUNTERS + ("feed_count",)}
+
+
+def article_count(session, mp_id: str = None, status: str = None):
+    """文章列表的总数(排除已删除的文章，或按状态过滤)，无法从统计表得到时返回None"""
+    total = _get(session, TOTAL)
+    if total is None:
+        return None
+    row = total if not mp_id else _get(session, _key(mp_id))
+    if row is None:
+        return 0
+    if not status:
+        return (row.all_count or 0) - (row.deleted_count or 0)
+    if str(status) == str(DATA_STATUS.DELETED):
+        return row.deleted_count or 0
+    if str(status) == str(DATA_STATUS.ACTIVE):
+        return (row.all_count or 0) - (row.wrong_count or 0)
+    return None
+
+
+def feed_count(session):
+    """公众号总数，无法从统计表得到时返回None"""
+    total = _get(session, TOTAL)
+    return total.feed_count if total is not None else None
+
+
+def start_reconcile():
+    """启动定时对账：立即执行一次，之后按 stats.reconcile_interval(分钟) 执行"""
+    interval = int(cfg.get("stats.reconcile_interval", 60) or 60) * 60
+
+    def run():
+        try:
+            reconcile()
+        except Exception as e:
+            print_error(f"文章统计对账失败: {e}")
+        timer = threading.Timer(interval, run)
+        timer.daemon = True
+        timer.start()
+    threading.Thread(target=run, daemon=True).start()
+    print_info(f"已启动文章统计对账任务，间隔{interval // 60}分钟")
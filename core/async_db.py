@@ -0,0 +1,96 @@
+"""接口使用的异步数据库访问
+
+接口中的查询通过异步引擎(aiosqlite/asyncpg/aiomysql)执行，慢查询不会阻塞事件循环；
+异步驱动未安装或未启用时，回退到同步引擎并在线程池中执行。定时任务等仍使用 core.db 的同步接口。
+
+使用示例:
+    from core.async_db import ADB
+
+    def _query(session):
+        return session.query(Article).filter(Article.id == article_id).first()
+
+    article = await ADB.run(_query)
+"""
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+from core.config import cfg
+from core.db import DB, engine_registry, async_driver_available, read_connection_str, replica_health
+from core.print import print_warning
+
+
+class AsyncDb:
+    connection_str: str = None
+
+    def __init__(self, tag: str = "接口查询"):
+        self.tag = tag
+        self._session_factory = None
+        self._available = None
+
+    def available(self) -> bool:
+        """是否使用异步引擎"""
+        if self._available is None:
+            con_str = self.connection_str or cfg.get("db")
+            self._available = cfg.get("db_async", True) == True and async_driver_available(con_str)
+            if not self._available and cfg.get("db_async", True) == True:
+                print_warning(f"[{self.tag}]未安装异步数据库驱动，接口查询在线程池中执行")
+        return self._available
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            _, self._session_factory = engine_registry.get(self.connection_str or cfg.get("db"), "async", tag=self.tag)
+        return self._session_factory
+
+    async def read_session(self):
+        """只读查询使用的异步会话(需自行close)，配置了 db_read 且副本可用时连接只读副本"""
+        read_str = read_connection_str()
+        if read_str and replica_health.available(read_str) and async_driver_available(read_str):
+            _, factory = engine_registry.get(read_str, "async_read", tag=self.tag)
+            session = factory()
+            try:
+                # 先检出连接，副本不可用时立即回退
+                await session.connection()
+                replica_health.mark_success()
+                return session
+            except Exception as e:
+                await session.close()
+                replica_health.mark_failed(read_str, e)
+        elif read_str:
+            replica_health.mark_fallback()
+        return self.session_factory()
+
+    @asynccontextmanager
+    async def session_scope(self, auto_commit: bool = False, read_only: bool = False):
+        """异步会话(AsyncSession)，需先确认 available()"""
+        session = await self.read_session() if read_only and not auto_commit else self.session_factory()
+        async with session:
+            try:
+                yield session
+                if auto_commit:
+                    await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def run(self, func, read_only: bool = True):
+        """在会话中执行同步写法的查询函数 func(session)，返回其结果
+
+        异步引擎下通过 AsyncSession.run_sync 执行，数据库IO不阻塞事件循环；
+        返回的ORM对象在会话关闭后仍可读取已加载的属性。
+        read_only 为True时可使用只读副本(db_read)。
+        """
+        if self.available():
+            async with self.session_scope(read_only=read_only) as session:
+                return await session.run_sync(func)
+        return await run_in_threadpool(self._run_sync, func, read_only)
+
+    @staticmethod
+    def _run_sync(func, read_only: bool = True):
+        with DB.session_scope(auto_commit=False, read_only=read_only) as session:
+            result = func(session)
+            session.expunge_all()
+            return result
+
+
+# 全局异步数据库实例
+ADB = AsyncDb()
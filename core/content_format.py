@@ -1,7 +1,13 @@
  
 from bs4 import BeautifulSoup
+import hashlib
+import os
 import re
 from core.log import logger
+from core.article_cache import ArticleCache
+
+# 需要转换的内容格式，其余格式(html)原样返回
+CONVERT_FORMATS = ("text", "markdown")
 
 def format_content(content:str,content_format:str='html'):
     #格式化内容
@@ -50,4 +56,46 @@ def format_content(content:str,content_format:str='html'):
             
     except Exception as e:
         logger.error('format_content error: %s',e)
-    return content
\ No newline at end of file
+    return content
+
+
+class FormatCache(ArticleCache):
+    """文章内容格式转换结果缓存，按 内容格式 保存，版本为原始内容的哈希"""
+    cache_dir = os.path.normpath("data/cache/format")
+
+format_cache = FormatCache()
+
+
+def content_hash(content: str) -> str:
+    return hashlib.md5((content or "").encode("utf-8")).hexdigest()
+
+
+def article_content_id(article_id: str, mp_id: str = None) -> str:
+    """采集数据中的原始文章ID转换为入库后的文章ID"""
+    article_id = str(article_id or "")
+    if not mp_id:
+        return article_id
+    prefix = str(mp_id).replace("MP_WXS_", "")
+    if article_id.startswith(f"{prefix}-"):
+        return article_id
+    return f"{mp_id}-{article_id}".replace("MP_WXS_", "")
+
+
+def format_article_content(article_id: str, content: str, content_format: str = 'html') -> str:
+    """格式化文章内容，转换结果按 (文章ID, 内容哈希, 格式) 缓存
+
+    文章内容变化后哈希不同，自动重新转换并覆盖旧结果；没有文章ID时不缓存
+    """
+    if not content or not article_id or content_format not in CONVERT_FORMATS:
+        return format_content(content, content_format)
+    article_id = str(article_id)
+    version = content_hash(content)
+    try:
+        cached = format_cache.get(article_id, content_format, version)
+    except ValueError:
+        return format_content(content, content_format)
+    if cached is not None:
+        return cached
+    result = format_content(content, content_format)
+    format_cache.put(article_id, content_format, version, result)
+    return result
@@ -0,0 +1,83 @@
+"""文章正文存储
+
+正文压缩后保存在 article_contents 表，文章表只保留元数据，列表、统计和订阅源元数据查询不再读取正文。
+旧版本保存在 articles.content 的正文分批迁移到新表，迁移后原字段置空(字段保留，便于回退版本)。
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import text, insert
+from core.models.article import ArticleContent, compress_content
+from core.print import print_info, print_warning, print_error
+
+MIGRATE_BATCH = 200
+
+
+def content_row(article_id: str, content: str) -> dict:
+    """正文转换为 article_contents 表的一行"""
+    codec, data = compress_content(content)
+    return {"article_id": article_id, "codec": codec, "data": data, "size": len(content), "updated_at": datetime.now()}
+
+
+def save_content(session, article_id: str, content: str):
+    """在会话中写入(覆盖)文章正文"""
+    session.query(ArticleContent).filter(ArticleContent.article_id == article_id).delete(synchronize_session=False)
+    if content:
+        session.execute(insert(ArticleContent), [content_row(article_id, content)])
+
+
+def pending_contents(engine) -> bool:
+    """是否还有保存在文章表中的旧正文"""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM articles WHERE content IS NOT NULL LIMIT 1")).first() is not None
+
+
+def migrate_contents(engine, batch_size: int = MIGRATE_BATCH) -> int:
+    """将文章表中的旧正文分批压缩迁移到 article_contents，每批单独提交
+
+    新表中已有正文的文章(迁移期间重新抓取过)保留新正文。
+
+    Returns:
+        迁移的文章数量
+    """
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text("SELECT id, content FROM articles WHERE content IS NOT NULL LIMIT :limit"),
+                                {"limit": batch_size}).fetchall()
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            existing = {row[0] for row in conn.execute(
+                ArticleContent.__table__.select().with_only_columns(ArticleContent.article_id).where(ArticleContent.article_id.in_(ids)))}
+            values = [content_row(row[0], row[1]) for row in rows if row[1] and row[0] not in existing]
+            if values:
+                conn.execute(insert(ArticleContent), values)
+            conn.execute(text("UPDATE articles SET content = NULL WHERE id = :id"), [{"id": article_id} for article_id in ids])
+        total += len(rows)
+    if total:
+        print_info(f"已迁移文章正文: {total}篇")
+    return total
+
+
+def start_migrate():
+    """在后台线程中迁移旧正文"""
+    from core.db import DB
+
+    def run():
+        try:
+            migrate_contents(DB.engine)
+        except Exception as e:
+            print_error(f"迁移文章正文失败: {e}")
+    threading.Thread(target=run, daemon=True).start()
+
+
+def check_contents(engine) -> bool:
+    """启动时检查是否有未迁移的旧正文"""
+    try:
+        pending = pending_contents(engine)
+    except Exception as e:
+        print_warning(f"检查文章正文存储失败: {e}")
+        return False
+    if pending:
+        print_warning("文章表中还有未迁移的正文，将在后台迁移到 article_contents")
+    return pending
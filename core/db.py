@@ -3,42 +3,266 @@ from sqlalchemy.orm import sessionmaker, declarative_base,scoped_session, Sessio
 from sqlalchemy import Column, Integer, String, DateTime
 from typing import Optional, List
 from contextlib import contextmanager
+from concurrent.futures import Future
+import queue
+import threading
+import time
 from .models import Feed, Article
+from core.models.article import url_hash
+import core.article_stats as article_stats
+from core.feed_cache import feed_cache
 from .config import cfg
 from core.models.base import Base  
 from core.print import print_warning,print_info,print_error,print_success
 # 声明基类
 # Base = declarative_base()
 
-class Db:
-    connection_str: str=None
-    def __init__(self,tag:str="默认",User_In_Thread=True):
-        self.Session= None
-        self.engine = None
-        self.User_In_Thread=User_In_Thread
-        self.tag=tag
-        print_success(f"[{tag}]连接初始化")
-        # 在多进程环境中，延迟连接初始化以避免启动时连接冲突
-        import os
-        import time
-        # 使用进程ID生成延迟，确保每个进程有不同的延迟时间
-        # 延迟范围：0-1秒，基于进程ID的哈希值（减少延迟时间）
-        process_id = os.getpid()
-        delay = (process_id % 10) / 10.0  # 0-1秒的延迟
-        if delay > 0:
-            time.sleep(delay)
-        self.init(cfg.get("db"))
-    def get_engine(self) -> Engine:
-        """Return the SQLAlchemy engine for this database connection."""
-        if self.engine is None:
-            raise ValueError("Database connection has not been initialized.")
-        return self.engine
-    def get_session_factory(self):
-        return sessionmaker(bind=self.engine, autoflush=True, expire_on_commit=True, future=True)
-    def init(self, con_str: str) -> None:
-        """Initialize database connection and create tables"""
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_url(con_str: str) -> Optional[str]:
+    """同步连接字符串转换为异步驱动的连接字符串，不支持的数据库返回None"""
+    from sqlalchemy.engine import make_url
+    url = make_url(con_str)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return None
+    if driver.endswith("asyncpg") and "sslmode" in url.query:
+        # asyncpg 使用 ssl 参数
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def async_connect_args(con_str: str, connect_args: dict) -> dict:
+    """同步驱动的连接参数转换为异步驱动的连接参数"""
+    if con_str.startswith('postgresql') or con_str.startswith('postgres'):
+        return {"timeout": 30, "server_settings": {"statement_timeout": "30000"}}
+    return connect_args
+
+def async_driver_available(con_str: str) -> bool:
+    """异步驱动是否已安装"""
+    import importlib.util
+    url = async_url(con_str) if con_str else None
+    if url is None:
+        return False
+    module = url.split("://", 1)[0].split("+", 1)[1]
+    return importlib.util.find_spec(module) is not None and importlib.util.find_spec("greenlet") is not None
+
+
+def sqlite_pragmas() -> dict:
+    """SQLite连接参数，每个新连接建立时设置"""
+    pragmas = {"busy_timeout": int(cfg.get("sqlite.busy_timeout", 5000))}
+    if cfg.get("sqlite.wal", True) == True:
+        # WAL模式下读写互不阻塞，synchronous=NORMAL 在WAL下不会损坏数据库
+        pragmas["journal_mode"] = "WAL"
+        pragmas["synchronous"] = "NORMAL"
+    # 负数表示以KB为单位
+    pragmas["cache_size"] = -int(cfg.get("sqlite.cache_size", 20000))
+    pragmas["mmap_size"] = int(cfg.get("sqlite.mmap_size", 268435456))
+    pragmas["temp_store"] = "MEMORY"
+    return pragmas
+
+def setup_sqlite(engine: Engine, writer: bool = False):
+    """为SQLite引擎设置PRAGMA；写入引擎使用 BEGIN IMMEDIATE 开启事务，避免事务中途升级写锁失败"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        if writer:
+            # 关闭驱动自带的事务处理，由下面的 begin 事件开启事务
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class SQLiteWriter:
+    """SQLite单线程写入
+
+    提交到这里的写操作都在同一个线程中执行，排队中的多个写操作合并为一个事务提交，
+    避免调度任务、任务队列和接口同时写入时出现 database is locked。
+    合并提交失败时逐个重新执行，只有出错的写操作返回异常。
+    """
+
+    def __init__(self, session_factory, batch_size: int = 50):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "batches": 0, "retries": 0, "errors": 0}
+
+    def submit(self, func) -> Future:
+        """提交写操作 func(session)，返回Future"""
+        future = Future()
+        self._queue.put((func, future))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+        return future
+
+    def in_writer(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            jobs = [(func, future) for func, future in jobs if future.set_running_or_notify_cancel()]
+            if jobs:
+                self._execute(jobs)
+
+    def _execute(self, jobs: list):
+        self.stats["jobs"] += len(jobs)
+        self.stats["batches"] += 1
+        if len(jobs) == 1:
+            self._execute_one(*jobs[0])
+            return
+        session = self.session_factory()
+        try:
+            results = [func(session) for func, _ in jobs]
+            session.commit()
+        except Exception:
+            session.rollback()
+            results = None
+        finally:
+            session.close()
+        if results is None:
+            self.stats["retries"] += 1
+            for func, future in jobs:
+                self._execute_one(func, future)
+            return
+        for (_, future), result in zip(jobs, results):
+            future.set_result(result)
+
+    def _execute_one(self, func, future: Future):
+        session = self.session_factory()
+        try:
+            result = func(session)
+            session.commit()
+            future.set_result(result)
+        except Exception as e:
+            session.rollback()
+            self.stats["errors"] += 1
+            future.set_exception(e)
+        finally:
+            session.close()
+
+_sqlite_writers = {}
+_sqlite_writers_lock = threading.Lock()
+
+def get_sqlite_writer(con_str: str) -> Optional[SQLiteWriter]:
+    """SQLite并启用单线程写入时返回该数据库的写入线程，否则返回None"""
+    if not con_str or not con_str.startswith('sqlite:///') or cfg.get("sqlite.writer", True) != True:
+        return None
+    with _sqlite_writers_lock:
+        writer = _sqlite_writers.get(con_str)
+        if writer is None:
+            _, session_factory = engine_registry.get(con_str, "writer", tag="写入线程")
+            writer = SQLiteWriter(session_factory, batch_size=int(cfg.get("sqlite.writer_batch", 50)))
+            _sqlite_writers[con_str] = writer
+        return writer
+
+
+def detach(session: Session, obj):
+    """在 DB.write 的写操作中返回ORM对象时使用：写入后从会话中移除，提交后仍可读取属性"""
+    session.flush()
+    session.refresh(obj)
+    session.expunge(obj)
+    return obj
+
+
+def read_connection_str() -> Optional[str]:
+    """只读副本的连接字符串(db_read)，未配置返回None"""
+    con_str = cfg.get("db_read", None)
+    return con_str or None
+
+class ReplicaHealth:
+    """只读副本的可用状态
+
+    连接副本失败后在 db_read_retry 秒内直接使用主库，之后再尝试副本。
+    """
+
+    def __init__(self):
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "fallbacks": 0, "failures": 0}
+
+    def available(self, con_str: str) -> bool:
+        with self._lock:
+            return time.time() >= self._retry_at.get(con_str, 0)
+
+    def mark_success(self):
+        with self._lock:
+            self.stats["reads"] += 1
+
+    def mark_fallback(self):
+        with self._lock:
+            self.stats["fallbacks"] += 1
+
+    def mark_failed(self, con_str: str, error: Exception):
+        retry = int(cfg.get("db_read_retry", 30) or 30)
+        with self._lock:
+            self._retry_at[con_str] = time.time() + retry
+            self.stats["failures"] += 1
+            self.stats["fallbacks"] += 1
+        print_warning(f"只读副本连接失败，{retry}秒内使用主库: {error}")
+
+replica_health = ReplicaHealth()
+
+
+class EngineRegistry:
+    """进程内共享的数据库引擎
+
+    按 (连接字符串, 角色) 在首次使用时创建引擎和会话工厂，之后所有 Db 实例共用同一个连接池，
+    Db 的 tag 只作为统计标签记录使用方。
+    """
+
+    def __init__(self):
+        self._engines = {}
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, con_str: str, role: str = "primary", tag: str = "默认"):
+        """获取(必要时创建)引擎和会话工厂
+
+        Returns:
+            (engine, session_factory)
+        """
+        key = (con_str, role)
+        with self._lock:
+            item = self._engines.get(key)
+            if item is None:
+                engine = self._create_engine(con_str, tag, role)
+                if role.startswith("async"):
+                    from sqlalchemy.ext.asyncio import async_sessionmaker
+                    item = (engine, async_sessionmaker(bind=engine, autoflush=True, expire_on_commit=False))
+                else:
+                    item = (engine, sessionmaker(bind=engine, autoflush=True, expire_on_commit=True, future=True))
+                self._engines[key] = item
+                print_success(f"[{tag}]连接初始化({role})")
+            self._tags.setdefault(key, set()).add(tag)
+        return item
+
+    def _create_engine(self, con_str: str, tag: str, role: str = "primary") -> Engine:
         try:
-            self.connection_str=con_str
             # 检查SQLite数据库文件是否存在
             if con_str.startswith('sqlite:///'):
                 import os
@@ -49,16 +273,16 @@ class Db:
                     except Exception as e:
                         pass
                     open(db_path, 'w').close()
-            
+        
             # 根据数据库类型配置连接池参数
             # Supabase Free 限制：最大 20 个连接（无 Pooler）
             # 为了安全，我们设置最大连接数为 15（pool_size + max_overflow <= 15）
             is_postgresql = con_str.startswith('postgresql://') or con_str.startswith('postgres://')
             is_supabase = 'supabase.co' in con_str or 'supabase' in con_str.lower()
-            
+        
             # 初始化连接参数配置
             connect_args_config = {}
-            
+        
             if is_postgresql or is_supabase:
                 # Supabase Pooler 有两种模式：
                 # 1. Session 模式（端口 5432）：每个应用实例只能使用 pool_size 个连接，不支持 max_overflow
@@ -72,19 +296,19 @@ class Db:
                         # Transaction 模式：支持连接池，可以使用 max_overflow
                         pool_size = 5
                         max_overflow = 10  # Transaction 模式支持 overflow
-                        print_info(f"[{self.tag}] 检测到 Supabase Pooler Transaction 模式（端口 6543），使用连接池配置: pool_size={pool_size}, max_overflow={max_overflow}")
+                        print_info(f"[{tag}] 检测到 Supabase Pooler Transaction 模式（端口 6543），使用连接池配置: pool_size={pool_size}, max_overflow={max_overflow}")
                     else:
                         # Session 模式（默认端口 5432）：限制严格，不支持 max_overflow
                         pool_size = 3
                         max_overflow = 0  # Session 模式不支持 overflow
-                        print_warning(f"[{self.tag}] 检测到 Supabase Pooler Session 模式（端口 5432），连接数限制严格: pool_size={pool_size}, max_overflow={max_overflow}")
-                        print_warning(f"[{self.tag}] 建议使用 Transaction 模式（端口 6543）以获得更好的连接池支持")
+                        print_warning(f"[{tag}] 检测到 Supabase Pooler Session 模式（端口 5432），连接数限制严格: pool_size={pool_size}, max_overflow={max_overflow}")
+                        print_warning(f"[{tag}] 建议使用 Transaction 模式（端口 6543）以获得更好的连接池支持")
                 else:
                     # 直接连接：使用原始配置
                     pool_size = 5
                     max_overflow = 10
-                    print_info(f"[{self.tag}] 检测到 PostgreSQL/Supabase 直接连接，使用连接池配置: pool_size={pool_size}, max_overflow={max_overflow}")
-                
+                    print_info(f"[{tag}] 检测到 PostgreSQL/Supabase 直接连接，使用连接池配置: pool_size={pool_size}, max_overflow={max_overflow}")
+            
                 pool_recycle = 300  # PostgreSQL 连接回收时间（5分钟）
                 pool_pre_ping = True  # 连接前检查连接是否有效
                 # 添加连接参数：设置查询超时和连接超时
@@ -93,12 +317,19 @@ class Db:
                     "options": "-c statement_timeout=30000"  # 查询超时30秒（PostgreSQL）
                 }
             elif con_str.startswith('sqlite:///'):
-                # SQLite 配置：不需要连接池
-                pool_size = 1
-                max_overflow = 0
-                pool_recycle = None
+                # SQLite 配置：WAL模式下多个读连接可以并发，写入连接只保留一个(见 SQLiteWriter)
+                if role == "writer":
+                    pool_size = 1
+                    max_overflow = 0
+                else:
+                    pool_size = int(cfg.get("sqlite.pool_size", 5))
+                    max_overflow = 5
+                pool_recycle = -1  # SQLite 连接不需要回收
                 pool_pre_ping = False
-                connect_args_config = {"check_same_thread": False}
+                connect_args_config = {
+                    "check_same_thread": False,
+                    "timeout": int(cfg.get("sqlite.busy_timeout", 5000)) / 1000,
+                }
             else:
                 # MySQL 等其他数据库：中等配置
                 pool_size = 5
@@ -106,28 +337,128 @@ class Db:
                 pool_recycle = 3600  # 1小时
                 pool_pre_ping = True
                 connect_args_config = {}
-            
+        
+            # 按角色单独配置连接池大小，如 db_pool.read.size
+            pool_config = cfg.get(f"db_pool.{role}", None) if role != "writer" else None
+            if isinstance(pool_config, dict):
+                if pool_config.get("size") not in (None, ""):
+                    pool_size = int(pool_config["size"])
+                if pool_config.get("overflow") not in (None, ""):
+                    max_overflow = int(pool_config["overflow"])
+
             # 准备连接参数
             connect_args = connect_args_config
-            
+        
             # 对于PostgreSQL/Supabase，不使用AUTOCOMMIT，使用默认的READ COMMITTED
             # AUTOCOMMIT可能导致事务问题
             isolation_level_config = None if (is_postgresql or is_supabase) else "AUTOCOMMIT"
-            
-            self.engine = create_engine(con_str,
-                                     pool_size=pool_size,          # 最小空闲连接数
-                                     max_overflow=max_overflow,      # 允许的最大溢出连接数（总连接数 = pool_size + max_overflow）
-                                     pool_timeout=90,      # 获取连接时的超时时间（秒）- 增加到90秒，给多进程启动更多时间
-                                     echo=False,
-                                     pool_recycle=pool_recycle,  # 连接池回收时间（秒）
-                                     pool_pre_ping=pool_pre_ping,  # 连接前检查连接是否有效（防止使用已断开的连接）
-                                     isolation_level=isolation_level_config,  # PostgreSQL使用默认隔离级别
-                                     connect_args=connect_args
-                                     )
-            self.session_factory=self.get_session_factory()
+            if role == "writer":
+                # 写入连接需要显式事务才能批量提交
+                isolation_level_config = None
+        
+            if role.startswith("async"):
+                # 异步引擎使用对应的异步驱动，驱动的连接参数与同步驱动不同
+                from sqlalchemy.ext.asyncio import create_async_engine
+                con_str, connect_args = async_url(con_str), async_connect_args(con_str, connect_args)
+            engine = (create_async_engine if role.startswith("async") else create_engine)(con_str,
+                                   pool_size=pool_size,          # 最小空闲连接数
+                                   max_overflow=max_overflow,      # 允许的最大溢出连接数（总连接数 = pool_size + max_overflow）
+                                   pool_timeout=90,      # 获取连接时的超时时间（秒）- 增加到90秒，给多进程启动更多时间
+                                   echo=False,
+                                   pool_recycle=pool_recycle,  # 连接池回收时间（秒）
+                                   pool_pre_ping=pool_pre_ping,  # 连接前检查连接是否有效（防止使用已断开的连接）
+                                   isolation_level=isolation_level_config,  # PostgreSQL使用默认隔离级别
+                                   connect_args=connect_args
+                                   )
+            if con_str.startswith('sqlite'):
+                setup_sqlite(engine.sync_engine if role.startswith("async") else engine, writer=(role == "writer"))
+            return engine
         except Exception as e:
             print(f"Error creating database connection: {e}")
             raise
+
+    def get_stats(self) -> list:
+        """各引擎的连接池状态及使用方标签"""
+        stats = []
+        with self._lock:
+            items = list(self._engines.items())
+        for (con_str, role), (engine, _) in items:
+            pool = engine.pool
+            stats.append({
+                "dialect": engine.dialect.name,
+                "role": role,
+                "tags": sorted(self._tags.get((con_str, role), ())),
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            })
+            if role in ("read", "async_read"):
+                stats[-1]["replica"] = dict(replica_health.stats)
+            writer = _sqlite_writers.get(con_str) if role == "writer" else None
+            if writer is not None:
+                stats[-1]["writer"] = dict(writer.stats)
+        return stats
+
+    def dispose(self):
+        """关闭所有连接池，进程fork后或退出前调用"""
+        with self._lock:
+            for engine, _ in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._tags.clear()
+
+engine_registry = EngineRegistry()
+
+
+class Db:
+    connection_str: str=None
+    role: str="primary"
+    def __init__(self,tag:str="默认",User_In_Thread=True):
+        self.Session= None
+        self._engine = None
+        self._session_factory = None
+        self.User_In_Thread=User_In_Thread
+        self.tag=tag
+    @property
+    def engine(self) -> Engine:
+        # 首次使用时才从共享注册表获取引擎
+        if self._engine is None:
+            self.init(self.connection_str or cfg.get("db"))
+        return self._engine
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            self.init(self.connection_str or cfg.get("db"))
+        return self._session_factory
+    def get_engine(self) -> Engine:
+        """Return the SQLAlchemy engine for this database connection."""
+        return self.engine
+    def get_session_factory(self):
+        return self.session_factory
+    def init(self, con_str: str) -> None:
+        """绑定到共享的数据库引擎(同一连接字符串只创建一次)"""
+        self.connection_str=con_str
+        self._engine, self._session_factory = engine_registry.get(con_str, self.role, tag=self.tag)
+    def write(self, func):
+        """执行写操作 func(session) 并提交，返回其结果
+
+        SQLite启用单线程写入时交给写入线程与其他写操作合并提交，其他数据库在当前线程提交。
+        func 可能在其他线程执行，返回值不要使用需要会话的ORM对象(需要时用 detach 返回)。
+        """
+        writer = get_sqlite_writer(self.connection_str or cfg.get("db"))
+        if writer is None or writer.in_writer():
+            # 使用独立的会话，不关闭调用方线程中的 scoped_session，调用方持有的ORM对象仍可使用
+            session = self.session_factory()
+            try:
+                result = func(session)
+                session.commit()
+                return result
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        return writer.submit(func).result()
     def create_tables(self):
         """Create all tables defined in models"""
         from core.models.base import Base as B # 导入所有模型
@@ -157,7 +488,8 @@ class Db:
             session=DB.get_session()
             article = session.query(Article).filter(Article.id == art.id).first()
             if article is not None:
-                session.delete(article)
+                with article_stats.track(session, [article.id]):
+                    session.delete(article)
                 session.commit()
                 return True
         except Exception as e:
@@ -179,31 +511,41 @@ class Db:
             from datetime import datetime
             from core.models.base import DATA_STATUS
             
-            # 使用 session_scope 确保连接正确关闭
-            with self.session_scope(auto_commit=True) as session:
-                art = Article(**article_data)
-                if art.id:
-                   art.id=f"{str(art.mp_id)}-{art.id}".replace("MP_WXS_","")
-                
+            art = Article(**article_data)
+            if art.id:
+               art.id=f"{str(art.mp_id)}-{art.id}".replace("MP_WXS_","")
+            if art.created_at is None:
+                art.created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if art.updated_at is None:
+                art.updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            art.created_at=datetime.strptime(art.created_at ,'%Y-%m-%d %H:%M:%S')
+            art.updated_at=datetime.strptime(art.updated_at,'%Y-%m-%d %H:%M:%S')
+            art.status=DATA_STATUS.ACTIVE
+            art.url_hash=url_hash(art.url)
+
+            # 提交后实例已过期，先取出写入全文索引的字段
+            doc = {"id": art.id, "title": art.title, "description": art.description, "content": art.content}
+
+            def _add(session):
                 if check_exist:
-                    # 检查文章是否已存在
-                    existing_article = session.query(Article).filter(
-                        (Article.url == art.url) | (Article.id == art.id)
-                    ).first()
+                    # 检查文章是否已存在(按链接摘要查询，使用索引)
+                    exist_filter = Article.id == art.id
+                    if art.url_hash:
+                        exist_filter = exist_filter | ((Article.url_hash == art.url_hash) & (Article.url == art.url))
+                    existing_article = session.query(Article.id).filter(exist_filter).first()
                     if existing_article is not None:
                         print_warning(f"Article already exists: {art.id}")
                         return False
-                
-                if art.created_at is None:
-                    art.created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                if art.updated_at is None:
-                    art.updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                art.created_at=datetime.strptime(art.created_at ,'%Y-%m-%d %H:%M:%S')
-                art.updated_at=datetime.strptime(art.updated_at,'%Y-%m-%d %H:%M:%S')
-                art.content=art.content
-                art.status=DATA_STATUS.ACTIVE
                 session.add(art)
-                # commit 会在 session_scope 退出时自动执行
+                # 在写操作内flush，主键冲突时只影响本篇文章
+                session.flush()
+                article_stats.added(session, [(art.mp_id, art.status, bool(doc["content"]))])
+                return True
+
+            if not self.write(_add):
+                return False
+            from core.search import search_index
+            search_index.index_articles([doc])
                 
         except Exception as e:
             if "UNIQUE" in str(e) or "Duplicate entry" in str(e) or "duplicate key" in str(e).lower():
@@ -215,6 +557,91 @@ class Db:
             return False
         return True    
         
+    def add_articles(self, articles: List[dict], chunk_size: int = 100) -> List[str]:
+        """批量添加文章，已存在(主键冲突)的文章忽略
+
+        按数据库使用 INSERT ... ON CONFLICT DO NOTHING / INSERT IGNORE 分块写入，每块一个事务
+
+        Args:
+            articles: 文章数据字典列表，id为采集到的原始ID
+            chunk_size: 每次写入的文章数量
+
+        Returns:
+            新增文章的ID列表(已转换为入库后的ID，保持传入顺序)
+        """
+        from datetime import datetime
+        from core.models.base import DATA_STATUS
+        # 正文单独写入 article_contents
+        columns = {column.name for column in Article.__table__.columns} - {"content"}
+        now = datetime.now().replace(microsecond=0)
+        rows = {}
+        contents = {}
+        for article_data in articles:
+            row = {key: value for key, value in article_data.items() if key in columns}
+            if row.get("id") and row.get("mp_id"):
+                row["id"] = f"{str(row['mp_id'])}-{row['id']}".replace("MP_WXS_", "")
+            if not row.get("id") or row["id"] in rows:
+                continue
+            contents[row["id"]] = article_data.get("content")
+            for key in ("created_at", "updated_at"):
+                value = row.get(key)
+                row[key] = datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if isinstance(value, str) else (value or now)
+            row["status"] = DATA_STATUS.ACTIVE
+            row["url_hash"] = url_hash(row.get("url"))
+            rows[row["id"]] = row
+        rows = list(rows.values())
+        # 各行字段需一致才能合并为一条语句
+        for row in rows:
+            for key in columns:
+                row.setdefault(key, None)
+        from core.search import search_index
+        new_ids = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                inserted = self.write(lambda session: self._insert_ignore(session, chunk, contents))
+            except Exception as e:
+                print_error(f"Failed to add articles: {e}")
+                continue
+            new_ids.extend(inserted)
+            inserted = set(inserted)
+            search_index.index_articles([dict(row, content=contents.get(row["id"])) for row in chunk if row["id"] in inserted])
+        return new_ids
+
+    def _insert_ignore(self, session, rows: List[dict], contents: dict = None) -> List[str]:
+        """写入一块文章及新文章的正文，返回实际插入的ID"""
+        dialect = session.get_bind().dialect
+        ids = [row["id"] for row in rows]
+        if dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(Article).values(rows).on_conflict_do_nothing()
+        elif dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(Article).values(rows).on_conflict_do_nothing()
+        elif dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(Article).values(rows).prefix_with("IGNORE")
+        else:
+            from sqlalchemy import insert
+            stmt = insert(Article).values(rows)
+        if dialect.name in ("postgresql", "sqlite") and getattr(dialect, "insert_returning", False):
+            inserted = {row[0] for row in session.execute(stmt.returning(Article.id))}
+        else:
+            # 不支持RETURNING时先查出已存在的ID
+            existing = {row[0] for row in session.query(Article.id).filter(Article.id.in_(ids))}
+            session.execute(stmt)
+            inserted = set(ids) - existing
+        if contents:
+            from core.content_store import content_row
+            from core.models.article import ArticleContent
+            values = [content_row(article_id, contents[article_id]) for article_id in ids if article_id in inserted and contents.get(article_id)]
+            if values:
+                # 清除已删除文章遗留的正文
+                session.query(ArticleContent).filter(ArticleContent.article_id.in_([value["article_id"] for value in values])).delete(synchronize_session=False)
+                session.execute(insert(ArticleContent.__table__), values)
+        article_stats.added(session, [(row["mp_id"], row["status"], bool((contents or {}).get(row["id"]))) for row in rows if row["id"] in inserted])
+        return [article_id for article_id in ids if article_id in inserted]
+
     def get_articles(self, id:str=None, limit:int=30, offset:int=0) -> List[Article]:
         try:
             data = self.get_session().query(Article).limit(limit).offset(offset)
@@ -266,11 +693,11 @@ class Db:
 
     def get_faker_id(self, mp_id:str):
         """获取公众号的faker_id"""
-        data = self.get_mps(mp_id)
+        data = feed_cache.get(mp_id) if mp_id else None
         if data is None:
             print_error(f"未找到ID为 {mp_id} 的公众号")
             return None
-        return data.faker_id if hasattr(data, 'faker_id') else None
+        return data.get("faker_id")
     def expire_all(self):
         if self.Session:
             self.Session.expire_all()    
@@ -351,8 +778,29 @@ class Db:
         event.listen(Article,'after_update', receive_after_update)
         event.listen(MessageTask,'after_update',receive_after_update)
         
+    def read_session(self) -> Session:
+        """获取只读查询使用的会话(需自行close)
+
+        配置了 db_read 且副本可用时连接只读副本，副本连接失败时回退到主库
+        """
+        read_str = read_connection_str()
+        if read_str and replica_health.available(read_str):
+            _, factory = engine_registry.get(read_str, "read", tag=self.tag)
+            session = factory()
+            try:
+                # 先检出连接，副本不可用时立即回退
+                session.connection()
+                replica_health.mark_success()
+                return session
+            except Exception as e:
+                session.close()
+                replica_health.mark_failed(read_str, e)
+        elif read_str:
+            replica_health.mark_fallback()
+        return self.session_factory()
+
     @contextmanager
-    def session_scope(self, auto_commit=True):
+    def session_scope(self, auto_commit=True, read_only=False):
         """上下文管理器，确保 session 被正确关闭
         
         使用示例:
@@ -364,8 +812,12 @@ class Db:
             # 只读操作（不需要 commit）
             with DB.session_scope(auto_commit=False) as session:
                 items = session.query(Item).all()
+
+            # 只读查询，配置了 db_read 时使用只读副本
+            with DB.session_scope(auto_commit=False, read_only=True) as session:
+                items = session.query(Item).all()
         """
-        session = self.get_session()
+        session = self.read_session() if read_only and not auto_commit else self.get_session()
         try:
             yield session
             if auto_commit:
@@ -418,5 +870,4 @@ class Db:
                     print_warning(f"[{self.tag}] Error closing session: {e}")
 
 # 全局数据库实例
-DB = Db(User_In_Thread=True)
-DB.init(cfg.get("db"))
\ No newline at end of file
+DB = Db(User_In_Thread=True)
\ No newline at end of file
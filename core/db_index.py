@@ -0,0 +1,105 @@
+"""文章常用查询的索引迁移
+
+订阅源按 mp_id 过滤、publish_time 排序；文章列表排除已删除文章、按 created_at 排序；
+入库查重按链接摘要(url_hash)查询。
+索引按数据库类型创建，尽量不长时间锁表：
+PostgreSQL 使用 CREATE INDEX CONCURRENTLY，MySQL 使用 ALGORITHM=INPLACE, LOCK=NONE，
+url_hash 分批回填，每批单独提交。
+"""
+from sqlalchemy import inspect, text
+from core.print import print_info, print_warning, print_error
+from core.models.article import url_hash
+
+# where 为部分索引条件(SQLite/PostgreSQL)，dialects 为空表示所有数据库
+INDEXES = [
+    {"name": "ix_articles_mp_publish", "table": "articles", "columns": ["mp_id", "publish_time", "id"]},
+    # MySQL不支持部分索引，按 状态+创建时间 建立索引
+    {"name": "ix_articles_active_created", "table": "articles", "columns": ["created_at", "id"],
+     "where": "status <> 1000", "mysql_columns": ["status", "created_at", "id"]},
+    {"name": "ix_articles_url_hash", "table": "articles", "columns": ["url_hash"]},
+    {"name": "ix_feeds_faker_id", "table": "feeds", "columns": ["faker_id"]},
+]
+
+URL_HASH_BATCH = 500
+
+
+def _indexes_for(dialect: str) -> list:
+    return [index for index in INDEXES if not index.get("dialects") or dialect in index["dialects"]]
+
+
+def missing_indexes(engine) -> list:
+    """当前数据库缺少的索引名称"""
+    inspector = inspect(engine)
+    missing = []
+    existing = {}
+    for index in _indexes_for(engine.dialect.name):
+        table = index["table"]
+        if table not in existing:
+            existing[table] = {item["name"] for item in inspector.get_indexes(table)} if inspector.has_table(table) else set()
+        if index["name"] not in existing[table]:
+            missing.append(index["name"])
+    return missing
+
+
+def _create_sql(index: dict, dialect: str) -> str:
+    name, table = index["name"], index["table"]
+    if dialect == "mysql":
+        columns = ", ".join(f"`{column}`" for column in index.get("mysql_columns") or index["columns"])
+        return f"ALTER TABLE `{table}` ADD INDEX `{name}` ({columns}), ALGORITHM=INPLACE, LOCK=NONE"
+    columns = ", ".join(f'"{column}"' for column in index["columns"])
+    where = f" WHERE {index['where']}" if index.get("where") else ""
+    concurrently = "CONCURRENTLY " if dialect == "postgresql" else ""
+    return f'CREATE INDEX {concurrently}IF NOT EXISTS "{name}" ON "{table}" ({columns}){where}'
+
+
+def backfill_url_hash(engine, batch_size: int = URL_HASH_BATCH) -> int:
+    """为已有文章分批计算 url_hash，每批单独提交，不长时间持有锁"""
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text("SELECT id, url FROM articles WHERE url_hash IS NULL AND url IS NOT NULL AND url <> '' LIMIT :limit"),
+                                {"limit": batch_size}).fetchall()
+            if not rows:
+                break
+            conn.execute(text("UPDATE articles SET url_hash = :url_hash WHERE id = :id"),
+                         [{"id": row[0], "url_hash": url_hash(row[1])} for row in rows])
+        total += len(rows)
+    if total:
+        print_info(f"已回填文章链接摘要: {total}篇")
+    return total
+
+
+def migrate_indexes(engine) -> list:
+    """回填 url_hash 并创建缺少的索引(需先同步表结构，确保 url_hash 字段存在)
+
+    Returns:
+        新创建的索引名称
+    """
+    dialect = engine.dialect.name
+    backfill_url_hash(engine)
+    missing = set(missing_indexes(engine))
+    created = []
+    for index in _indexes_for(dialect):
+        if index["name"] not in missing:
+            continue
+        try:
+            # CREATE INDEX CONCURRENTLY 不能在事务中执行
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(_create_sql(index, dialect)))
+            created.append(index["name"])
+            print_info(f"创建索引: {index['name']}")
+        except Exception as e:
+            print_error(f"创建索引 {index['name']} 失败: {e}")
+    return created
+
+
+def check_indexes(engine) -> list:
+    """启动时检查索引，缺少时提示执行初始化"""
+    try:
+        missing = missing_indexes(engine)
+    except Exception as e:
+        print_warning(f"检查数据库索引失败: {e}")
+        return []
+    if missing:
+        print_warning(f"数据库缺少索引: {', '.join(missing)}，请使用 -init True 启动以创建索引")
+    return missing
@@ -0,0 +1,93 @@
+"""公众号元数据缓存
+
+文章列表、简报、订阅源和消息推送按公众号ID读取名称、头像、简介和faker_id，
+这些字段很少变化，进程内缓存后按需批量加载，不再逐篇查询 Feed。
+新增、修改、删除和导入公众号时显式失效；多进程部署时其他进程的缓存按 cache.feed_ttl(秒) 过期。
+"""
+import threading
+import time
+from core.config import cfg
+from core.models.feed import Feed
+
+FIELDS = ("id", "mp_name", "mp_cover", "mp_intro", "faker_id", "status", "updated_at")
+
+
+class FeedCache:
+    def __init__(self, ttl: int = None):
+        self._ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> int:
+        if self._ttl is None:
+            self._ttl = int(cfg.get("cache.feed_ttl", 300) or 0)
+        return self._ttl
+
+    def _load(self, session, ids: list) -> dict:
+        loaded = {}
+        columns = [getattr(Feed, name) for name in FIELDS]
+        for start in range(0, len(ids), 500):
+            for row in session.query(*columns).filter(Feed.id.in_(ids[start:start + 500])):
+                loaded[row[0]] = dict(zip(FIELDS, row))
+        return loaded
+
+    def get_many(self, mp_ids, session=None) -> dict:
+        """批量获取公众号元数据 {公众号ID: 元数据}，未命中的一次查询加载，不存在的公众号不在结果中"""
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with self._lock:
+            for mp_id in dict.fromkeys(mp_id for mp_id in mp_ids if mp_id):
+                item = self._items.get(mp_id)
+                if item is not None and item[0] > now:
+                    result[mp_id] = item[1]
+                else:
+                    missing.append(mp_id)
+        self.hits += len(result)
+        if not missing:
+            return result
+        self.misses += len(missing)
+        if session is None:
+            from core.db import DB
+            with DB.session_scope(auto_commit=False, read_only=True) as session:
+                loaded = self._load(session, missing)
+        else:
+            loaded = self._load(session, missing)
+        expires = now + self.ttl
+        with self._lock:
+            for mp_id, meta in loaded.items():
+                self._items[mp_id] = (expires, meta)
+        result.update(loaded)
+        return result
+
+    def get(self, mp_id: str, session=None) -> dict:
+        """获取单个公众号元数据，不存在时返回None"""
+        if not mp_id:
+            return None
+        return self.get_many([mp_id], session=session).get(mp_id)
+
+    def feed(self, mp_id: str, session=None) -> Feed:
+        """以(未关联会话的) Feed 对象返回公众号元数据，不存在时返回None"""
+        meta = self.get(mp_id, session=session)
+        return Feed(**meta) if meta is not None else None
+
+    def name(self, mp_id: str, default: str = None, session=None) -> str:
+        meta = self.get(mp_id, session=session)
+        return (meta or {}).get("mp_name") or default
+
+    def invalidate(self, mp_id: str = None):
+        """公众号变化后失效缓存，不传ID时清空全部"""
+        with self._lock:
+            if mp_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(mp_id, None)
+
+    def get_stats(self) -> dict:
+        return {"items": len(self._items), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+feed_cache = FeedCache()
@@ -0,0 +1,161 @@
+"""共用的HTTP客户端
+
+公众号采集、正文抓取、头像下载和消息通知共用一个 httpx 连接池(保持连接)，不再每次请求新建连接：
+- http.max_connections / http.keepalive 连接池大小，http.per_host 每个域名同时请求的数量
+- http.timeout 超时秒数(连接超时取其一半，最多5秒)
+- http.retries 重试次数，http.backoff 首次重试等待秒数(之后加倍)：
+  连接失败时所有请求都重试(请求尚未发出)，超时、429和5xx只重试GET请求
+- http.http2 安装 h2 后启用HTTP/2
+连接池不保存响应中的Cookie(各调用方自行在请求头中携带)，避免不同登录会话和通知地址之间串用。
+"""
+import threading
+import time
+from collections import deque
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import urlparse
+import httpx
+from core.config import cfg
+from core.print import print_warning
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# 按域名保留的最近请求耗时数量(用于计算平均值和P95)
+LATENCY_SAMPLES = 200
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(sum(latencies) * 1000 / len(latencies), 1) if latencies else 0,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else 0,
+        }
+
+
+class HttpClient:
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._semaphores = {}
+        self.http2 = False
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create()
+        return self._client
+
+    def _create(self) -> httpx.Client:
+        timeout = float(cfg.get("http.timeout", 10) or 10)
+        limits = httpx.Limits(max_connections=int(cfg.get("http.max_connections", 50) or 50),
+                              max_keepalive_connections=int(cfg.get("http.keepalive", 20) or 20),
+                              keepalive_expiry=30)
+        http2 = bool(cfg.get("http.http2", False))
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print_warning("未安装h2，HTTP/2未启用(pip install httpx[http2])")
+                http2 = False
+        self.http2 = http2
+        return httpx.Client(timeout=httpx.Timeout(timeout, connect=min(5.0, timeout / 2)), limits=limits,
+                            http2=http2, follow_redirects=True,
+                            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])))
+
+    def _host(self, url: str) -> str:
+        return urlparse(str(url)).netloc or "-"
+
+    def _semaphore(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(max(1, int(cfg.get("http.per_host", 10) or 1)))
+                self._hosts[host] = HostStats()
+            return semaphore
+
+    def request(self, method: str, url: str, retries: int = None, **kwargs) -> httpx.Response:
+        """发送请求，按重试策略处理连接失败、超时和服务端错误，返回最后一次的响应"""
+        method = method.upper()
+        host = self._host(url)
+        semaphore = self._semaphore(host)
+        stats = self._hosts[host]
+        retries = int(cfg.get("http.retries", 2) or 0) if retries is None else retries
+        delay = float(cfg.get("http.backoff", 0.5) or 0)
+        idempotent = method in ("GET", "HEAD", "OPTIONS")
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                with semaphore:
+                    response = self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error, retryable = e, True
+            except (httpx.TimeoutException, httpx.RemoteProtocolError, httpx.ReadError) as e:
+                error, retryable = e, idempotent
+            except httpx.HTTPError:
+                with self._lock:
+                    stats.requests += 1
+                    stats.errors += 1
+                raise
+            else:
+                error, retryable = None, idempotent and response.status_code in RETRY_STATUS
+            with self._lock:
+                stats.requests += 1
+                stats.latencies.append(time.monotonic() - start)
+                if error is not None:
+                    stats.errors += 1
+            if not retryable or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            with self._lock:
+                stats.retries += 1
+            if error is None:
+                response.close()
+            time.sleep(delay * (2 ** (attempt - 1)))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _pool_stats(self) -> dict:
+        stats = {}
+        try:
+            # httpcore 内部状态，版本不同时忽略
+            connections = self._client._transport._pool.connections
+            stats["connections"] = len(connections)
+            stats["idle"] = sum(1 for connection in connections if connection.is_idle())
+        except Exception:
+            pass
+        return stats
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            hosts = {host: item.to_dict() for host, item in self._hosts.items()}
+        stats = {"http2": self.http2, "hosts": hosts}
+        if self._client is not None:
+            stats.update(self._pool_stats())
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+http_client = HttpClient()
@@ -1,5 +1,5 @@
 # 导入文章模型
-from .article import Article 
+from .article import Article, ArticleContent
 # 导入订阅源模型
 from .feed import Feed
 # 导入用户模型
@@ -8,6 +8,8 @@ from .user import User
 from .message_task import MessageTask
 # 导入配置管理模型
 from .config_management import ConfigManagement
+# 导入文章统计模型
+from .article_stats import ArticleStats
 # 导入简报模型
 from .brief import Brief
 # 导入基础模型
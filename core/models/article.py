@@ -1,4 +1,51 @@
 from  .base import Base,Column,String,Integer,DateTime,Text,DATA_STATUS
+from sqlalchemy import LargeBinary,and_,or_
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.orm import relationship,deferred,selectinload,undefer
+from datetime import datetime
+import hashlib
+import zlib
+def url_hash(url:str):
+    """文章链接的摘要，按链接查重时使用定长索引字段"""
+    return hashlib.md5(url.encode("utf-8")).hexdigest() if url else None
+
+# 正文压缩方式，raw 表示未压缩(压缩后没有变小)
+CONTENT_CODEC = "zlib"
+
+def compress_content(text:str):
+    """压缩正文，返回 (压缩方式, 数据)"""
+    raw = text.encode("utf-8")
+    data = zlib.compress(raw, 6)
+    if len(data) >= len(raw):
+        return "raw", raw
+    return CONTENT_CODEC, data
+
+def decompress_content(codec:str, data:bytes) -> str:
+    if data is None:
+        return None
+    if codec == "zlib":
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+class ArticleContent(Base):
+    """文章正文，与文章元数据分表压缩保存，按需加载"""
+    __tablename__ = 'article_contents'
+    article_id = Column(String(255), primary_key=True)
+    codec = Column(String(16))
+    data = Column(LargeBinary().with_variant(LONGBLOB(), "mysql"))
+    size = Column(Integer)
+    updated_at = Column(DateTime)
+
+    @property
+    def text(self) -> str:
+        return decompress_content(self.codec, self.data)
+
+    @text.setter
+    def text(self, value: str):
+        self.codec, self.data = compress_content(value)
+        self.size = len(value)
+        self.updated_at = datetime.now()
+
 class ArticleBase(Base):
     from_attributes = True
     __tablename__ = 'articles'
@@ -7,11 +54,46 @@ class ArticleBase(Base):
     title = Column(String(1000))
     pic_url = Column(String(500))
     url=Column(String(500))
+    url_hash=Column(String(32))
     description=Column(Text)
     status = Column(Integer,default=1)
     publish_time = Column(Integer,index=True)
     created_at = Column(DateTime)
-    updated_at = Column(DateTime)  
+    updated_at = Column(DateTime)
     is_export = Column(Integer)
 class Article(ArticleBase):
-    content = Column(Text)
+    # 旧版本保存在文章表中的正文，迁移到 article_contents 后置空，未迁移的文章仍从这里读取
+    legacy_content = deferred(Column("content", Text))
+    body = relationship(ArticleContent, primaryjoin="Article.id == foreign(ArticleContent.article_id)",
+                        uselist=False, lazy="select", cascade="all, delete-orphan")
+
+    @property
+    def content(self) -> str:
+        if self.body is not None:
+            return self.body.text
+        return self.legacy_content
+
+    @content.setter
+    def content(self, value: str):
+        if not value:
+            self.body = None
+        elif self.body is None:
+            self.body = ArticleContent(text=value)
+        else:
+            self.body.text = value
+        self.legacy_content = None
+
+    @classmethod
+    def has_content(cls):
+        """有正文的文章(查询条件)"""
+        return or_(cls.body.has(), and_(cls.legacy_content.isnot(None), cls.legacy_content != ""))
+
+    @classmethod
+    def load_content(cls) -> list:
+        """批量查询文章时一并加载正文的查询选项，避免逐篇查询"""
+        return [selectinload(cls.body), undefer(cls.legacy_content)]
+
+    def to_dict(self) -> dict:
+        data = {key: value for key, value in self.__dict__.items() if key not in ("_sa_instance_state", "body", "legacy_content")}
+        data["content"] = self.content
+        return data
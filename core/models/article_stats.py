@@ -0,0 +1,18 @@
+from  .base import Base,Column,String,Integer,DateTime
+class ArticleStats(Base):
+    #文章统计数据模型类，按公众号保存文章数量，写入文章时同步更新
+    __tablename__ = 'article_stats'
+    # 公众号ID，"*" 为全部公众号的合计
+    mp_id = Column(String(255), primary_key=True)
+    # 文章总数
+    all_count = Column(Integer, default=0)
+    # 已删除的文章数量
+    deleted_count = Column(Integer, default=0)
+    # 状态不正常(非ACTIVE)的文章数量
+    wrong_count = Column(Integer, default=0)
+    # 没有正文的文章数量
+    no_content_count = Column(Integer, default=0)
+    # 公众号数量(只在合计中统计)
+    feed_count = Column(Integer, default=0)
+    # 更新时间
+    updated_at = Column(DateTime)
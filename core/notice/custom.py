@@ -1,4 +1,4 @@
-import requests
+from core.http_client import http_client
 import json
 
 
@@ -17,10 +17,10 @@ def send_custom_message(webhook_url, title, text):
         "content": text
     }
     try:
-        response = requests.post(
+        response = http_client.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            content=json.dumps(data)
         )
         print(response.text)
     except Exception as e:
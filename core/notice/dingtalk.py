@@ -1,4 +1,4 @@
-import requests
+from core.http_client import http_client
 import json
 def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=[]):
     """
@@ -24,10 +24,10 @@ def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=
         }
     }
     try:
-        response = requests.post(
+        response = http_client.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            content=json.dumps(data)
         )
         print(response.text)
     except Exception as e:
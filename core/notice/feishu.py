@@ -1,4 +1,4 @@
-import requests
+from core.http_client import http_client
 import json
 
 def send_feishu_message(webhook_url, title, text):
@@ -37,10 +37,10 @@ def send_feishu_message(webhook_url, title, text):
         }
     }
     try:
-        response = requests.post(
+        response = http_client.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            content=json.dumps(data)
         )
         print(response.text)
     except Exception as e:
@@ -1,4 +1,4 @@
-import requests
+from core.http_client import http_client
 import json
 
 
@@ -21,10 +21,10 @@ def send_wechat_message(webhook_url, title, text):
         }
     }
     try:
-        response = requests.post(
+        response = http_client.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            content=json.dumps(data)
         )
         print(response.text)
     except Exception as e:
@@ -0,0 +1,84 @@
+"""游标(keyset)分页
+
+按 (排序字段, id) 倒序分页，下一页从上一页最后一条记录之后开始查询，
+查询耗时不随页数增长。游标对调用方是不透明的字符串。
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values) -> str:
+    """将最后一条记录的排序字段值编码为游标"""
+    data = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """解析游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if not isinstance(data, list):
+        raise ValueError("无效的分页游标")
+    return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) and "dt" in value else value for value in data]
+
+
+def keyset_filter(columns: list, values: list):
+    """倒序排列时位于游标之后的记录：(c1 < v1) or (c1 == v1 and c2 < v2) ...
+
+    排序字段需不为空(见 keyset_not_null)，条件只包含比较，可按 (c1, c2) 索引范围扫描
+    """
+    if not columns or len(columns) != len(values) or any(value is None for value in values):
+        raise ValueError("无效的分页游标")
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, keyset_filter(columns[1:], values[1:])))
+
+
+def keyset_not_null(columns: list) -> list:
+    """游标分页只包含排序字段不为空的记录
+
+    不同数据库倒序时空值排在最前(PostgreSQL)或最后(SQLite/MySQL)，统一排除后各页顺序一致，
+    首页和后续页使用相同条件，不会重复或遗漏。最后一个字段应为不为空的唯一字段(如id)。
+    """
+    return [column.isnot(None) for column in columns[:-1]]
+
+
+def keyset_page(query, columns: list, cursor: str = None, limit: int = 10, offset: int = 0, key=None):
+    """按游标查询一页
+
+    Args:
+        query: 未排序的查询
+        columns: 排序字段，最后一个应为唯一字段(如id)，排序字段为空的记录不返回
+        cursor: 上一页返回的next_cursor，为空时从第一页开始
+        limit: 每页数量
+        offset: 未传入游标时的偏移量，兼容按页码翻页
+        key: 从记录中取排序字段值的函数，默认按字段名读取属性
+
+    Returns:
+        (记录列表, 下一页游标)，没有下一页时游标为None
+    """
+    query = query.filter(*keyset_not_null(columns))
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor)))
+    query = query.order_by(*[column.desc() for column in columns])
+    if offset and not cursor:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [getattr(last, column.key) for column in columns]
+        next_cursor = encode_cursor(*values)
+    return rows, next_cursor
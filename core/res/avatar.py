@@ -3,7 +3,7 @@ from core.config import cfg
 import os
 import uuid
 import os
-import requests
+from core.http_client import http_client
 from urllib.parse import urlparse
 files_dir="data/files"
 avatar_dir=f"{files_dir}/avatars"
@@ -27,7 +27,7 @@ def save_avatar_locally(avatar_url):
     
     # 下载并保存文件
     try:
-        response = requests.get(avatar_url)
+        response = http_client.get(avatar_url)
         response.raise_for_status()
         with open(file_path, "wb") as f:
             f.write(response.content)
@@ -1,11 +1,236 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, timezone
 import os
+import re
 import json
-from core.content_format import format_content
+import time
+import atexit
+import hashlib
+import textwrap
+import threading
+import zlib
+from collections import OrderedDict
+from core.content_format import format_article_content
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 预压缩的缓存版本：Content-Encoding -> 文件后缀
+CACHE_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+def cache_encodings() -> list:
+    """需要预先生成的压缩版本，brotli未安装时只生成gzip"""
+    from core.config import cfg
+    if cfg.get("rss.compress", True) != True:
+        return []
+    return [encoding for encoding in CACHE_ENCODINGS if encoding != "br" or brotli is not None]
+
+def accept_encoding(header: str, available: list) -> str:
+    """根据Accept-Encoding从可用的压缩版本中选择，按q值和br优先的顺序，无可用版本返回None"""
+    if not header or not available:
+        return None
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    best = None
+    for encoding in CACHE_ENCODINGS:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+class CacheWriter:
+    """写入RSS缓存内容，写入过程中同时生成各压缩版本，每个版本的内容只压缩一次"""
+
+    def __init__(self, rss: "RSS", encodings: list = None):
+        self.rss = rss
+        self.encodings = cache_encodings() if encodings is None else encodings
+        self.paths = {None: rss.rss_file}
+        self.compressors = {}
+        for encoding in self.encodings:
+            self.paths[encoding] = rss.rss_file + CACHE_ENCODINGS[encoding]
+            if encoding == "gzip":
+                self.compressors[encoding] = zlib.compressobj(9, zlib.DEFLATED, 31)
+            else:
+                self.compressors[encoding] = brotli.Compressor(quality=9)
+        self.files = {encoding: open(rss._tmp_path(path), "wb") for encoding, path in self.paths.items()}
+
+    def write(self, data: bytes):
+        self.files[None].write(data)
+        for encoding, compressor in self.compressors.items():
+            self.files[encoding].write(compressor.compress(data) if encoding == "gzip" else compressor.process(data))
+
+    def commit(self, meta: dict = None):
+        """写完后替换缓存文件，压缩版本先于原始内容和元数据替换"""
+        for encoding, compressor in self.compressors.items():
+            self.files[encoding].write(compressor.flush() if encoding == "gzip" else compressor.finish())
+        for f in self.files.values():
+            f.close()
+        for encoding in self.encodings + [None]:
+            os.replace(self.files[encoding].name, self.paths[encoding])
+        meta = dict(meta or {})
+        meta["encodings"] = self.encodings
+        self.rss._save_meta(meta)
+
+    def discard(self):
+        for f in self.files.values():
+            f.close()
+            try:
+                os.remove(f.name)
+            except OSError:
+                pass
+
+
+# 图片地址添加/static/res/logo/前缀(已添加的不重复添加)
+LOGO_PREFIX_PATTERN = re.compile(r'(<img[^>]*src=["\'])(?!\/static\/res\/logo\/)([^"\']*)', re.IGNORECASE)
+
+def add_logo_prefix_to_urls(text: str) -> str:
+    try:
+        return LOGO_PREFIX_PATTERN.sub(r'\1/static/res/logo/\2', text)
+    except Exception:
+        return text
+
+
+class ContentCache:
+    """文章内容缓存，供 /rss/content/{id} 直接读取
+
+    按内容哈希判断是否变化，未变化的文章不重写文件；文件在后台线程中写入，
+    写入完成前的内容保存在内存中，可以直接读取。
+    """
+    cache_dir = os.path.normpath("data/cache/content")
+
+    def __init__(self, cache_dir: str = None, max_items: int = 20000):
+        if cache_dir is not None:
+            self.cache_dir = os.path.normpath(cache_dir)
+        self.max_items = max_items
+        # 已写入(或待写入)文件的内容哈希
+        self._hashes = OrderedDict()
+        # 待写入的内容：content_id -> (哈希, 内容)
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer = None
+        self.stats = {"writes": 0, "skipped": 0}
+
+    def _path(self, content_id: str) -> str:
+        path = os.path.normpath(f"{self.cache_dir}/{content_id}.json")
+        if not path.startswith(self.cache_dir):
+            raise ValueError("Invalid content path: Path traversal detected.")
+        return path
+
+    @staticmethod
+    def content_hash(content: dict) -> str:
+        raw = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, content_id: str, content_hash: str):
+        self._hashes[content_id] = content_hash
+        self._hashes.move_to_end(content_id)
+        while len(self._hashes) > self.max_items:
+            self._hashes.popitem(last=False)
+
+    def put(self, content_id: str, content: dict) -> bool:
+        """缓存文章内容，内容未变化时直接返回False"""
+        path = self._path(content_id)
+        content_hash = self.content_hash(content)
+        with self._lock:
+            if self._hashes.get(content_id) == content_hash:
+                self.stats["skipped"] += 1
+                return False
+            self._remember(content_id, content_hash)
+            self._pending[content_id] = (content_hash, dict(content))
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="content-cache-writer", daemon=True)
+                self._writer.start()
+        self._wakeup.set()
+        return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=5)
+            self._wakeup.clear()
+            self.flush()
+            with self._lock:
+                if not self._pending:
+                    self._writer = None
+                    return
+
+    def _read(self, content_id: str) -> dict:
+        try:
+            with open(self._path(content_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def flush(self):
+        """写入所有待写入的内容，文件中的哈希与待写入内容一致时跳过"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                content_id, (content_hash, content) = self._pending.popitem(last=False)
+            try:
+                cached = self._read(content_id)
+                if cached is not None and cached.get("hash") == content_hash:
+                    self.stats["skipped"] += 1
+                    continue
+                data = dict(content)
+                data["content"] = add_logo_prefix_to_urls(data.get("content") or "")
+                data["hash"] = content_hash
+                path = self._path(content_id)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, path)
+                self.stats["writes"] += 1
+            except Exception as e:
+                from core.print import print_error
+                print_error(f"写入文章内容缓存失败: {content_id}, {e}")
+                with self._lock:
+                    self._hashes.pop(content_id, None)
+
+    def get(self, content_id: str) -> dict:
+        """获取缓存的文章内容(图片地址已添加前缀)，未缓存返回None"""
+        path = self._path(content_id)
+        with self._lock:
+            pending = self._pending.get(content_id)
+        if pending is not None:
+            data = dict(pending[1])
+            data["content"] = add_logo_prefix_to_urls(data.get("content") or "")
+            return data
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def has(self, content_id: str) -> bool:
+        with self._lock:
+            if content_id in self._hashes:
+                return True
+        return os.path.exists(self._path(content_id))
+
+content_cache = ContentCache()
+atexit.register(content_cache.flush)
+
+
 class RSS:
     cache_dir = os.path.normpath("data/cache/rss")
-    content_cache_dir = os.path.normpath("data/cache/content")
     rss_file="all"
     
     def __init__(self, name:str="all",cache_dir: str = None,ext:str="rss"):
@@ -13,7 +238,6 @@ class RSS:
             self.cache_dir = cache_dir
         self.ext=ext    
         os.makedirs(self.cache_dir, exist_ok=True)
-        os.makedirs(self.content_cache_dir, exist_ok=True)
         normalized_path = os.path.normpath(f"{self.cache_dir}/{name}.{ext}")
         if not normalized_path.startswith(self.cache_dir):
             raise ValueError("Invalid file path: Path traversal detected.")
@@ -26,27 +250,17 @@ class RSS:
             return "application/json"
         return "text/plain"
     
-    def cache_content(self, content_id: str, content: dict):
-        """缓存文章内容"""
-        content["content"]=self.add_logo_prefix_to_urls(content["content"])
-        content_path = os.path.normpath(f"{self.content_cache_dir}/{content_id}.json")
-        if not content_path.startswith(self.content_cache_dir):
-            raise ValueError("Invalid content path: Path traversal detected.")
-        
-        with open(content_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, ensure_ascii=False, indent=2)
+    def cache_content(self, content_id: str, content: dict) -> bool:
+        """缓存文章内容，内容未变化时不重写"""
+        return content_cache.put(content_id, content)
+
+    def has_cached_content(self, content_id: str) -> bool:
+        """文章内容是否已缓存"""
+        return content_cache.has(content_id)
 
     def get_cached_content(self, content_id: str) -> dict:
         """获取缓存的文章内容"""
-        content_path = os.path.normpath(f"{self.content_cache_dir}/{content_id}.json")
-        if not content_path.startswith(self.content_cache_dir):
-            raise ValueError("Invalid content path: Path traversal detected.")
-        
-        try:
-            with open(content_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return None
+        return content_cache.get(content_id)
     def serialize_datetime(self,obj):
         if isinstance(obj, datetime):
             return obj.isoformat
@@ -80,6 +294,13 @@ class RSS:
 
         return dt_obj.strftime('%a, %d %b %Y %H:%M:%S %z')
     
+    def build_date(self, updated: datetime = None) -> str:
+        """频道更新时间，未指定时使用当前时间(CST/UTC+8)"""
+        if updated is None:
+            # Use timezone-aware now (CST/UTC+8) so %z shows +0800
+            updated = datetime.now(timezone(timedelta(hours=8)))
+        return self.datetime_to_rfc822(updated)
+
     def add_logo_prefix_to_urls(self, text: str) -> str:
         """在字符串中所有http/https开头的图片URL前添加/static/res/logo/前缀
         
@@ -89,18 +310,161 @@ class RSS:
         Returns:
             处理后的字符串，所有图片URL前添加了前缀
         """
-        import re
-        try:
-            pattern = re.compile(r'(<img[^>]*src=["\'])(?!\/static\/res\/logo\/)([^"\']*)', re.IGNORECASE)
-            return pattern.sub(r'\1/static/res/logo/\2', text)
-        except:
-            return text
+        return add_logo_prefix_to_urls(text)
        
-    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
-                    link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+    def render_options(self) -> dict:
+        """渲染用到的配置项，每次生成只读取一次配置"""
         from core.config import cfg
-        full_context=bool(cfg.get("rss.full_context",False))
+        if getattr(self, "_options", None) is None:
+            self._options = {
+                "full_context": bool(cfg.get("rss.full_context", False)),
+                "add_cover": cfg.get("rss.add_cover", False) == True,
+                "cdata": cfg.get("rss.cdata", False) == True,
+            }
+        return self._options
+
+    def item_format(self) -> str:
+        """当前扩展名对应的条目片段格式(rss/atom/json)，模板等无法拆分的格式返回None"""
+        ext = self.ext.lower().strip('.')
+        if ext in ('rss', 'xml'):
+            return "rss"
+        if ext in ('atom', 'md', 'txt'):
+            return "atom"
+        if ext in ('json', 'jmd'):
+            return "json"
+        return None
+
+    def fragment_slot(self) -> str:
+        """条目片段的存储位置：格式 + 内容格式"""
+        type = self.get_content_type()
+        if isinstance(type, tuple):
+            type = type[0]
+        return f"{self.item_format()}_{type}"
+
+    def fragment_config(self, domain: str = "") -> str:
+        """影响条目片段内容的配置版本，配置变化后旧片段自动失效"""
+        from core.config import cfg
+        local = cfg.get("rss.local", False) == True
+        options = self.render_options()
+        return f"{options['full_context']}|{options['add_cover']}|{options['cdata']}|{local}|{domain if local else ''}"
+
+    def render_item(self, rss_item: dict) -> str:
+        """生成单篇文章的条目片段，格式由扩展名决定"""
+        fmt = self.item_format()
+        if fmt == "rss":
+            return self.rss_item(rss_item)
+        if fmt == "atom":
+            return self.atom_entry(rss_item)
+        if fmt == "json":
+            return self.json_item(rss_item)
+        raise ValueError(f"Unsupported extension: {self.ext}")
+
+    def rss_item(self, rss_item: dict) -> str:
+        """生成RSS <item> 片段"""
+        options = self.render_options()
+        item = ET.Element("item")
+        ET.SubElement(item, "id").text = rss_item["id"]
+        ET.SubElement(item, "title").text = rss_item["title"]
+        ET.SubElement(item, "description").text = rss_item["description"] 
+        ET.SubElement(item, "guid").text = rss_item["link"]
+        # 添加图片封面
+        if options["add_cover"]:
+            enclosure = ET.SubElement(item, "enclosure")
+            enclosure.set("url", rss_item["image"])
+            enclosure.set("length", "0")
+            enclosure.set("type", "image/jpeg")
+        if options["full_context"]:
+            try:
+                if options["cdata"]:
+                    content = f"<![CDATA[{str(rss_item['content'])}]]>"  # 使用CDATA包裹内容
+                else:
+                    content = str(rss_item['content'])
+                ET.SubElement(item, "content:encoded").text = content
+            except Exception as e:
+                print(f"Error adding content:encoded element: {e}")
+            pass
+        # ET.SubElement(item, "category").text = rss_item["category"]
+        # ET.SubElement(item, "author").text = rss_item["author"]
+        ET.SubElement(item, "link").text = rss_item["link"]
+        ET.SubElement(item, "pubDate").text = self.datetime_to_rfc822(rss_item["updated"])
+        return ET.tostring(item, encoding="unicode", method="xml", short_empty_elements=False)
+
+    def atom_entry(self, rss_item: dict) -> str:
+        """生成Atom <entry> 片段"""
+        options = self.render_options()
+        entry = ET.Element("entry")
+        ET.SubElement(entry, "id").text = rss_item["id"]
+        ET.SubElement(entry, "title").text = str(rss_item["title"])
+        ET.SubElement(entry, "link", href=str(rss_item["link"]))
+        ET.SubElement(entry, "updated").text =self.datetime_to_rfc822(rss_item["updated"])
+        ET.SubElement(entry, "summary").text = str(rss_item["description"])
+        ET.SubElement(entry, "author").text = str(rss_item["mp_name"])
+         # 添加图片封面
+        if options["add_cover"]:
+            enclosure = ET.SubElement(entry, "enclosure")
+            enclosure.set("url", str(rss_item["image"]))
+            enclosure.set("length", "0")
+            enclosure.set("type", "image/jpeg")
+        
+        if options["full_context"]:
+            type=self.get_content_type()
+            # content = ET.SubElement(entry, "content", type=f"{str(type)}") 
+            # content.text = format_content(rss_item["content"],type)
+            content=format_article_content(rss_item["id"],rss_item["content"],type)
+            try:
+                if options["cdata"]:
+                    content = f"<![CDATA[{content}]]>"  # 使用CDATA包裹内容
+                else:
+                    ET.SubElement(entry, "content:encoded").text = content
+            except Exception as e:
+                print(f"Error adding content:encoded element: {e}")
+            pass
+        return ET.tostring(entry, encoding="unicode", method="xml")
+
+    def json_item(self, item: dict) -> str:
+        """生成JSON条目片段(已按整体输出的缩进格式化)"""
+        type=self.get_content_type()
+        data = {
+            "id": item["id"],
+            "title": item["title"],
+            "description": item["description"],
+            "link": item["link"],
+            "updated": item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
+            "content": format_article_content(item["id"],item["content"],type),
+            "channel_name": item.get("mp_name", ""),
+            "feed": item.get("feed")
+        }
+        text = json.dumps(data, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        return textwrap.indent(text, "    ")
+
+    def _split_xml(self, root: ET.Element, parent_tag: str, **kwargs) -> tuple:
+        # 序列化不含条目的外层结构，在父元素结束标签处拆分，条目片段拼接在中间
+        tree_str = ET.tostring(root, encoding="unicode", method="xml", **kwargs)
+        head, tail = tree_str.rsplit(f"</{parent_tag}>", 1)
+        return '<?xml version="1.0" encoding="utf-8"?>\r\n' + head, f"</{parent_tag}>" + tail
+
+    def _iter_xml(self, rss_list, head: str, tail: str, render):
+        yield head
+        for item in rss_list:
+            # rss_list中的元素可以是文章字典，也可以是已经生成好的片段
+            yield item if isinstance(item, str) else render(item)
+        yield tail
+
+    def _iter_json(self, rss_list, head: str, tail: str):
+        yield head
+        empty = True
+        for item in rss_list:
+            yield ("[\n" if empty else ",\n") + (item if isinstance(item, str) else self.json_item(item))
+            empty = False
+        yield "[]" if empty else "\n  ]"
+        yield tail
+
+    def rss_envelope(self, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None) -> tuple:
+        """RSS频道外层结构，返回条目前后两部分"""
+        options = self.render_options()
+        full_context=options["full_context"]
         
         # 创建根元素(RSS标准)
         rss = ET.Element("rss", version="2.0")
@@ -113,69 +477,29 @@ class RSS:
         ET.SubElement(channel, "description").text = description
         ET.SubElement(channel, "language").text = language
         ET.SubElement(channel, "generator").text = "Mp-We-Rss"
-        # Use timezone-aware now (CST/UTC+8) so %z shows +0800
-        ET.SubElement(channel, "lastBuildDate").text = datetime.now(timezone(timedelta(hours=8))).strftime("%a, %d %b %Y %H:%M:%S %z")
+        ET.SubElement(channel, "lastBuildDate").text = self.build_date(updated)
     
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
+        if options["add_cover"] and image_url != "":
             image = ET.SubElement(channel, "image")
             ET.SubElement(image, "url").text = image_url
             ET.SubElement(image, "title").text = title
             ET.SubElement(image, "link").text = link
+        return self._split_xml(rss, "channel", short_empty_elements=False)
 
-        for rss_item in rss_list:
-            item = ET.SubElement(channel, "item")
-            ET.SubElement(item, "id").text = rss_item["id"]
-            ET.SubElement(item, "title").text = rss_item["title"]
-            ET.SubElement(item, "description").text = rss_item["description"] 
-            ET.SubElement(item, "guid").text = rss_item["link"]
-            # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(item, "enclosure")
-                enclosure.set("url", rss_item["image"])
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
-            if full_context==True:
-                try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{str(rss_item['content'])}]]>"  # 使用CDATA包裹内容
-                    else:
-                        content = str(rss_item['content'])
-                    ET.SubElement(item, "content:encoded").text = content
-                except Exception as e:
-                    print(f"Error adding content:encoded element: {e}")
-                pass
-            # ET.SubElement(item, "category").text = rss_item["category"]
-            # ET.SubElement(item, "author").text = rss_item["author"]
-            ET.SubElement(item, "link").text = rss_item["link"]
-            ET.SubElement(item, "pubDate").text = self.datetime_to_rfc822(str(rss_item["updated"]))
-
-        # 生成XML字符串(添加声明和美化输出)
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                ET.tostring(rss, encoding="utf-8", method="xml", short_empty_elements=False).decode("utf-8")
-        
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
-        return tree_str
-     
-    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
-        """生成Atom格式的RSS内容
-        
-        Args:
-            rss_list: RSS条目列表
-            title: 频道标题
-            link: 频道链接
-            description: 频道描述
-            language: 语言
-            
-        Returns:
-            Atom格式的XML字符串
-        """
-        from core.config import cfg
-        full_context = bool(cfg.get("rss.full_context", False))
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None):
+        # 生成XML字符串(添加声明)，条目使用预生成的片段拼接
+        head, tail = self.rss_envelope(title=title, link=link, description=description, language=language, image_url=image_url, updated=updated)
+        return "".join(self._iter_xml(rss_list, head, tail, self.rss_item))
+
+    def atom_envelope(self, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None) -> tuple:
+        """Atom外层结构，返回条目前后两部分"""
+        options = self.render_options()
+        full_context = options["full_context"]
         
         # 创建根元素(Atom标准)
         feed = ET.Element("feed", xmlns="http://www.w3.org/2005/Atom")
@@ -186,52 +510,35 @@ class RSS:
         ET.SubElement(feed, "link",rel="icon", href=image_url)
         ET.SubElement(feed, "logo").text=str(image_url)
         ET.SubElement(feed, "icon").text=str(image_url)
-        # Use timezone-aware now (CST/UTC+8) so %z shows +0800
-        ET.SubElement(feed, "updated").text = datetime.now(timezone(timedelta(hours=8))).strftime("%a, %d %b %Y %H:%M:%S %z")
+        ET.SubElement(feed, "updated").text = self.build_date(updated)
         ET.SubElement(feed, "id").text = str(link)
         ET.SubElement(feed, "author").text = "Mp-We-Rss"
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
+        if options["add_cover"] and image_url != "":
             image = ET.SubElement(feed, "image")
             ET.SubElement(image, "url").text = str(image_url)
             ET.SubElement(image, "title").text = str(title)
             ET.SubElement(image, "link").text = str(link)
-        for rss_item in rss_list:
-            entry = ET.SubElement(feed, "entry")
-            ET.SubElement(entry, "id").text = rss_item["id"]
-            ET.SubElement(entry, "title").text = str(rss_item["title"])
-            ET.SubElement(entry, "link", href=str(rss_item["link"]))
-            ET.SubElement(entry, "updated").text =self.datetime_to_rfc822(str(rss_item["updated"]))
-            ET.SubElement(entry, "summary").text = str(rss_item["description"])
-            ET.SubElement(entry, "author").text = str(rss_item["mp_name"])
-             # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(entry, "enclosure")
-                enclosure.set("url", str(rss_item["image"]))
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
-            
-            if full_context:
-                type=self.get_content_type()
-                # content = ET.SubElement(entry, "content", type=f"{str(type)}") 
-                # content.text = format_content(rss_item["content"],type)
-                content=format_content(rss_item["content"],type)
-                try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{content}]]>"  # 使用CDATA包裹内容
-                    else:
-                        ET.SubElement(entry, "content:encoded").text = content
-                except Exception as e:
-                    print(f"Error adding content:encoded element: {e}")
-                pass
-        # 生成XML字符串
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                  ET.tostring(feed, encoding="utf-8", method="xml").decode("utf-8")
+        return self._split_xml(feed, "feed")
+     
+    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None) -> str:
+        """生成Atom格式的RSS内容
         
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
-        return tree_str
+        Args:
+            rss_list: RSS条目列表(文章字典或预生成的条目片段)
+            title: 频道标题
+            link: 频道链接
+            description: 频道描述
+            language: 语言
+            updated: 频道更新时间，默认为当前时间
+            
+        Returns:
+            Atom格式的XML字符串
+        """
+        head, tail = self.atom_envelope(title=title, link=link, description=description, language=language, image_url=image_url, updated=updated)
+        return "".join(self._iter_xml(rss_list, head, tail, self.atom_entry))
     def set_content_type(self,type:str=None):
         self.content_type=type
     def get_content_type(self)->str:
@@ -243,55 +550,144 @@ class RSS:
         elif ext in("txt"):
             return "text"
         return "html"
+    def json_envelope(self, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None) -> tuple:
+        """JSON外层结构，"items"是最后一个字段，在其空列表处拆分"""
+        result = {
+            "name":title,
+            "link":link,
+            "description":description,
+            "language": language,
+            "cover":image_url,
+            "items": []
+        }
+        text = json.dumps(result, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        index = text.rindex("[]")
+        return text[:index], text[index + 2:]
+
     def generate_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
                     description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
         """获取JSON格式的RSS内容
         
         Args:
-            rss_list: RSS条目列表
+            rss_list: RSS条目列表(文章字典或预生成的条目片段)
             
         Returns:
             JSON格式的字符串
         """
-        type=self.get_content_type()
-        result = {
-            "name":title,
-            "link":link,
-            "description":description,
-            "language": language,
-            "cover":image_url,
-            "items": [
-                {
-                    "id": item["id"],
-                    "title": item["title"],
-                    "description": item["description"],
-                    "link": item["link"],
-                    "updated": item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
-                    "content": format_content(item["content"],type),
-                    "channel_name": item.get("mp_name", ""),
-                    "feed": item.get("feed")
-                } for item in rss_list
-            ]
-        }
-        return json.dumps(result, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        head, tail = self.json_envelope(title=title, link=link, description=description, language=language, image_url=image_url)
+        return "".join(self._iter_json(rss_list, head, tail))
+
+    def stream(self, rss_iter, ext: str, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",updated:datetime=None):
+        """逐段生成RSS内容，条目从迭代器中依次读取，输出与generate一致
+
+        Args:
+            rss_iter: 条目迭代器(文章字典或预生成的条目片段)
+            ext: 文件扩展名，只支持rss/xml/atom/md/txt/json/jmd
+
+        Yields:
+            内容片段字符串
+        """
+        ext = ext.lower().strip('.')
+        self.ext=ext
+        kwargs = dict(title=title, link=link, description=description, language=language, image_url=image_url)
+        if ext in ('rss', 'xml'):
+            return self._iter_xml(rss_iter, *self.rss_envelope(updated=updated, **kwargs), self.rss_item)
+        elif ext in ('atom','md','txt'):
+            return self._iter_xml(rss_iter, *self.atom_envelope(updated=updated, **kwargs), self.atom_entry)
+        elif ext in ('json','jmd'):
+            return self._iter_json(rss_iter, *self.json_envelope(**kwargs))
+        raise ValueError(f"Unsupported extension: {ext}")
 
     def get_cache(self):
         if not hasattr(self, 'rss_file') or not self.rss_file:
                return None
         try:
-            with open(self.rss_file, "r", encoding="utf-8") as f:
+            with open(self.rss_file, "r", encoding="utf-8", newline="") as f:
                 return f.read()  
         except FileNotFoundError:
             return None     
+    def get_cache_meta(self) -> dict:
+        """获取RSS缓存的元数据(ETag、生成时间、有效期等)"""
+        try:
+            with open(f"{self.rss_file}.meta", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    def get_cache_entry(self, accept: str = None):
+        """获取RSS缓存内容及元数据
+
+        Args:
+            accept: 请求的Accept-Encoding，存在匹配的预压缩版本时返回压缩后的内容，
+                    并在元数据的encoding中记录所用的压缩方式
+
+        Returns:
+            (bytes, dict) 缓存内容和元数据，缓存不存在时返回 (None, None)
+        """
+        meta = self.get_cache_meta()
+        if meta is None:
+            return None, None
+        encoding = accept_encoding(accept, meta.get("encodings") or [])
+        if encoding is not None:
+            try:
+                with open(self.rss_file + CACHE_ENCODINGS[encoding], "rb") as f:
+                    return f.read(), dict(meta, encoding=encoding)
+            except FileNotFoundError:
+                pass
+        try:
+            with open(self.rss_file, "rb") as f:
+                return f.read(), meta
+        except FileNotFoundError:
+            return None, None
+    def is_stale(self, meta: dict) -> bool:
+        """缓存是否过期：被采集任务标记过期，或超出有效期(ttl<=0表示只由采集任务刷新)"""
+        if meta is None or meta.get("stale"):
+            return True
+        ttl = int(meta.get("ttl", 0) or 0)
+        return ttl > 0 and time.time() - float(meta.get("created", 0)) >= ttl
+    def _tmp_path(self, path: str) -> str:
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    def _write_file(self, path: str, data: bytes):
+        # 先写临时文件再替换，避免其他进程读到写了一半的缓存
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    def _save_meta(self, meta: dict = None):
+        meta = dict(meta or {})
+        meta.setdefault("created", time.time())
+        meta["stale"] = False
+        self._write_file(f"{self.rss_file}.meta", json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        self.register_cache(meta)
+    def save_cache(self, content: str, meta: dict = None):
+        """写入RSS缓存、压缩版本及元数据(.meta)"""
+        writer = self.open_cache_writer()
+        try:
+            writer.write(content.encode("utf-8"))
+            writer.commit(meta)
+        except Exception:
+            writer.discard()
+            raise
+    def open_cache_writer(self) -> CacheWriter:
+        """流式写入缓存：返回CacheWriter，内容写完后调用commit替换缓存"""
+        return CacheWriter(self)
+    def mark_stale(self, meta_path: str, meta: dict):
+        """标记缓存过期，保留旧内容以便在后台刷新完成前继续提供服务"""
+        meta["stale"] = True
+        self._write_file(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
     def generate(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None) -> str:
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None,updated:datetime=None) -> str:
         """根据扩展名获取对应格式的RSS内容
         
         Args:
             rss_list: RSS条目列表
             ext: 文件扩展名(.rss/.xml/.atom/.json)
+            updated: 频道更新时间，传入最新文章时间可保证相同内容输出一致(用于ETag)
             **kwargs: 传递给各格式生成方法的参数
             
         Returns:
@@ -303,9 +699,9 @@ class RSS:
         ext = ext.lower().strip('.')
         self.ext=ext
         if ext in ('rss', 'xml'):
-            return self.generate_rss(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self.generate_rss(rss_list, title=title, link=link, description=description,language=language,image_url=image_url,updated=updated)
         elif ext in ('atom','md','txt'):
-            return self.generate_atom(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self.generate_atom(rss_list, title=title, link=link, description=description,language=language,image_url=image_url,updated=updated)
         elif ext in ('json','jmd'):
             return self.generate_json(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
         elif template is not None:
@@ -317,25 +713,99 @@ class RSS:
             template = TemplateParser(template)
             return template.render({"articles": rss_list, "title": title,"link":link,"description":description,"language":language,"image_url":image_url})
             pass
-    def clear_cache(self,mp_id:str=""):
+    def _index_path(self, key: str) -> str:
+        # "*"表示全部订阅，文件名中使用_all
+        name = "_all" if key == "*" else key
+        index_dir = os.path.join(self.cache_dir, "index")
+        path = os.path.normpath(f"{index_dir}/{name}.idx")
+        if not path.startswith(index_dir):
+            raise ValueError("Invalid index path: Path traversal detected.")
+        return path
+    def _read_index(self, key: str) -> list:
+        try:
+            with open(self._index_path(key), "r", encoding="utf-8") as f:
+                return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+        except FileNotFoundError:
+            return []
+    def _index_keys(self, meta: dict) -> list:
+        keys = list(meta.get("mp_ids") or [])
+        tag_id = (meta.get("params") or {}).get("tag_id")
+        if tag_id:
+            keys.append(f"tag_{tag_id}")
+        return keys
+    def register_cache(self, meta: dict):
+        """将缓存文件登记到相关公众号(及标签)的索引中，公众号有新文章时按索引找到需要更新的缓存"""
+        self._ensure_index()
+        self._register(os.path.basename(self.rss_file), meta)
+    def _register(self, name: str, meta: dict):
+        for key in self._index_keys(meta):
+            if name in self._read_index(key):
+                continue
+            # 追加写入，多进程同时登记时最多产生重复行，读取时去重
+            with open(self._index_path(key), "a", encoding="utf-8") as f:
+                f.write(name + "\n")
+    def _ensure_index(self):
+        """首次使用索引时，从已有缓存的元数据建立索引"""
+        index_dir = os.path.join(self.cache_dir, "index")
+        if os.path.isdir(index_dir):
+            return
+        os.makedirs(index_dir, exist_ok=True)
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".meta"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, filename), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self._register(filename[:-len(".meta")], meta)
+            except Exception as e:
+                print(f"Error indexing {filename}: {e}")
+    def cached_entries(self, mp_id: str, tag_ids: list = None) -> list:
+        """按公众号索引查找相关缓存(包含公众号、全部订阅及相关标签)
 
-        """清除所有缓存文件
-        
-        删除data/cache/rss和data/cache/content目录中包含'mp_id'的文件
-        保持与现有方法相同的路径安全检查机制
+        Args:
+            mp_id: 公众号ID
+            tag_ids: 包含该公众号的标签ID，标签订阅生成后才加入的公众号通过标签索引匹配
+
+        Returns:
+            [(元数据文件路径, 元数据)]
         """
-        import shutil
-        
-        # 清除rss缓存目录
-        if os.path.exists(self.cache_dir):
-            for filename in os.listdir(self.cache_dir):
-                if f'{mp_id}_' not in filename:
+        self._ensure_index()
+        keys = [mp_id, "*"] + [f"tag_{tag_id}" for tag_id in tag_ids or []]
+        entries = {}
+        for key in keys:
+            for name in self._read_index(key):
+                if name in entries:
                     continue
-                file_path = os.path.normpath(f"{self.cache_dir}/{filename}")
-                if not file_path.startswith(self.cache_dir):
+                meta_path = os.path.normpath(f"{self.cache_dir}/{name}.meta")
+                if not meta_path.startswith(self.cache_dir):
                     raise ValueError("Invalid file path: Path traversal detected.")
                 try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    if key in self._index_keys(meta):
+                        entries[name] = (meta_path, meta)
+                except FileNotFoundError:
+                    continue
                 except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
\ No newline at end of file
+                    print(f"Error reading {meta_path}: {e}")
+        return list(entries.values())
+    def clear_cache(self,mp_id:str="",tag_ids:list=None) -> list:
+
+        """标记与公众号相关的缓存过期
+        
+        按公众号索引查找相关缓存，只标记过期不删除，旧内容在重新生成前继续提供服务。
+        保持与现有方法相同的路径安全检查机制
+
+        Returns:
+            被标记过期的缓存元数据列表
+        """
+        if not mp_id:
+            return []
+        marked = []
+        for meta_path, meta in self.cached_entries(mp_id, tag_ids):
+            try:
+                self.mark_stale(meta_path, meta)
+                marked.append(meta)
+            except Exception as e:
+                print(f"Error clearing {meta_path}: {e}")
+        return marked
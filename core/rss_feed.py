@@ -0,0 +1,726 @@
+"""RSS订阅源生成与缓存
+
+将订阅源的查询、渲染、缓存从接口层抽离，
+请求处理和后台刷新共用同一套逻辑。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
+from sqlalchemy import func
+from core.config import cfg
+from core.db import DB
+import core.article_stats as article_stats
+from core.models.feed import Feed
+from core.models.article import Article
+from core.models.tags import Tags
+from core.rss import RSS, content_cache
+from core.print import print_error, print_info, print_warning
+from core.pagination import encode_cursor, decode_cursor, keyset_filter, keyset_not_null
+from core.article_cache import ArticleCache
+from core.search import search_index
+from core.feed_cache import feed_cache
+
+CST = timezone(timedelta(hours=8))
+
+# 影响RSS输出内容的配置项，参与ETag计算
+RSS_RENDER_OPTIONS = ("rss.full_context", "rss.add_cover", "rss.cdata", "rss.local",
+                      "rss.title", "rss.description", "rss.cover")
+
+def latest_time(*stamps) -> datetime:
+    """取时间戳/datetime中最新的一个，统一转换为CST时间"""
+    values = []
+    for stamp in stamps:
+        if stamp is None or stamp == "":
+            continue
+        if isinstance(stamp, datetime):
+            values.append(stamp.timestamp())
+        else:
+            try:
+                values.append(float(stamp))
+            except (TypeError, ValueError):
+                continue
+    if not values:
+        return None
+    return datetime.fromtimestamp(int(max(values)), tz=CST)
+
+def feed_validators(seed: str, last_modified: datetime = None) -> dict:
+    """根据RSS版本信息生成ETag/Last-Modified响应头
+
+    Args:
+        seed: 版本种子，包含请求参数、渲染配置和最新文章时间
+        last_modified: 最新文章(或订阅源)的更新时间
+    """
+    options = "|".join(str(cfg.get(key, "")) for key in RSS_RENDER_OPTIONS)
+    digest = hashlib.sha1(f"{seed}|{options}".encode("utf-8")).hexdigest()
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def get_cache_ttl(feed_id: str = None, tag_id: str = None) -> int:
+    """获取订阅源缓存有效期(秒)
+
+    rss.cache_ttls 可按订阅源ID或标签ID单独设置，未设置时使用 rss.cache_ttl
+    """
+    ttls = cfg.get("rss.cache_ttls", {}) or {}
+    if isinstance(ttls, dict):
+        for key in (tag_id, feed_id):
+            if key and key in ttls:
+                return int(ttls[key])
+    return int(cfg.get("rss.cache_ttl", 3600) or 0)
+
+# 流式输出/加载正文时每批的文章数
+STREAM_BATCH_SIZE = 20
+
+def fragment_version(config: str, feed: Feed, updated_at) -> str:
+    """条目片段版本：渲染配置 + 文章更新时间 + 公众号信息"""
+    seed = f"{config}|{updated_at}|{feed.id}|{feed.mp_name}|{feed.mp_cover}|{feed.mp_intro}"
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest()
+
+
+class ItemFragmentCache(ArticleCache):
+    """文章条目片段缓存，按 格式_内容格式 保存渲染好的条目片段及其版本"""
+    cache_dir = os.path.normpath("data/cache/fragment")
+
+
+fragment_cache = ItemFragmentCache()
+
+
+class FeedSource:
+    """一个订阅源请求(公众号/标签/全部 + 格式 + 分页 + 搜索等参数)"""
+
+    def __init__(self, feed_id: str = None, tag_id: str = None, ext: str = "xml",
+                 limit: int = 10, offset: int = 0, kw: str = "",
+                 content_type: str = None, template: str = None, domain: str = "",
+                 cursor: str = None):
+        self.feed_id = feed_id
+        self.tag_id = tag_id
+        self.ext = ext
+        self.limit = limit
+        self.offset = offset
+        self.cursor = cursor or None
+        self.kw = kw or ""
+        self.content_type = content_type
+        self.template = template
+        self.domain = str(domain)
+        self.rss = RSS(name=self.cache_name, ext=ext)
+        self.rss.set_content_type(content_type)
+        self.feed = None
+        self.query = None
+        self.mp_ids = []
+        self.last_modified = None
+        self.validators = None
+        self.next_cursor = None
+        # 刚写入文章后重新生成缓存时读主库，避免只读副本复制延迟漏掉新文章
+        self.use_primary = False
+        # 搜索结果的相关度，使用全文索引时按相关度排序
+        self.score = None
+        # 流式输出的合并调用是否已释放(输出完成、中断或响应未开始时各释放一次)
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    @property
+    def cache_name(self) -> str:
+        """缓存文件名，搜索词/内容格式/模板等参数以摘要形式拼接，避免不同请求共用缓存"""
+        name = f"{self.tag_id}_{self.feed_id}_{self.limit}_{self.offset}"
+        extra = [self.kw, self.content_type or "", self.template or ""]
+        if self.cursor:
+            extra.append(self.cursor)
+        if any(extra):
+            name += "_" + hashlib.sha1("|".join(extra).encode("utf-8")).hexdigest()[:12]
+        return name
+
+    def params(self) -> dict:
+        """用于后台重新生成缓存的请求参数"""
+        return {
+            "feed_id": self.feed_id,
+            "tag_id": self.tag_id,
+            "ext": self.ext,
+            "limit": self.limit,
+            "offset": self.offset,
+            "kw": self.kw,
+            "content_type": self.content_type,
+            "template": self.template,
+            "domain": self.domain,
+            "cursor": self.cursor,
+        }
+
+    @classmethod
+    def from_params(cls, params: dict) -> "FeedSource":
+        return cls(**params)
+
+    def ttl(self) -> int:
+        return get_cache_ttl(feed_id=self.feed_id, tag_id=self.tag_id)
+
+    def load(self, session) -> dict:
+        """加载订阅源信息并计算版本(读取文章统计中的版本水位，不扫描文章表)
+
+        Returns:
+            ETag/Last-Modified响应头，订阅源不存在时返回None
+        """
+        from apis.base import format_search_kw
+        rss_domain = self.domain
+        # 只查询文章，公众号元数据从缓存读取
+        query = session.query(Article).join(Feed, Feed.id == Article.mp_id)
+        mp_ids = ["*"]
+        # 版本水位对应的公众号，None为全部
+        stats_ids = None
+        if self.feed_id not in ["all", None]:
+            feed = feed_cache.feed(self.feed_id, session=session)
+            query = query.filter(Article.mp_id == self.feed_id)
+            mp_ids = stats_ids = [self.feed_id]
+        else:
+            feed = Feed()
+            feed.mp_name = cfg.get("rss.title", "WeRss") or "WeRss"
+            feed.mp_intro = cfg.get("rss.description") or "WeRss高效订阅我的公众号"
+            feed.mp_cover = cfg.get("rss.cover") or f"{rss_domain}static/logo.svg"
+            #如果传入了tag_id就加载tag对应的订阅信息
+            if self.tag_id is not None:
+                tags = session.query(Tags).filter(Tags.id == self.tag_id).first()
+                if tags:
+                    mps_ids = [str(mp['id']) for mp in json.loads(tags.mps_id)] if tags.mps_id else []
+                    query = query.filter(Article.mp_id.in_(mps_ids))
+                    feed.mp_name = tags.name
+                    feed.mp_intro = tags.intro
+                    feed.mp_cover = f'{rss_domain}{tags.cover}'
+                    feed.updated_at = tags.updated_at
+                    mp_ids = stats_ids = mps_ids
+        if not feed:
+            return None
+        if self.kw != "":
+            found = search_index.search(session, self.kw)
+            if found is not None:
+                query = query.join(found, found.c.article_id == Article.id)
+                self.score = found.c.score
+            else:
+                query = query.filter(format_search_kw(self.kw))
+        mark = article_stats.watermark(session, stats_ids)
+        if mark is not None:
+            updated_at, version = mark
+            self.last_modified = latest_time(updated_at, feed.updated_at)
+        else:
+            # 统计表尚未建立时查询最新文章时间
+            max_publish_time, max_updated_at = query.with_entities(func.max(Article.publish_time), func.max(Article.updated_at)).one()
+            self.last_modified = latest_time(max_publish_time, max_updated_at, feed.updated_at)
+            version = ""
+        self.validators = feed_validators(
+            f"{self.tag_id}|{self.feed_id}|{self.ext}|{self.limit}|{self.offset}|{self.kw}|{self.content_type}|{self.template}|{self.cursor}|{rss_domain}|{feed.mp_name}|{feed.mp_cover}|{feed.mp_intro}|{self.last_modified}|{version}",
+            self.last_modified)
+        self.feed = feed
+        self.query = query
+        self.mp_ids = mp_ids
+        return self.validators
+
+    def _item(self, _feed: Feed, article: Article) -> dict:
+        """文章转换为RSS条目数据"""
+        rss_domain = self.domain
+        return {
+            "id": str(article.id),
+            "title": article.title or "",
+            "link":  f"{rss_domain}rss/feed/{article.id}" if cfg.get("rss.local",False) else article.url,
+            "description": article.description if article.description != "" else article.title or "",
+            "content": article.content or "",
+            "image": article.pic_url or "",
+            "mp_name":_feed.mp_name or "",
+            "updated": datetime.fromtimestamp(article.publish_time, tz=CST),
+            "feed": {
+                    "id":_feed.id,
+                    "name":_feed.mp_name,
+                    "cover":_feed.mp_cover,
+                    "intro":_feed.mp_intro
+            }
+        }
+
+    def _cache_content(self, _feed: Feed, article: Article):
+        """缓存文章内容，供 /rss/content/{id} 读取"""
+        self.rss.cache_content(article.id, {
+            "id": article.id,
+            "title": article.title,
+            "content": article.content,
+            "publish_time": article.publish_time,
+            "mp_id": article.mp_id,
+            "pic_url": article.pic_url,
+            "mp_name": _feed.mp_name
+        })
+
+    def _order_columns(self) -> list:
+        """排序字段：搜索结果按相关度，其余按发布时间"""
+        return [self.score if self.score is not None else Article.publish_time, Article.id]
+
+    def _page(self):
+        """当前页查询，多取一条用于判断是否有下一页；传入游标时从游标之后查询，不使用OFFSET"""
+        query = self.query
+        columns = self._order_columns()
+        query = query.filter(*keyset_not_null(columns))
+        if self.cursor:
+            query = query.filter(keyset_filter(columns, decode_cursor(self.cursor)))
+        query = query.order_by(*[column.desc() for column in columns])
+        if not self.cursor:
+            query = query.offset(self.offset)
+        return query.limit(self.limit + 1)
+
+    def _set_next_cursor(self, rows: list, key) -> list:
+        """截取当前页并生成下一页游标，通过X-Next-Cursor响应头返回"""
+        if len(rows) <= self.limit:
+            return rows
+        rows = rows[:self.limit]
+        self.next_cursor = encode_cursor(*key(rows[-1]))
+        if self.validators is not None:
+            self.validators["X-Next-Cursor"] = self.next_cursor
+        return rows
+
+    def _feeds(self, mp_ids, session=None) -> dict:
+        """文章所属公众号 {公众号ID: Feed}，从缓存读取"""
+        return {mp_id: Feed(**meta) for mp_id, meta in feed_cache.get_many(mp_ids, session=session).items()}
+
+    def _rows(self) -> list:
+        """当前页文章的ID和更新时间(不含正文)"""
+        rows = self._page().with_entities(Article.mp_id, Article.id, Article.updated_at, self._order_columns()[0]).all()
+        rows = self._set_next_cursor(rows, lambda row: (row[3], row[1]))
+        feeds = self._feeds([row[0] for row in rows], session=self.query.session)
+        return [(feeds[mp_id], *row) for mp_id, *row in rows if mp_id in feeds]
+
+    def _iter_fragments(self, rows: list, query=None):
+        """按批次输出条目片段，每批只加载片段缺失或过期文章的正文
+
+        Args:
+            rows: _rows()的结果
+            query: 加载正文使用的查询，为空时每批使用独立的会话，流式输出时不长期占用连接
+        """
+        rss = self.rss
+        slot = rss.fragment_slot()
+        config = rss.fragment_config(self.domain)
+        for start in range(0, len(rows), STREAM_BATCH_SIZE):
+            batch = rows[start:start + STREAM_BATCH_SIZE]
+            versions = {}
+            fragments = {}
+            for _feed, article_id, updated_at, _ in batch:
+                version = fragment_version(config, _feed, updated_at)
+                versions[article_id] = version
+                fragment = fragment_cache.get(article_id, slot, version)
+                if fragment is not None and rss.has_cached_content(article_id):
+                    fragments[article_id] = fragment
+            missing = [article_id for article_id in versions if article_id not in fragments]
+            if missing:
+                fragments.update(self._render_missing(missing, versions, slot, query))
+            for _feed, article_id, *_ in batch:
+                if article_id in fragments:
+                    yield fragments[article_id]
+
+    def _render_missing(self, missing: list, versions: dict, slot: str, query=None) -> dict:
+        """加载文章正文生成条目片段并缓存"""
+        session = None
+        if query is None:
+            session = self._session()
+            query = self.query.with_session(session)
+        try:
+            fragments = {}
+            articles = query.options(*Article.load_content()).filter(Article.id.in_(missing)).all()
+            feeds = self._feeds([article.mp_id for article in articles], session=query.session)
+            for article in articles:
+                _feed = feeds.get(article.mp_id)
+                if _feed is None:
+                    continue
+                fragment = self.rss.render_item(self._item(_feed, article))
+                fragment_cache.put(article.id, slot, versions[article.id], fragment)
+                fragments[article.id] = fragment
+                self._cache_content(_feed, article)
+            return fragments
+        finally:
+            if session is not None:
+                session.close()
+
+    def _session(self):
+        """查询用会话(需自行close)，默认使用只读副本"""
+        return DB.session_factory() if self.use_primary else DB.read_session()
+
+    def _stream(self, rss_iter):
+        feed = self.feed
+        return self.rss.stream(rss_iter, ext=self.ext, title=f"{feed.mp_name}", link=self.domain, description=feed.mp_intro, image_url=feed.mp_cover, updated=self.last_modified)
+
+    def render(self) -> str:
+        """查询文章列表并生成对应格式的内容，需先调用load
+
+        条目优先使用预生成的片段，只有片段缺失或过期的文章才加载正文重新渲染
+        """
+        rss = self.rss
+        feed = self.feed
+        if rss.item_format() is None:
+            # 模板输出需要完整的文章数据
+            page = self._page().options(*Article.load_content()).add_columns(self._order_columns()[0])
+            rows = self._set_next_cursor(page.all(), lambda row: (row[1], row[0].id))
+            feeds = self._feeds([article.mp_id for article, _ in rows], session=self.query.session)
+            articles = [(feeds[article.mp_id], article) for article, _ in rows if article.mp_id in feeds]
+            rss_list = [self._item(_feed, article) for _feed, article in articles]
+            for _feed, article in articles:
+                self._cache_content(_feed, article)
+            return rss.generate(rss_list,ext=self.ext, title=f"{feed.mp_name}",link=self.domain,description=feed.mp_intro,image_url=feed.mp_cover,template=self.template,updated=self.last_modified)
+        return "".join(self._stream(self._iter_fragments(self._rows(), self.query)))
+
+    def streamable(self) -> bool:
+        """是否使用流式输出(模板输出不支持)"""
+        return self.rss.item_format() is not None and cfg.get("rss.stream", True) == True
+
+    def prepare_stream(self) -> dict:
+        """流式输出前加载订阅源信息和当前页文章ID，随后释放数据库连接
+
+        Returns:
+            ETag/Last-Modified响应头，订阅源不存在时返回None
+        """
+        session = self._session()
+        try:
+            if self.load(session) is None:
+                return None
+            self.rows = self._rows()
+        finally:
+            session.close()
+        return self.validators
+
+    def stream(self, call=None):
+        """逐批输出内容，同时写入缓存，需先调用prepare_stream
+
+        Args:
+            call: feed_flight.acquire 获得的调用，输出结束后通知等待中的相同请求
+        """
+        writer = None
+        done = False
+        try:
+            writer = self.rss.open_cache_writer()
+            for chunk in self._stream(self._iter_fragments(self.rows)):
+                data = chunk.encode("utf-8")
+                writer.write(data)
+                yield data
+            writer.commit(self.cache_meta())
+            writer = None
+            done = True
+        except Exception as e:
+            print_error(f"RSS流式输出失败:{e}")
+            raise
+        finally:
+            if writer is not None:
+                writer.discard()
+            if call is not None:
+                self.release_stream(call, done)
+
+    def release_stream(self, call, done: bool = False):
+        """释放流式输出的合并调用，多次调用时只有第一次生效
+
+        响应未开始输出时(如发送响应头前客户端已断开)生成器不会执行，由响应结束时调用，
+        避免调用一直留在 feed_flight 中使后续相同请求全部等待。
+
+        Args:
+            done: 内容是否已完整写入缓存
+        """
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        if done:
+            # 内容已写入缓存，等待中的请求直接读取缓存文件
+            feed_flight.finish(self.rss.rss_file, call)
+        else:
+            # 输出中断或未开始，由后台生成结果交给等待中的请求
+            self.finish_in_background(call)
+
+    def finish_in_background(self, call):
+        """在后台完成生成并通知等待中的相同请求(如当前请求返回了304)"""
+        def _run():
+            try:
+                result = self.build()
+            except Exception as e:
+                feed_flight.finish(self.rss.rss_file, call, error=e)
+                return
+            feed_flight.finish(self.rss.rss_file, call, result=result)
+        threading.Thread(target=_run, daemon=True).start()
+
+    def cache_meta(self) -> dict:
+        """缓存元数据：响应头、相关公众号和重新生成所需的参数"""
+        return {
+            "headers": self.validators,
+            "media_type": self.rss.get_type(),
+            "ttl": self.ttl(),
+            "mp_ids": self.mp_ids,
+            "params": self.params(),
+        }
+
+    def save(self, content: str):
+        """写入缓存，元数据中记录响应头、相关公众号和重新生成所需的参数"""
+        try:
+            self.rss.save_cache(content, self.cache_meta())
+        except Exception as e:
+            print_error(f"写入RSS缓存失败:{e}")
+
+    def build(self, use_cache: bool = False):
+        """加载、渲染并写入缓存
+
+        Args:
+            use_cache: 是否先检查缓存，其他进程刚刚生成的缓存可直接使用
+
+        Returns:
+            (内容, 元数据)，订阅源不存在时返回(None, None)
+        """
+        if use_cache:
+            content, meta = self.rss.get_cache_entry()
+            if content is not None and not self.rss.is_stale(meta):
+                return content, meta
+        with DB.session_scope(auto_commit=False, read_only=not self.use_primary) as session:
+            if self.load(session) is None:
+                return None, None
+            content = self.render()
+        self.save(content)
+        return content, {"headers": self.validators, "media_type": self.rss.get_type()}
+
+    def build_shared(self, use_cache: bool = False):
+        """合并相同订阅源的并发生成请求，只生成一次，其他请求共享结果
+
+        Returns:
+            ((内容, 元数据), 是否共享了其他请求的结果)
+        """
+        return feed_flight.do(self.rss.rss_file, lambda: self.build(use_cache))
+
+    def refresh(self) -> bool:
+        """重新生成并写入缓存"""
+        (content, meta), _ = self.build_shared()
+        return content is not None
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """相同key的并发调用只执行一次，其余调用等待并共享结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "errors": 0, "timeouts": 0, "max_waiters": 0}
+
+    def acquire(self, key: str):
+        """
+        Returns:
+            (调用, 是否为执行者)，执行者完成后必须调用finish，其余调用者使用wait等待结果
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+                return call, False
+            call = self._calls[key] = _Call()
+            self.stats["executed"] += 1
+            return call, True
+
+    def finish(self, key: str, call: _Call, result=None, error: Exception = None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                self._calls.pop(key)
+            if error is not None:
+                self.stats["errors"] += 1
+        call.result = result
+        call.error = error
+        call.event.set()
+
+    def wait(self, call: _Call, timeout: float = None):
+        """等待执行者的结果，超过 rss.coalesce_timeout 秒未完成时抛出TimeoutError，由调用方自行生成
+
+        避免执行者卡住时等待的请求无限占用线程池
+        """
+        if timeout is None:
+            timeout = float(cfg.get("rss.coalesce_timeout", 30) or 30)
+        if not call.event.wait(timeout):
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise TimeoutError(f"等待相同请求的结果超时({timeout}秒)")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: str, fn):
+        """
+        Returns:
+            (fn的返回值, 是否共享了其他调用的结果)
+        """
+        call, leader = self.acquire(key)
+        if not leader:
+            try:
+                return self.wait(call), True
+            except TimeoutError as e:
+                print_warning(f"{e}，直接生成: {key}")
+                return fn(), False
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, inflight=len(self._calls))
+
+# 订阅源生成请求合并
+feed_flight = SingleFlight()
+
+def get_feed_stats() -> dict:
+    """订阅源生成统计
+
+    coalesce: calls 请求生成次数，executed 实际生成次数，coalesced 合并的请求数
+    materialize: 采集后后台更新缓存的次数、重新生成的缓存数量
+    content: 文章内容缓存写入次数、内容未变化跳过的次数
+    """
+    return {"coalesce": feed_flight.get_stats(), "materialize": dict(feed_materializer.stats), "content": dict(content_cache.stats)}
+
+
+# 正在后台刷新的缓存，保证同一订阅源同时只有一个刷新任务
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def refresh_in_background(source: FeedSource) -> bool:
+    """在后台线程中刷新过期缓存
+
+    Returns:
+        是否新启动了刷新任务(已有刷新任务在运行时返回False)
+    """
+    key = source.rss.rss_file
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def _run():
+        start = time.time()
+        try:
+            source.refresh()
+            print_info(f"RSS缓存刷新完成: {key}, 耗时: {time.time() - start:.2f}秒")
+        except Exception as e:
+            print_error(f"RSS缓存刷新失败: {key}, {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=_run, daemon=True).start()
+    return True
+
+
+def prerender_article(article_id: str, exts: tuple = ("rss", "atom", "json")) -> bool:
+    """文章入库后缓存文章内容，并预先生成各格式的条目片段，订阅源请求时直接拼接
+
+    rss.local 为True时条目链接依赖访问域名，未配置 rss.base_url 则跳过片段生成，由首次请求生成
+    """
+    domain = cfg.get("rss.base_url", "") or ""
+    with DB.session_scope(auto_commit=False) as session:
+        article = session.query(Article).options(*Article.load_content()).filter(Article.id == article_id).first()
+        _feed = feed_cache.feed(article.mp_id, session=session) if article is not None else None
+        if _feed is None:
+            return False
+        FeedSource(feed_id=_feed.id, domain=domain)._cache_content(_feed, article)
+        if cfg.get("rss.local", False) == True and domain == "":
+            return False
+        for ext in exts:
+            source = FeedSource(feed_id=_feed.id, ext=ext, domain=domain)
+            rss = source.rss
+            version = fragment_version(rss.fragment_config(domain), _feed, article.updated_at)
+            fragment_cache.put(article.id, rss.fragment_slot(), version, rss.render_item(source._item(_feed, article)))
+    return True
+
+
+def tags_for_mp(session, mp_id: str) -> list:
+    """包含该公众号的标签ID"""
+    tag_ids = []
+    for tag_id, mps_id in session.query(Tags.id, Tags.mps_id).all():
+        try:
+            if mps_id and any(str(mp.get("id")) == mp_id for mp in json.loads(mps_id)):
+                tag_ids.append(tag_id)
+        except (ValueError, AttributeError):
+            continue
+    return tag_ids
+
+
+class FeedMaterializer:
+    """采集到新文章后在后台重新生成受影响的订阅源缓存
+
+    新文章入库时立即标记相关缓存过期，短暂延迟后合并同一批采集的所有公众号，
+    重新生成公众号、全部订阅以及包含该公众号的标签订阅(首页、无搜索词的缓存)，
+    读者访问时直接命中缓存。带搜索词或分页的缓存只标记过期，访问时再刷新。
+    """
+
+    def __init__(self, delay: float = 3.0):
+        self.delay = delay
+        self._pending = set()
+        self._timer = None
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "rendered": 0, "errors": 0, "last_run": None}
+
+    def schedule(self, mp_id: str):
+        if not mp_id:
+            return
+        with DB.session_scope(auto_commit=False) as session:
+            tag_ids = tags_for_mp(session, mp_id)
+        RSS().clear_cache(mp_id=mp_id, tag_ids=tag_ids)
+        with self._lock:
+            self._pending.add(mp_id)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            mp_ids = self._pending
+            self._pending = set()
+            self._timer = None
+        start = time.time()
+        try:
+            self.materialize(mp_ids)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print_error(f"RSS缓存更新失败: {e}")
+        self.stats["runs"] += 1
+        self.stats["last_run"] = datetime.now(CST).isoformat()
+        print_info(f"RSS缓存更新完成: {len(mp_ids)}个公众号, 耗时: {time.time() - start:.2f}秒")
+
+    def materialize(self, mp_ids) -> int:
+        """重新生成与公众号相关的订阅源缓存
+
+        Returns:
+            重新生成的缓存数量
+        """
+        rss = RSS()
+        entries = {}
+        with DB.session_scope(auto_commit=False) as session:
+            for mp_id in mp_ids:
+                # 缓存已在schedule时标记过期，期间被访问刷新过的缓存也重新生成一次，保证包含新文章
+                for _, meta in rss.cached_entries(mp_id, tag_ids=tags_for_mp(session, mp_id)):
+                    params = meta.get("params")
+                    if params and not params.get("kw") and not params.get("offset") and not params.get("cursor"):
+                        entries[json.dumps(params, sort_keys=True)] = params
+        rendered = 0
+        for params in entries.values():
+            try:
+                source = FeedSource.from_params(params)
+                source.use_primary = True
+                if source.refresh():
+                    rendered += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                print_error(f"RSS缓存生成失败: {params}, {e}")
+        self.stats["rendered"] += rendered
+        return rendered
+
+feed_materializer = FeedMaterializer()
+
+def materialize_feeds(mp_id: str):
+    """公众号有新文章时调用：标记相关缓存过期，并在后台重新生成"""
+    feed_materializer.schedule(mp_id)
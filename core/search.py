@@ -0,0 +1,229 @@
+"""文章全文检索
+
+在标题、摘要和正文纯文本上建立全文索引，按相关度排序：
+SQLite 使用 FTS5，PostgreSQL 使用 tsvector + GIN，MySQL 使用 FULLTEXT(ngram分词)。
+SQLite/PostgreSQL 的中文在写入索引前切分为二元词组(bigram)，查询词按相同方式切分后做短语匹配；
+MySQL 由 ngram 分词器处理。索引在文章新增和内容更新时同步写入，数据库不支持时回退到标题LIKE查询。
+"""
+import re
+import threading
+from sqlalchemy import text, column, table, select, Float, String
+from core.config import cfg
+from core.print import print_info, print_warning, print_error
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z\u00c0-\u024f]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def tokenize(value: str) -> list:
+    """切分为检索词：中文按相邻两字切分，字母数字按单词切分(小写)"""
+    tokens = []
+    for match in _TOKEN_RE.finditer((value or "").lower()):
+        word = match.group()
+        if _CJK_RE.match(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def split_keyword(keyword: str) -> list:
+    """搜索词按空格、-、| 拆分(与 format_search_kw 一致)，各词之间为"或"的关系"""
+    words = keyword.replace("-", " ").replace("|", " ").split(" ")
+    return [word for word in words if word.strip()]
+
+
+def _value(article, key: str):
+    return article.get(key) if isinstance(article, dict) else getattr(article, key, None)
+
+
+def search_document(article) -> dict:
+    """文章(数据字典或ORM对象)转换为索引文档"""
+    from core.content_format import format_content
+    limit = int(cfg.get("search.content_chars", 20000) or 20000)
+    content = _value(article, "content") or ""
+    if content and content != "DELETED":
+        content = format_content(content, "text")[:limit]
+    else:
+        content = ""
+    return {
+        "article_id": _value(article, "id"),
+        "title": _value(article, "title") or "",
+        "body": f"{_value(article, 'description') or ''}\n{content}",
+    }
+
+
+class SearchIndex:
+    """按数据库类型维护全文索引"""
+
+    def __init__(self):
+        self._available = {}
+        self._lock = threading.Lock()
+        self.stats = {"indexed": 0, "searches": 0, "fallbacks": 0, "errors": 0}
+
+    def enabled(self) -> bool:
+        return cfg.get("search.enabled", True) == True
+
+    def ensure(self, engine) -> bool:
+        """创建索引表(已存在则跳过)，返回当前数据库是否支持全文索引"""
+        key = str(engine.url)
+        with self._lock:
+            if key in self._available:
+                return self._available[key]
+            dialect = engine.dialect.name
+            statements = {
+                "sqlite": [
+                    "CREATE TABLE IF NOT EXISTS article_search_ids (id INTEGER PRIMARY KEY, article_id VARCHAR(255) NOT NULL UNIQUE)",
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS article_search USING fts5(title, body, tokenize='unicode61')",
+                ],
+                "postgresql": [
+                    "CREATE TABLE IF NOT EXISTS article_search (article_id VARCHAR(255) PRIMARY KEY, tsv tsvector)",
+                    "CREATE INDEX IF NOT EXISTS idx_article_search_tsv ON article_search USING GIN (tsv)",
+                ],
+                "mysql": [
+                    "CREATE TABLE IF NOT EXISTS article_search (article_id VARCHAR(255) PRIMARY KEY, title TEXT, body MEDIUMTEXT, "
+                    "FULLTEXT KEY ft_article_search (title, body) WITH PARSER ngram) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+                ],
+            }.get(dialect)
+            available = False
+            if statements:
+                try:
+                    with engine.begin() as conn:
+                        for statement in statements:
+                            conn.execute(text(statement))
+                    available = True
+                except Exception as e:
+                    print_warning(f"全文索引不可用，使用LIKE查询: {e}")
+            self._available[key] = available
+            return available
+
+    def available(self) -> bool:
+        if not self.enabled():
+            return False
+        from core.db import DB
+        return self.ensure(DB.engine)
+
+    def _key_table(self, dialect: str) -> str:
+        """记录已索引文章ID的表"""
+        return "article_search_ids" if dialect == "sqlite" else "article_search"
+
+    def index(self, session, docs: list) -> int:
+        """在会话中写入(覆盖)索引文档"""
+        if not docs or not self.available():
+            return 0
+        dialect = session.get_bind().dialect.name
+        for doc in docs:
+            title = " ".join(tokenize(doc["title"]))
+            body = " ".join(tokenize(doc["body"]))
+            if dialect == "sqlite":
+                session.execute(text("INSERT OR IGNORE INTO article_search_ids (article_id) VALUES (:id)"), {"id": doc["article_id"]})
+                rowid = session.execute(text("SELECT id FROM article_search_ids WHERE article_id = :id"), {"id": doc["article_id"]}).scalar()
+                session.execute(text("DELETE FROM article_search WHERE rowid = :rowid"), {"rowid": rowid})
+                session.execute(text("INSERT INTO article_search (rowid, title, body) VALUES (:rowid, :title, :body)"),
+                                {"rowid": rowid, "title": title, "body": body})
+            elif dialect == "postgresql":
+                session.execute(text(
+                    "INSERT INTO article_search (article_id, tsv) VALUES (:id, "
+                    "setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+                    "ON CONFLICT (article_id) DO UPDATE SET tsv = EXCLUDED.tsv"),
+                    {"id": doc["article_id"], "title": title, "body": body})
+            elif dialect == "mysql":
+                # ngram分词器直接处理原文
+                session.execute(text(
+                    "INSERT INTO article_search (article_id, title, body) VALUES (:id, :title, :body) "
+                    "ON DUPLICATE KEY UPDATE title = VALUES(title), body = VALUES(body)"),
+                    {"id": doc["article_id"], "title": doc["title"], "body": doc["body"]})
+        self.stats["indexed"] += len(docs)
+        return len(docs)
+
+    def index_articles(self, articles: list) -> int:
+        """生成文档并通过写入通道更新索引，失败不影响文章入库(由 backfill 补齐)"""
+        if not articles or not self.available():
+            return 0
+        from core.db import DB
+        try:
+            docs = [search_document(article) for article in articles]
+            return DB.write(lambda session: self.index(session, docs))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print_error(f"更新全文索引失败: {e}")
+            return 0
+
+    def search(self, session, keyword: str):
+        """按相关度检索，返回 (article_id, score) 子查询，score越大越相关
+
+        不支持全文索引或搜索词无法切分(如单个汉字)时返回None，调用方回退到LIKE查询
+        """
+        words = split_keyword(keyword or "")
+        if not words or not self.available():
+            self.stats["fallbacks"] += 1
+            return None
+        dialect = session.get_bind().dialect.name
+        params = {}
+        if dialect == "mysql":
+            phrases = [word.replace('"', " ").strip() for word in words]
+            if any(len(phrase) < 2 for phrase in phrases):
+                self.stats["fallbacks"] += 1
+                return None
+            params["q"] = " ".join(f'"{phrase}"' for phrase in phrases)
+            sql = ("SELECT article_id, MATCH (title, body) AGAINST (:q IN BOOLEAN MODE) AS score FROM article_search "
+                   "WHERE MATCH (title, body) AGAINST (:q IN BOOLEAN MODE)")
+        else:
+            phrases = [tokenize(word) for word in words]
+            # 单个汉字不在二元词组索引中
+            if any(not tokens or any(len(token) < 2 and _CJK_RE.match(token) for token in tokens) for tokens in phrases):
+                self.stats["fallbacks"] += 1
+                return None
+            if dialect == "sqlite":
+                params["q"] = " OR ".join('"' + " ".join(tokens) + '"' for tokens in phrases)
+                # 标题权重高于正文，bm25越小越相关
+                sql = ("SELECT m.article_id AS article_id, -bm25(article_search, 10.0, 1.0) AS score FROM article_search "
+                       "JOIN article_search_ids m ON m.id = article_search.rowid WHERE article_search MATCH :q")
+            else:
+                terms = []
+                for i, tokens in enumerate(phrases):
+                    params[f"q{i}"] = " ".join(tokens)
+                    terms.append(f"phraseto_tsquery('simple', :q{i})")
+                sql = (f"SELECT article_id, ts_rank(tsv, q) AS score FROM article_search, (SELECT {' || '.join(terms)} AS q) AS tsq "
+                       "WHERE tsv @@ q")
+        self.stats["searches"] += 1
+        return text(sql).bindparams(**params).columns(article_id=String, score=Float).subquery("search")
+
+    def backfill(self, batch_size: int = 200) -> int:
+        """为尚未建立索引的文章补建索引(启用全文检索前已入库的文章、写索引失败的文章)"""
+        if not self.available():
+            return 0
+        from core.db import DB
+        from core.models.article import Article
+        total = 0
+        while True:
+            try:
+                with DB.session_scope(auto_commit=False) as session:
+                    indexed = select(column("article_id")).select_from(table(self._key_table(DB.engine.dialect.name)))
+                    rows = session.query(Article).options(*Article.load_content()).filter(
+                        Article.id.not_in(indexed)).limit(batch_size).all()
+                    articles = [{"id": row.id, "title": row.title, "description": row.description, "content": row.content} for row in rows]
+            except Exception as e:
+                print_error(f"补建全文索引失败: {e}")
+                break
+            if not articles:
+                break
+            count = self.index_articles(articles)
+            if not count:
+                break
+            total += count
+        if total:
+            print_info(f"补建全文索引完成: {total}篇文章")
+        return total
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+search_index = SearchIndex()
+
+
+def start_backfill():
+    """在后台线程中补建全文索引"""
+    if search_index.enabled():
+        threading.Thread(target=search_index.backfill, daemon=True).start()
@@ -1,15 +1,19 @@
-import requests
 import json
 from bs4 import BeautifulSoup
 from core.models import Feed
 from driver.wx import DoSuccess
 from core.db import DB
 from core.models.feed import Feed
+from core.feed_cache import feed_cache
+from core.http_client import http_client
 from .cfg import cfg,wx_cfg
-from core.print import print_error,print_info
-from core.rss import RSS
+from core.print import print_error,print_info,print_warning
+from .limiter import limiter_for
+from . import watermark
+from .seen import seen_index
 from driver.success import setStatus
 import random
+import time
 # 定义一些常见的 User-Agent
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -36,19 +40,26 @@ USER_AGENTS = [
 # 定义基类
 class WxGather:
     articles=[]
-    aids=[]
+    # 批量写入文章时每次写入的数量
+    FILL_BATCH_SIZE=50
     def all_count(self):
         if getattr(self, 'articles', None) is not None:
             return len(self.articles)
         return 0
     def RecordAid(self,aid:str):
-        self.aids.append(aid)
-        pass
+        seen_index.stored(getattr(self,"_mp_id",None),aid)
+        self._claims.discard(str(aid))
     def HasGathered(self,aid:str):
-        if aid in self.aids:
-            return True
-        self.RecordAid(aid)
-        return False
+        """文章是否已采集过，未采集时由当前采集认领"""
+        claimed=seen_index.claim(getattr(self,"_mp_id",None),aid)
+        if claimed:
+            self._claims.add(str(aid))
+        return not claimed
+    def ReleaseAid(self,aid:str):
+        """文章未能入库时释放当前采集的认领，不影响其他采集的认领"""
+        if str(aid) in self._claims:
+            self._claims.discard(str(aid))
+            seen_index.release(getattr(self,"_mp_id",None),aid)
     def Model(self):
         type=cfg.get("gather.model","web")
         
@@ -62,14 +73,18 @@ class WxGather:
             from core.wx import MpsApi
             wx=MpsApi()
         return wx
+    # 正文抓取方式不支持并发时(如共用一个浏览器)设为True
+    CONTENT_EXCLUSIVE=False
     def __init__(self,is_add:bool=False):
         self.articles=[]
+        self._pending=[]
+        self._deferred=set()
+        self._content_jobs=[]
+        self._claims=set()
         self.is_add=is_add
         self._cookies={}
-        session=  requests.Session()
-        timeout = (5, 10)  
-        session.timeout = timeout
-        self.session=session
+        # 共用连接池(见 core/http_client.py)
+        self.session=http_client
         self.get_token()
     def get_token(self):
         cfg.reload()
@@ -77,6 +92,9 @@ class WxGather:
         self.Gather_Content=cfg.get('gather.content',False)
         self.cookies = wx_cfg.get('cookie', '')
         self.token=wx_cfg.get('token','')
+        # 同一登录会话的请求共享限速
+        self.limiter=limiter_for(self.token)
+        self._retries=0
         # 随机选择一个 User-Agent
         self.user_agent = cfg.get('user_agent', '')
         user_agent = random.choice(USER_AGENTS)
@@ -85,6 +103,22 @@ class WxGather:
             "Cookie":self.cookies,
             "User-Agent": user_agent
         }
+    def Throttle(self):
+        """请求公众号平台接口前按会话限速"""
+        self.limiter.acquire()
+    def FrequencyControl(self,begin)->bool:
+        """触发频率限制(200013)时降速退避，返回是否重试当前页，超过 gather.retry 次后停止采集"""
+        self.limiter.penalize()
+        self._retries+=1
+        if self._retries>int(cfg.get("gather.retry",3) or 0):
+            self.Error("frequencey control, stop at {}".format(str(begin)))
+            return False
+        print_warning(f"触发频率限制，降速后重试({self._retries}): {begin}")
+        return True
+    def RequestOk(self):
+        """请求成功，逐步恢复速率"""
+        self._retries=0
+        self.limiter.reward()
     def fix_header(self,url):
          user_agent = random.choice(USER_AGENTS)
           # 更新请求头
@@ -153,10 +187,97 @@ class WxGather:
                         art["description"] = _html_to_text(digest) if digest_contains_html else digest
                     else:
                         art["description"] = ""
+                batch=getattr(CallBack,"batch",None)
+                if batch is not None:
+                    # 支持批量写入的回调先缓存，每页结束或达到批量大小时一起写入
+                    self._pending.append((art,Ext_Data))
+                    self._pending_batch=batch
+                    self._content_callback=getattr(CallBack,"content",None)
+                    if len(self._pending)>=self.FILL_BATCH_SIZE:
+                        self.FlushBack()
+                    return
                 if CallBack(art):
                     art["ext"]=Ext_Data
                     # art.pop("content")
                     self.articles.append(art)
+                    self.RecordAid(art["id"])
+                    self._submit_content(art,getattr(CallBack,"content",None))
+                else:
+                    self.ReleaseAid(art["id"])
+
+    def FlushBack(self):
+        """批量写入缓存的文章，新增的文章加入采集结果"""
+        pending=getattr(self,"_pending",None)
+        if not pending:
+            return
+        self._pending=[]
+        try:
+            added={id(art) for art in self._pending_batch([art for art,_ in pending])}
+        except Exception:
+            for art,_ in pending:
+                self.ReleaseAid(art["id"])
+            raise
+        for art,ext_data in pending:
+            if id(art) in added:
+                art["ext"]=ext_data
+                self.articles.append(art)
+                self.RecordAid(art["id"])
+                self._submit_content(art,getattr(self,"_content_callback",None))
+            else:
+                self.ReleaseAid(art["id"])
+
+    def SyncWatermark(self,mp_id:str,incremental=None)->bool:
+        """读取公众号的增量采集水位，返回是否增量采集(默认按 gather.incremental)"""
+        if incremental is None:
+            incremental=cfg.get("gather.incremental",True)
+        self._incremental=bool(incremental) and bool(mp_id)
+        self._watermark=watermark.load(mp_id) if self._incremental else None
+        return self._incremental
+
+    def NewItems(self,mp_id:str,items:list)->tuple:
+        """过滤列表页中已入库的文章
+
+        Returns:
+            (需要处理的文章, 是否停止翻页)
+        """
+        if not getattr(self,"_incremental",False):
+            return items,False
+        known=seen_index.known(mp_id,[item.get("aid") for item in items])
+        stop=watermark.page_known(items,known,self._watermark)
+        return [item for item in items if str(item.get("aid")) not in known],stop
+
+    def DeferContent(self,item:dict)->bool:
+        """正文交给抓取线程池，文章先以空正文入库，返回False时调用方直接抓取"""
+        from .content_pool import content_pool
+        if not content_pool.enabled():
+            return False
+        item["content"]=""
+        self._deferred.add(str(item["aid"]))
+        return True
+
+    def _submit_content(self,art:dict,callback=None):
+        """新增文章的正文延后抓取时提交到线程池"""
+        if art["id"] not in self._deferred:
+            return
+        self._deferred.discard(art["id"])
+        from .content_pool import content_pool
+        article_id=watermark.article_id(art.get("mp_id"),art["id"])
+        future=content_pool.submit(dict(art),article_id,self.content_extract,exclusive=self.CONTENT_EXCLUSIVE,callback=callback)
+        self._content_jobs.append((art,future))
+
+    def WaitContent(self,timeout:float=None):
+        """等待本次采集提交的正文抓取完成，并把正文补充到采集结果中(如Webhook发送前)"""
+        if timeout is None:
+            timeout=float(cfg.get("gather.content_wait",300) or 0)
+        deadline=time.monotonic()+timeout
+        jobs,self._content_jobs=self._content_jobs,[]
+        for art,future in jobs:
+            try:
+                content=future.result(timeout=max(0,deadline-time.monotonic()))
+                if content and content!="DELETED":
+                    art["content"]=content
+            except Exception:
+                print_warning(f"等待文章正文超时: {art.get('title')}")
 
 
     #通过公众号码平台接口查询公众号
@@ -180,7 +301,8 @@ class WxGather:
             return
         data={}
         try:
-            response = requests.get(
+            self.Throttle()
+            response = self.session.get(
             url,
             params=params,
             headers=headers,
@@ -189,6 +311,7 @@ class WxGather:
             data = response.text  # 解析JSON数据
             msg = json.loads(data)  # 手动解析
             if msg['base_resp']['ret'] == 200013:
+                self.limiter.penalize()
                 self.Error("frequencey control, stop at {}".format(str(kw)))
                 return
             if msg['base_resp']['ret'] != 0:
@@ -204,7 +327,12 @@ class WxGather:
     
     
     def Start(self,mp_id=None):
+        self._mp_id=mp_id
         self.articles=[]
+        self._pending=[]
+        self._deferred=set()
+        self._content_jobs=[]
+        self._claims=set()
         self.get_token()
         if self.token=="" or self.token is None:
              self.Error("请先扫码登录公众号平台")
@@ -217,6 +345,7 @@ class WxGather:
 
     def Item_Over(self,item=None,CallBack=None):
         print(f"item end")
+        self.FlushBack()
         _cookies=[{'name': c.name, 'value': c.value, 'domain': c.domain,'expiry':c.expires,'expires':c.expires} for c in self._cookies]
         _cookies.append({'name':'token','value':self.token})
         if len(_cookies) > 0:   
@@ -239,15 +368,20 @@ class WxGather:
         # raise Exception(error)
 
     def Over(self,CallBack=None):
+        self.FlushBack()
+        # 抓取失败或中途停止时仍未入库的文章，释放认领后下次采集重新处理
+        for aid in list(getattr(self,"_claims",())):
+            self.ReleaseAid(aid)
         if getattr(self, 'articles', None) is not None:
             print(f"成功{len(self.articles)}条")
-            rss=RSS()
+            from core.rss_feed import materialize_feeds
             mp_id=""
             try:
                 mp_id=self.articles[0]['mp_id']
             except:
                 pass
-            rss.clear_cache(mp_id=mp_id)  
+            # 标记相关RSS缓存过期并在后台重新生成
+            materialize_feeds(mp_id)
         if CallBack is not None:
             CallBack(self.articles)
 
@@ -287,19 +421,13 @@ class WxGather:
             if hasattr(mp,'status') and mp.status is not None:
                 update_data['status']=mp.status
 
-            # 获取数据库会话并执行更新
-            session = DB.get_session()
-            try:
-                feed = session.query(Feed).filter(Feed.id == mp_id).first()
-                if feed:
-                    for key, value in update_data.items():
-                        print(f"更新公众号{mp_id}的{key}为{value}")
-                        setattr(feed, key, value)
-                    session.commit()
-                else:
-                    print_error(f"未找到ID为{mp_id}的公众号记录")
-            finally:
-                pass
+            # 通过写入接口执行更新(SQLite下与其他写操作合并提交)
+            for key, value in update_data.items():
+                print(f"更新公众号{mp_id}的{key}为{value}")
+            updated = DB.write(lambda session: session.query(Feed).filter(Feed.id == mp_id).update(update_data))
+            feed_cache.invalidate(mp_id)
+            if not updated:
+                print_error(f"未找到ID为{mp_id}的公众号记录")
                 
         except Exception as e:
             print_error(f"更新公众号状态失败: {e}")
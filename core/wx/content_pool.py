@@ -0,0 +1,161 @@
+"""文章正文抓取线程池
+
+列表页采集到的文章先写入元数据(正文为空)，正文抓取任务放入有界队列，
+由 gather.content_workers 个线程按 gather.content_rate(次/分钟) 限速抓取后补写，
+列表翻页不再等待正文下载和解析，新文章在几秒内即可出现在订阅源中。
+队列满(gather.content_queue)时提交任务会等待，避免列表采集远快于正文抓取时无限堆积。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from core.config import cfg
+from core.print import print_info, print_error, print_warning
+from .limiter import RateLimiter
+
+
+class ContentPool:
+    def __init__(self, workers: int = None, maxsize: int = None):
+        self._workers = workers
+        self._maxsize = maxsize
+        self._queue = None
+        self._threads = []
+        self._lock = threading.Lock()
+        # 不支持并发的抓取方式(如共用一个浏览器)串行执行
+        self._exclusive = threading.Lock()
+        self.limiter = None
+        self.submitted = 0
+        self.running = 0
+        self.saved = 0
+        self.empty = 0
+        self.errors = 0
+        self.fetch_time = 0.0
+
+    @property
+    def workers(self) -> int:
+        if self._workers is not None:
+            return self._workers
+        return max(0, int(cfg.get("gather.content_workers", 2) or 0))
+
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _start(self):
+        with self._lock:
+            if self._queue is not None:
+                return
+            maxsize = self._maxsize if self._maxsize is not None else int(cfg.get("gather.content_queue", 200) or 0)
+            self.limiter = RateLimiter(rate=cfg.get("gather.content_rate", 30), burst=1, backoff=0)
+            self._queue = queue.Queue(maxsize=maxsize)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"content-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            print_info(f"正文抓取线程已启动: {self.workers}个")
+
+    def submit(self, art: dict, article_id: str, extract, exclusive: bool = False, callback=None) -> Future:
+        """提交正文抓取任务
+
+        Args:
+            art: 文章数据(标题、简介等，用于更新全文索引)
+            article_id: 文章ID
+            extract: 抓取函数 extract(url)，返回正文HTML
+            exclusive: 抓取函数不支持并发时为True
+            callback: 正文保存后的回调 callback(art, article_id)
+
+        Returns:
+            Future，结果为抓取到的正文(失败为空字符串)
+        """
+        self._start()
+        future = Future()
+        with self._lock:
+            self.submitted += 1
+        self._queue.put((future, art, article_id, extract, exclusive, callback))
+        return future
+
+    def _run(self):
+        while True:
+            future, art, article_id, extract, exclusive, callback = self._queue.get()
+            with self._lock:
+                self.running += 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(self._fetch(art, article_id, extract, exclusive, callback))
+            except Exception as e:
+                print_error(f"抓取文章正文失败: {article_id}, {e}")
+                with self._lock:
+                    self.errors += 1
+                if not future.done():
+                    future.set_result("")
+            finally:
+                with self._lock:
+                    self.running -= 1
+                self._queue.task_done()
+
+    def _fetch(self, art: dict, article_id: str, extract, exclusive: bool, callback) -> str:
+        self.limiter.acquire()
+        start = time.monotonic()
+        if exclusive:
+            with self._exclusive:
+                content = extract(art.get("url"))
+        else:
+            content = extract(art.get("url"))
+        with self._lock:
+            self.fetch_time += time.monotonic() - start
+        if not content:
+            with self._lock:
+                self.empty += 1
+            return ""
+        self._save(art, article_id, content)
+        with self._lock:
+            self.saved += 1
+        if callback is not None and content != "DELETED":
+            art["content"] = content
+            callback(art, article_id)
+        return content
+
+    def _save(self, art: dict, article_id: str, content: str):
+        """保存正文，同时更新修改时间使RSS条目片段和ETag失效"""
+        from core.db import DB
+        from core.models.article import Article
+        from core.models.base import DATA_STATUS
+        from core.content_store import save_content
+        from core.search import search_index
+        import core.article_stats as article_stats
+        values = {"updated_at": datetime.now()}
+        if content == "DELETED":
+            print_warning(f"文章已被发布者删除: {article_id}")
+            values["status"] = DATA_STATUS.DELETED
+
+        def update(session):
+            with article_stats.track(session, [article_id]):
+                session.query(Article).filter(Article.id == article_id).update(values)
+                if content != "DELETED":
+                    save_content(session, article_id, content)
+        DB.write(update)
+        if content != "DELETED":
+            search_index.index_articles([{"id": article_id, "title": art.get("title"), "description": art.get("description"), "content": content}])
+
+    def join(self):
+        """等待队列中的任务全部完成"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            fetched = self.saved + self.empty
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "running": self.running,
+                "submitted": self.submitted,
+                "saved": self.saved,
+                "empty": self.empty,
+                "errors": self.errors,
+                "avg_fetch": round(self.fetch_time / fetched, 2) if fetched else 0,
+                "limiter": self.limiter.get_stats() if self.limiter is not None else None,
+            }
+
+
+content_pool = ContentPool()
@@ -0,0 +1,105 @@
+"""多公众号并发采集
+
+同时采集 gather.concurrency 个公众号，请求速率由会话限速器(见 limiter.py)控制，
+一轮采集的耗时取决于允许的请求速率，而不是各公众号等待时间之和。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.config import cfg
+from core.print import print_info, print_error, print_warning
+from .limiter import get_limiter_stats
+from .seen import seen_index
+
+
+class GatherEngine:
+    def __init__(self, concurrency: int = None):
+        self._concurrency = concurrency
+        self._lock = threading.Lock()
+        self.running = 0
+        self.cycles = 0
+        self.feeds = 0
+        self.failed = 0
+        self.articles = 0
+        self.last_cycle = None
+
+    @property
+    def concurrency(self) -> int:
+        if self._concurrency is not None:
+            return self._concurrency
+        return max(1, int(cfg.get("gather.concurrency", 4) or 1))
+
+    def run(self, feeds: list, job, should_stop=None) -> dict:
+        """并发采集公众号
+
+        Args:
+            feeds: 公众号列表
+            job: 采集单个公众号的函数 job(feed)，返回新增文章数量
+            should_stop: 返回True时不再开始新的公众号(如登录失效)
+
+        Returns:
+            本轮采集统计
+        """
+        feeds = list(feeds or [])
+        cycle = {"feeds": len(feeds), "done": 0, "failed": 0, "skipped": 0, "articles": 0, "started_at": time.time()}
+        if not feeds:
+            return cycle
+        start = time.monotonic()
+
+        def _run(feed):
+            if should_stop is not None and should_stop():
+                with self._lock:
+                    cycle["skipped"] += 1
+                return
+            with self._lock:
+                self.running += 1
+            try:
+                count = job(feed) or 0
+                with self._lock:
+                    cycle["done"] += 1
+                    cycle["articles"] += count
+            except Exception as e:
+                print_error(f"采集公众号失败[{getattr(feed, 'mp_name', feed)}]: {e}")
+                with self._lock:
+                    cycle["failed"] += 1
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        workers = min(self.concurrency, len(feeds))
+        print_info(f"开始采集{len(feeds)}个公众号，并发数{workers}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gather") as executor:
+            list(executor.map(_run, feeds))
+        cycle["duration"] = round(time.monotonic() - start, 2)
+        with self._lock:
+            self.cycles += 1
+            self.feeds += cycle["done"]
+            self.failed += cycle["failed"]
+            self.articles += cycle["articles"]
+            self.last_cycle = cycle
+        if cycle["skipped"]:
+            print_warning(f"登录失效，{cycle['skipped']}个公众号未采集")
+        print_info(f"采集完成: {cycle['done']}个公众号，新增{cycle['articles']}篇，耗时{cycle['duration']}秒")
+        return cycle
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            last = dict(self.last_cycle) if self.last_cycle else None
+            stats = {
+                "concurrency": self.concurrency,
+                "running": self.running,
+                "cycles": self.cycles,
+                "feeds": self.feeds,
+                "failed": self.failed,
+                "articles": self.articles,
+                "last_cycle": last,
+            }
+        if last and last.get("duration"):
+            # 上一轮每分钟采集的公众号数量
+            stats["feeds_per_minute"] = round(last["done"] * 60 / last["duration"], 2)
+        stats["limiters"] = get_limiter_stats()
+        stats["seen"] = seen_index.get_stats()
+        return stats
+
+
+gather_engine = GatherEngine()
@@ -0,0 +1,110 @@
+"""公众号平台请求限速
+
+每个登录会话(token)一个令牌桶，按 gather.rate(次/分钟) 补充令牌，最多累积 gather.burst 个，
+同一会话的所有采集线程共享，请求前取令牌，代替原来每页请求前的随机等待。
+触发频率限制(base_resp.ret == 200013)时速率减半并暂停 gather.backoff 秒(连续触发时加倍)，
+之后每次请求成功逐步恢复到配置的速率。
+"""
+import hashlib
+import threading
+import time
+from core.config import cfg
+
+
+class RateLimiter:
+    def __init__(self, rate: float = None, burst: int = None, backoff: float = None):
+        self.base_rate = float(rate if rate is not None else cfg.get("gather.rate", 30) or 30) / 60
+        self.rate = self.base_rate
+        self.min_rate = self.base_rate / 8
+        self.burst = max(1, int(burst if burst is not None else cfg.get("gather.burst", 3) or 1))
+        self.base_backoff = float(backoff if backoff is not None else cfg.get("gather.backoff", 60) or 0)
+        self.backoff = self.base_backoff
+        self.max_backoff = self.base_backoff * 16
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waited = 0.0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self) -> float:
+        """取一个令牌，没有可用令牌时等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.requests += 1
+                        self.waited += waited
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+                else:
+                    delay = self._paused_until - now
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self):
+        """触发频率限制：降低速率并暂停，清空已累积的令牌"""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._paused_until = max(self._paused_until, now + self.backoff)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+            self.backoff = min(self.max_backoff, self.backoff * 2) if self.backoff else 0
+
+    def reward(self):
+        """请求成功：逐步恢复速率(每次增加基准速率的1/10)"""
+        with self._lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+            if self.rate >= self.base_rate:
+                self.backoff = self.base_backoff
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "rate": round(self.rate * 60, 2),
+                "base_rate": round(self.base_rate * 60, 2),
+                "burst": self.burst,
+                "tokens": round(min(self.burst, self._tokens + max(0, now - self._updated) * self.rate), 2),
+                "paused": round(max(0.0, self._paused_until - now), 1),
+                "requests": self.requests,
+                "waited": round(self.waited, 1),
+                "throttled": self.throttled,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _session_key(token: str) -> str:
+    return hashlib.md5((token or "").encode("utf-8")).hexdigest()[:8]
+
+
+def limiter_for(token: str) -> RateLimiter:
+    """获取登录会话对应的限速器"""
+    key = _session_key(token)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
+
+
+def get_limiter_stats() -> dict:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.get_stats() for key, limiter in limiters.items()}
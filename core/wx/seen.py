@@ -0,0 +1,104 @@
+"""已采集文章索引
+
+代替原来所有采集实例共用、只增不减的 WxGather.aids 列表：
+进程内按 公众号+文章ID 保存最近的 gather.seen_cache 篇文章(LRU，O(1)查询，内存有上限)，
+未命中时按主键查询文章表，已入库的文章在重启后同样视为已采集。
+同时运行的采集(如定时任务和手动更新同一公众号)通过 claim 认领文章，同一篇文章的正文只抓取一次。
+抓取或入库失败以及采集结束时释放未入库的认领(release)，之后的采集只把已入库的文章视为已采集。
+"""
+import threading
+from collections import OrderedDict
+from core.config import cfg
+from core.models.article import Article
+from . import watermark
+
+# 已认领(正在采集，尚未确认入库)
+CLAIMED = 1
+# 已入库
+STORED = 2
+
+
+class SeenIndex:
+    def __init__(self, max_items: int = None):
+        self._max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    @property
+    def max_items(self) -> int:
+        if self._max_items is None:
+            self._max_items = max(1000, int(cfg.get("gather.seen_cache", 50000) or 0))
+        return self._max_items
+
+    def _set(self, key: str, state: int):
+        """调用方需持有锁"""
+        if self._items.get(key, 0) < state:
+            self._items[key] = state
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def _stored(self, ids: list) -> set:
+        if not ids:
+            return set()
+        from core.db import DB
+        with self._lock:
+            self.lookups += 1
+        with DB.session_scope(auto_commit=False) as session:
+            return {row[0] for row in session.query(Article.id).filter(Article.id.in_(ids))}
+
+    def claim(self, mp_id: str, aid) -> bool:
+        """认领文章，返回True表示尚未采集过(由调用方抓取正文)，已采集、已入库或已被其他采集认领时返回False"""
+        key = watermark.article_id(mp_id, aid)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return False
+            self._set(key, CLAIMED)
+        if self._stored([key]):
+            self.stored(mp_id, aid)
+            return False
+        return True
+
+    def stored(self, mp_id: str, aid):
+        """文章已入库"""
+        with self._lock:
+            self._set(watermark.article_id(mp_id, aid), STORED)
+
+    def release(self, mp_id: str, aid):
+        """释放认领(采集失败或结束时文章仍未入库)，已入库的文章不受影响"""
+        key = watermark.article_id(mp_id, aid)
+        with self._lock:
+            if self._items.get(key) == CLAIMED:
+                del self._items[key]
+
+    def known(self, mp_id: str, aids: list) -> set:
+        """已入库的文章(列表页中的文章ID)，只查询不在内存中的文章"""
+        keys = {watermark.article_id(mp_id, aid): str(aid) for aid in aids if aid}
+        known = set()
+        missing = []
+        with self._lock:
+            for key, aid in keys.items():
+                if self._items.get(key) == STORED:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    known.add(aid)
+                else:
+                    missing.append(key)
+        stored = self._stored(missing)
+        if stored:
+            with self._lock:
+                for key in stored:
+                    self._set(key, STORED)
+            known.update(keys[key] for key in stored)
+        return known
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"items": len(self._items), "max_items": self.max_items, "hits": self.hits, "lookups": self.lookups}
+
+
+seen_index = SeenIndex()
@@ -0,0 +1,35 @@
+"""增量采集水位
+
+每个公众号的水位为已入库的最新文章(发布时间, 文章ID)，通过 (mp_id, publish_time, id) 索引读取。
+采集列表页时跳过已入库的文章(见 seen.py)，不重复抓取正文，
+列表按发布时间倒序，一页中出现已入库或不晚于水位的文章时停止翻页，日常更新每个公众号只需请求一页列表。
+"""
+from core.models.article import Article
+
+
+def article_id(mp_id: str, aid) -> str:
+    """列表页中的文章ID转换为入库的文章ID(与 Db.add_article 一致)"""
+    aid = str(aid)
+    return f"{mp_id}-{aid}".replace("MP_WXS_", "") if mp_id else aid
+
+
+def load(mp_id: str):
+    """公众号的水位 (发布时间, 文章ID)，没有入库文章时返回None"""
+    if not mp_id:
+        return None
+    from core.db import DB
+    with DB.session_scope(auto_commit=False) as session:
+        row = session.query(Article.publish_time, Article.id).filter(Article.mp_id == mp_id) \
+            .order_by(Article.publish_time.desc(), Article.id.desc()).first()
+    return tuple(row) if row is not None and row[0] is not None else None
+
+
+def page_known(items: list, known: set, watermark) -> bool:
+    """是否停止翻页：列表按发布时间倒序，一页中出现已采集过的文章(已入库，或发布时间不晚于水位)时，之后的文章都已采集"""
+    newest = watermark[0] if watermark else None
+    for item in items:
+        if str(item.get("aid")) in known:
+            return True
+        if newest is not None and int(item.get("update_time") or 0) <= newest:
+            return True
+    return False
@@ -143,7 +143,6 @@ def get_list(faker_id:str=None,mp_id:str=None,is_add:bool=False):
     try:
         data=data['publish_page']['publish_list']
         wx_db=db.Db(tag="获取公众号列表")
-        wx_db.init(cfg.get('db'))
         for i in data:
             art=i['publish_info']
             art=json.loads(art)
@@ -176,6 +175,7 @@ from core.models import Feed
 # 更新公众号更新状态
 from core.db import DB
 from core.models.feed import Feed
+from core.feed_cache import feed_cache
 
 def update_mps(mp_id:str, mp:Feed):
     """更新公众号同步状态和时间信息
@@ -211,6 +211,7 @@ def update_mps(mp_id:str, mp:Feed):
                     print(f"更新公众号{mp_id}的{key}为{value}")
                     setattr(feed, key, value)
                 session.commit()
+                feed_cache.invalidate(mp_id)
             else:
                 print(f"未找到ID为{mp_id}的公众号记录")
         finally:
@@ -1,7 +1,5 @@
 import json
-import requests
-import time
-import random
+import httpx
 import yaml
 import re
 from bs4 import BeautifulSoup
@@ -40,8 +38,10 @@ class MpsAppMsg(WxGather):
                 logger.error(e)
         return ""
     # 重写 get_Articles 方法
-    def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page:int=0,MaxPage:int=1,interval=10,Gather_Content=False,Item_Over_CallBack=None,Over_CallBack=None):
+    def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page:int=0,MaxPage:int=1,interval=10,Gather_Content=False,Item_Over_CallBack=None,Over_CallBack=None,Incremental=None):
         super().Start(mp_id=Mps_id)
+        # 增量采集时遇到已入库的文章停止翻页
+        super().SyncWatermark(Mps_id,Incremental)
         if self.Gather_Content:
             Gather_Content=True
         print(f"Web浏览器模式,是否采集[{Mps_title}]内容：{Gather_Content}\n")
@@ -69,17 +69,18 @@ class MpsAppMsg(WxGather):
             begin = i * count
             params["begin"] = str(begin)
             print(f"第{i+1}页开始爬取\n")
-            # 随机暂停几秒，避免过快的请求导致过快的被查到
-            time.sleep(random.randint(0,interval))
+            # 按会话限速，避免过快的请求导致过快的被查到
+            super().Throttle()
             try:
                 headers = self.fix_header(url)
-                resp = session.get(url, headers=headers, params = params, verify=True)
+                resp = session.get(url, headers=headers, params = params)
                 
                 msg = resp.json()
-                self._cookies =resp.cookies
+                self._cookies =resp.cookies.jar
                 # 流量控制了, 退出
                 if msg['base_resp']['ret'] == 200013:
-                    super().Error("frequencey control, stop at {}".format(str(begin)))
+                    if super().FrequencyControl(begin):
+                        continue
                     break
                 
                 if msg['base_resp']['ret'] == 200003:
@@ -97,29 +98,38 @@ class MpsAppMsg(WxGather):
                     break  
                 if "publish_page" in msg:
                     msg["publish_page"]=json.loads(msg['publish_page'])
+                    items=[]
                     for item in msg["publish_page"]['publish_list']:
                         if "publish_info" in item:
                             publish_info= json.loads(item['publish_info'])
                        
                             if "appmsgex" in publish_info:
-                                # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
-                                for item in publish_info["appmsgex"]:
-                                    if Gather_Content:
-                                        if not super().HasGathered(item["aid"]):
-                                            item["content"] = self.content_extract(item['link'])
-                                    else:
-                                        item["content"] = ""
-                                    item["id"] = item["aid"]
-                                    item["mp_id"] = Mps_id
-                                    if CallBack is not None:
-                                        super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+                                items.extend(publish_info["appmsgex"])
+                    # 跳过已入库的文章
+                    items,stop=super().NewItems(Mps_id,items)
+                    # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
+                    for item in items:
+                        if Gather_Content:
+                            # 正文交给抓取线程池，不阻塞列表翻页
+                            if not super().HasGathered(item["aid"]) and not super().DeferContent(item):
+                                item["content"] = self.content_extract(item['link'])
+                        else:
+                            item["content"] = ""
+                        item["id"] = item["aid"]
+                        item["mp_id"] = Mps_id
+                        if CallBack is not None:
+                            super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
                     print(f"第{i+1}页爬取成功\n")
+                    super().RequestOk()
+                    if stop:
+                        print(f"第{i+1}页没有新文章，停止翻页\n")
+                        break
                 # 翻页
                 i += 1
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 print("Request timed out")
                 break
-            except requests.exceptions.RequestException as e:
+            except (httpx.HTTPError, ValueError) as e:
                 print(f"Request error: {e}")
                 break
             finally:
@@ -194,6 +194,20 @@ class DatabaseSynchronizer:
                         return False
                     continue
             
+            # 创建常用查询的索引(不长时间锁表)
+            try:
+                from core.db_index import migrate_indexes
+                migrate_indexes(self.engine)
+            except Exception as e:
+                self.logger.error(f"创建索引失败: {e}")
+
+            # 文章正文迁移到单独的压缩存储
+            try:
+                from core.content_store import migrate_contents
+                migrate_contents(self.engine)
+            except Exception as e:
+                self.logger.error(f"迁移文章正文失败: {e}")
+
             self.logger.info("模型同步完成")
             return True
         except SQLAlchemyError as e:
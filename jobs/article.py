@@ -29,11 +29,7 @@ def UpdateArticle(art:dict,check_exist=False):
         
         if DB.add_article(art,check_exist=check_exist):
             mps_count=mps_count+1
-            print_info(f"成功添加文章: {art.get('title', '未知标题')} (ID: {article_id})")
-            
-            # 如果文章有内容且AI简报功能启用，立即触发简报生成
-            _trigger_brief_generation_if_needed(art, article_id)
-            
+            _on_article_added(art, article_id)
             return True
         else:
             print_info(f"文章添加失败或已存在: {art.get('title', '未知标题')} (ID: {art.get('id', 'unknown')})")
@@ -44,6 +40,80 @@ def UpdateArticle(art:dict,check_exist=False):
         print_error(f"错误详情: {traceback.format_exc()}")
         return False
 
+def UpdateArticles(arts:list) -> list:
+    """批量添加文章到数据库，已存在的文章忽略
+
+    Args:
+        arts: 文章数据字典列表
+
+    Returns:
+        list: 新增的文章数据字典(保持传入顺序)
+    """
+    from core.print import print_error
+    try:
+        new_ids = set(DB.add_articles(arts))
+        added = []
+        for art in arts:
+            article_id = f"{str(art.get('mp_id'))}-{art.get('id')}".replace("MP_WXS_","") if art.get('mp_id') else art.get('id')
+            if article_id in new_ids:
+                new_ids.discard(article_id)
+                _on_article_added(art, article_id)
+                added.append(art)
+        return added
+    except Exception as e:
+        print_error(f"UpdateArticles 执行失败: {str(e)}")
+        import traceback
+        print_error(f"错误详情: {traceback.format_exc()}")
+        return []
+
+def UpdateContent(art: dict, article_id: str):
+    """正文抓取线程池补写正文后的处理(见 WxGather.DeferContent)"""
+    from core.print import print_info
+    print_info(f"成功补充文章正文: {art.get('title', '未知标题')} (ID: {article_id})")
+    _update_feed_cache(article_id, art.get('mp_id'))
+    _format_webhook_content(article_id, art.get('content'))
+    _trigger_brief_generation_if_needed(art, article_id)
+
+# 采集时按批写入文章(见 WxGather.FillBack)
+UpdateArticle.batch = UpdateArticles
+# 正文由抓取线程池补写后的处理
+UpdateArticle.content = UpdateContent
+
+def _on_article_added(art: dict, article_id: str):
+    """新文章入库后的处理"""
+    from core.print import print_info
+    print_info(f"成功添加文章: {art.get('title', '未知标题')} (ID: {article_id})")
+
+    # 预先生成RSS条目片段，并在后台更新相关订阅源缓存
+    _update_feed_cache(article_id, art.get('mp_id'))
+
+    # 预先转换Webhook发送格式的文章内容
+    _format_webhook_content(article_id, art.get('content'))
+
+    # 如果文章有内容且AI简报功能启用，立即触发简报生成
+    _trigger_brief_generation_if_needed(art, article_id)
+
+def _update_feed_cache(article_id: str, mp_id: str):
+    """预先生成文章的RSS条目片段并更新相关订阅源缓存，失败不影响文章入库"""
+    try:
+        from core.rss_feed import prerender_article, materialize_feeds
+        prerender_article(article_id)
+        materialize_feeds(mp_id)
+    except Exception as e:
+        from core.print import print_warning
+        print_warning(f"更新RSS缓存失败: {article_id}, {e}")
+
+def _format_webhook_content(article_id: str, content: str):
+    """按Webhook配置的内容格式预先转换文章内容，发送时直接读取缓存"""
+    try:
+        from core.content_format import format_article_content, CONVERT_FORMATS
+        content_format = cfg.get("webhook.content_format", "html")
+        if content and content_format in CONVERT_FORMATS:
+            format_article_content(article_id, content, content_format)
+    except Exception as e:
+        from core.print import print_warning
+        print_warning(f"转换文章内容失败: {article_id}, {e}")
+
 def _trigger_brief_generation_if_needed(art: dict, article_id: str):
     """如果文章有内容且AI简报功能启用，立即触发简报生成"""
     try:
@@ -8,7 +8,7 @@ from typing import List, Optional
 import core.db as db
 from core.models.article import Article
 from core.models.brief import Brief
-from core.models.feed import Feed
+from core.feed_cache import feed_cache
 from core.ai.brief_generator import BriefGenerator
 from core.config import cfg
 from core.print import print_info, print_error, print_success, print_warning
@@ -74,11 +74,7 @@ class BriefService:
                 return None
             
             # 获取公众号名称
-            mp_name = '未知'
-            if article.mp_id:
-                feed = session.query(Feed).filter(Feed.id == article.mp_id).first()
-                if feed:
-                    mp_name = feed.mp_name or '未知'
+            mp_name = feed_cache.name(article.mp_id, '未知', session=session)
             
             # 准备文章数据（在session内获取，避免分离问题）
             article_data = self._get_article_data(article, mp_name)
@@ -95,54 +91,48 @@ class BriefService:
             print_error(f"错误详情: {traceback.format_exc()}")
             return None
         
-        # 第三步：保存简报（重新获取session用于保存）
-        with DB.session_scope(auto_commit=False) as session:
-            try:
-                # 再次检查简报是否已存在（防止并发创建）
-                existing_brief = session.query(Brief).filter(
-                    Brief.article_key == article_key
-                ).first()
-                
-                if existing_brief:
-                    print_info(f"文章 {article_key} 的简报已存在（并发创建），跳过保存")
-                    return existing_brief
-                
-                # 创建并保存简报
-                brief = Brief(
-                    id=str(uuid.uuid4()),
-                    article_key=article_key,  # article_key就是Article.id
-                    model=brief_data['model'],
-                    summary=brief_data['summary'],
-                    highlights=brief_data['highlights'],
-                    version=brief_data['version'],
-                    language=brief_data['language'],
-                    tags=brief_data['tags'],
-                    confidence=brief_data['confidence'],
-                    generated_at=brief_data['generated_at'],
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                
-                session.add(brief)
-                session.commit()
-                
-                # 验证保存是否成功
-                verify_brief = session.query(Brief).filter(
-                    Brief.article_key == article_key
-                ).first()
-                if verify_brief:
-                    print_success(f"简报生成并保存成功: {article_title} (article_key: {article_key})")
-                else:
-                    print_error(f"简报保存后验证失败: {article_key}")
-                
-                return brief
-                
-            except Exception as e:
-                session.rollback()
-                print_error(f"保存简报失败 (文章: {article_key}): {str(e)}")
-                import traceback
-                print_error(f"错误详情: {traceback.format_exc()}")
-                return None
+        # 第三步：保存简报（通过写入线程提交，不在事件循环中等待）
+        def save(session):
+            # 再次检查简报是否已存在（防止并发创建）
+            existing_brief = session.query(Brief).filter(
+                Brief.article_key == article_key
+            ).first()
+            
+            if existing_brief:
+                print_info(f"文章 {article_key} 的简报已存在（并发创建），跳过保存")
+                return db.detach(session, existing_brief), False
+            
+            # 创建并保存简报
+            brief = Brief(
+                id=str(uuid.uuid4()),
+                article_key=article_key,  # article_key就是Article.id
+                model=brief_data['model'],
+                summary=brief_data['summary'],
+                highlights=brief_data['highlights'],
+                version=brief_data['version'],
+                language=brief_data['language'],
+                tags=brief_data['tags'],
+                confidence=brief_data['confidence'],
+                generated_at=brief_data['generated_at'],
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            
+            session.add(brief)
+            return db.detach(session, brief), True
+        
+        try:
+            import asyncio
+            brief, created = await asyncio.to_thread(DB.write, save)
+            if created:
+                print_success(f"简报生成并保存成功: {article_title} (article_key: {article_key})")
+            return brief
+            
+        except Exception as e:
+            print_error(f"保存简报失败 (文章: {article_key}): {str(e)}")
+            import traceback
+            print_error(f"错误详情: {traceback.format_exc()}")
+            return None
     
     async def generate_briefs_for_articles(self, article_keys: List[str], limit: Optional[int] = None) -> dict:
         """
@@ -239,8 +229,7 @@ class BriefService:
                 # 查询有内容但没有简报的文章
                 # Article.id == Brief.article_key 是正确的映射关系
                 articles = session.query(Article.id).filter(
-                    Article.content.isnot(None),
-                    Article.content != '',
+                    Article.has_content(),
                     Article.status == 1  # 只处理活跃文章（DATA_STATUS.ACTIVE）
                 ).outerjoin(
                     Brief, Article.id == Brief.article_key
@@ -2,6 +2,11 @@ from core.models.article import Article,DATA_STATUS
 import core.db as db
 from core.wx.base import WxGather
 from time import sleep
+from datetime import datetime
+from core.rss_feed import materialize_feeds
+from core.search import search_index
+from core.content_store import save_content
+import core.article_stats as article_stats
 from core.print import print_success,print_error
 import random
 from driver.wxarticle import Web
@@ -14,8 +19,7 @@ def fetch_articles_without_content():
     ga=WxGather().Model()
     try:
         # 查询content为空的文章
-        from sqlalchemy import or_
-        articles = session.query(Article).filter(or_(Article.content.is_(None), Article.content == "")).limit(10).all()
+        articles = session.query(Article).filter(~Article.has_content()).limit(10).all()
         
         if not articles:
             print_warning("暂无需要获取内容的文章")
@@ -37,12 +41,19 @@ def fetch_articles_without_content():
                 content = ga.content_extract(url)
             sleep(random.randint(3,10))
             if content:
-                # 更新内容
-                article.content = content
+                # 更新内容，同时更新修改时间使RSS条目片段和ETag失效
+                article_id = article.id
+                values = {"updated_at": datetime.now()}
                 if  content=="DELETED":
                     print_error(f"获取文章 {article.title} 内容已被发布者删除")
-                    article.status = DATA_STATUS.DELETED
-                session.commit()
+                    values["status"] = DATA_STATUS.DELETED
+                def update(s):
+                    with article_stats.track(s, [article_id]):
+                        s.query(Article).filter(Article.id == article_id).update(values)
+                        save_content(s, article_id, content)
+                DB.write(update)
+                search_index.index_articles([{"id": article_id, "title": article.title, "description": article.description, "content": content}])
+                materialize_feeds(article.mp_id)
                 print_success(f"成功更新文章 {article.title} 的内容")
             else:
                 print_error(f"获取文章 {article.title} 内容失败")
@@ -9,24 +9,29 @@ from core.models.feed import Feed
 from core.config import cfg,DEBUG
 from core.print import print_info,print_success,print_error,print_warning
 from driver.wx import WX_API
-from driver.success import Success
+from driver.success import Success,getStatus
+from core.wx.engine import gather_engine
 wx_db=db.Db(tag="任务调度")
+def sync_pages():
+    """定时采集的最大页数：增量采集遇到已入库的文章即停止翻页，两次采集之间新文章超过一页时可调大"""
+    if cfg.get("gather.incremental",True):
+        return max(1,int(cfg.get("gather.sync_pages",1) or 1))
+    return 1
 def fetch_all_article():
     print("开始更新")
-    wx=WxGather().Model()
+    all_count=0
     try:
-        # 获取公众号列表
+        # 获取公众号列表，并发采集
         mps=db.DB.get_all_mps()
-        for item in mps:
-            try:
-                wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
-            except Exception as e:
-                print(e)
-        print(wx.articles) 
+        def _fetch(item):
+            wx=WxGather().Model()
+            wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=sync_pages())
+            return wx.all_count()
+        all_count=gather_engine.run(mps,_fetch,should_stop=lambda: not getStatus())["articles"]
     except Exception as e:
         print(e)         
     finally:
-        logger.info(f"所有公众号更新完成,共更新{wx.all_count()}条数据")
+        logger.info(f"所有公众号更新完成,共更新{all_count}条数据")
 
 
 def test(info:str):
@@ -43,24 +48,34 @@ def do_job(mp=None,task:MessageTask=None):
         all_count=0
         wx=WxGather().Model()
         try:
-            wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=1,Over_CallBack=Update_Over,interval=interval)
+            wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=sync_pages(),Over_CallBack=Update_Over,interval=interval)
         except Exception as e:
             print_error(e)
             # raise
         finally:
             count=wx.all_count()
             all_count+=count
+            # 等待正文抓取完成后再发送消息
+            wx.WaitContent()
             from jobs.webhook import MessageWebHook 
             tms=MessageWebHook(task=task,feed=mp,articles=wx.articles)
             web_hook(tms)
             print_success(f"任务({task.id})[{mp.mp_name}]执行成功,{count}成功条数")
+        return all_count
 
 from core.queue import TaskQueue
+def do_jobs(feeds:list[Feed]=None,task:MessageTask=None):
+    """并发采集任务关联的公众号，登录失效后不再开始新的公众号"""
+    gather_engine.run(feeds,lambda mp: do_job(mp,task),should_stop=lambda: not getStatus())
+
 def add_job(feeds:list[Feed]=None,task:MessageTask=None,isTest=False):
     if isTest:
         TaskQueue.clear_queue()
+        feeds=(feeds or [])[:1]
+    feeds=list(feeds or [])
+    # 同一任务的公众号作为一个队列任务并发采集
+    TaskQueue.add_task(do_jobs,feeds,task)
     for feed in feeds:
-        TaskQueue.add_task(do_job,feed,task)
         if isTest:
             print(f"测试任务，{feed.mp_name}，加入队列成功")
             reload_job()
@@ -210,6 +225,12 @@ def start_all_task():
       #开启自动同步未同步 文章任务
     from jobs.fetch_no_article import start_sync_content
     start_sync_content()
+    # 后台为尚未建立全文索引的文章补建索引
+    from core.search import start_backfill
+    start_backfill()
+    # 定时对账文章统计
+    from core.article_stats import start_reconcile
+    start_reconcile()
     # 启动AI简报生成任务（已禁用定时任务，只在抓取时自动生成以节省token）
     # from jobs.brief import start_brief_generation_task
     # start_brief_generation_task()
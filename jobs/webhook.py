@@ -9,7 +9,7 @@ from datetime import datetime
 from core.log import logger
 from core.config import cfg
 from bs4 import BeautifulSoup
-from core.content_format import format_content
+from core.content_format import format_article_content, article_content_id
 import re
 @dataclass
 class MessageWebHook:
@@ -104,7 +104,8 @@ def call_webhook(hook: MessageWebHook) -> str:
             processed_article = article.copy()
             # 只有template需要content时才进行格式转换
             if template_needs_content:
-              processed_article["content"] = format_content(processed_article["content"], content_format)
+              article_id = article_content_id(processed_article.get("id"), processed_article.get("mp_id"))
+              processed_article["content"] = format_article_content(article_id, processed_article["content"], content_format)
             processed_articles.append(processed_article)
         else:
             processed_articles.append(article)
@@ -145,12 +146,12 @@ def call_webhook(hook: MessageWebHook) -> str:
         logger.error("web_hook_url为空")
         return 
     # 发送webhook请求
-    import requests
+    from core.http_client import http_client
     # print_success(f"发送webhook请求{payload}")
     try:
-        response = requests.post(
+        response = http_client.post(
             hook.task.web_hook_url,
-            data=payload,
+            content=payload,
             headers={"Content-Type": "application/json"}
         )
         response.raise_for_status()
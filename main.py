@@ -9,6 +9,15 @@ if __name__ == '__main__':
     if should_init:
         import init_sys as init
         init.init()
+
+    # 检查常用查询的索引是否已创建
+    from core.db import DB
+    from core.db_index import check_indexes
+    check_indexes(DB.engine)
+    # 文章表中的旧正文在后台迁移到正文表
+    from core.content_store import check_contents, start_migrate
+    if check_contents(DB.engine):
+        start_migrate()
     
     # 保持原有逻辑：命令行参数 AND 配置文件（向后兼容）
     # 同时支持环境变量作为额外选项（新增功能）
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# 测试从项目根目录导入 core/apis 等模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.config import cfg
+
+# 测试使用临时目录中的配置和SQLite数据库，不读取 config.yaml(需在导入模型之前设置)
+# 缓存、授权文件等相对路径也写入临时目录
+DATA_DIR = tempfile.mkdtemp(prefix="werss-test-")
+os.chdir(DATA_DIR)
+CONFIG_PATH = os.path.join(DATA_DIR, "config.yaml")
+with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+    f.write(f"db: sqlite:///{os.path.join(DATA_DIR, 'db.sqlite')}\n")
+cfg.config_path = CONFIG_PATH
+cfg.reload()
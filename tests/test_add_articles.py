@@ -0,0 +1,64 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.db import DB
+from core.models.base import Base
+from core.models.article import Article, ArticleContent, url_hash
+from core.models.article_stats import ArticleStats
+import core.article_stats as article_stats
+
+
+def article(aid, mp_id="MP_WXS_bulk", content="<p>body</p>"):
+    return {"id": aid, "mp_id": mp_id, "title": f"title {aid}", "url": f"http://x/{aid}", "pic_url": "",
+            "description": "d", "publish_time": 1700000000, "content": content}
+
+
+class TestAddArticles(unittest.TestCase):
+    """Bulk insert-or-ignore of gathered articles."""
+
+    @classmethod
+    def setUpClass(cls):
+        DB.create_tables()
+        article_stats.reconcile()
+
+    def count(self):
+        with DB.session_scope(auto_commit=False) as session:
+            return article_stats.article_count(session, "MP_WXS_bulk")
+
+    def test_insert_and_ignore(self):
+        """Only new rows are returned, in input order, and duplicates do not touch the counters."""
+        before = self.count()
+        added = DB.add_articles([article("b1"), article("b2"), article("b2"), article("b3", content="")])
+        self.assertEqual(added, ["bulk-b1", "bulk-b2", "bulk-b3"])
+        self.assertEqual(self.count(), before + 3)
+        added = DB.add_articles([article("b3"), article("b4"), article("b1")], chunk_size=2)
+        self.assertEqual(added, ["bulk-b4"])
+        self.assertEqual(self.count(), before + 4)
+        with DB.session_scope(auto_commit=False) as session:
+            self.assertEqual(session.get(Article, "bulk-b1").content, "<p>body</p>")
+            # 空正文不写入正文表
+            self.assertIsNone(session.get(ArticleContent, "bulk-b3"))
+            self.assertEqual(session.get(Article, "bulk-b2").url_hash, url_hash("http://x/b2"))
+
+    def test_without_returning(self):
+        """Databases without RETURNING compute the inserted ids from a lookup before the insert."""
+        engine = create_engine("sqlite://")
+        engine.dialect.insert_returning = False
+        Base.metadata.create_all(engine, tables=[Article.__table__, ArticleContent.__table__, ArticleStats.__table__])
+        session = sessionmaker(bind=engine)()
+        columns = {column.name for column in Article.__table__.columns} - {"content"}
+
+        def row(article_id):
+            values = dict.fromkeys(columns)
+            values.update(id=article_id, mp_id="mp", status=1)
+            return values
+        self.assertEqual(DB._insert_ignore(session, [row("r1"), row("r2")], {"r1": "text"}), ["r1", "r2"])
+        self.assertEqual(DB._insert_ignore(session, [row("r2"), row("r3")]), ["r3"])
+        session.commit()
+        self.assertEqual(session.query(Article).count(), 3)
+        self.assertEqual(session.get(ArticleContent, "r1").text, "text")
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
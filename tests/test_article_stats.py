@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.models.base import Base, DATA_STATUS
+from core.models.article import Article, ArticleContent
+from core.models.article_stats import ArticleStats
+import core.article_stats as article_stats
+
+
+class TestWatermark(unittest.TestCase):
+    """The per-feed watermark used for RSS ETags changes on every article write."""
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Article.__table__, ArticleContent.__table__, ArticleStats.__table__])
+        self.session = sessionmaker(bind=engine)()
+        # 合计行由对账任务创建
+        self.session.add(ArticleStats(mp_id=article_stats.TOTAL, all_count=0, deleted_count=0, wrong_count=0,
+                                      no_content_count=0, feed_count=2, updated_at=datetime(2024, 1, 1)))
+        self.add("mp1-1", "mp1")
+        self.add("mp2-1", "mp2")
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def add(self, article_id, mp_id):
+        self.session.add(Article(id=article_id, mp_id=mp_id, title=article_id, status=DATA_STATUS.ACTIVE,
+                                 publish_time=1, created_at=datetime.now(), updated_at=datetime.now()))
+        self.session.flush()
+        article_stats.added(self.session, [(mp_id, DATA_STATUS.ACTIVE, False)])
+
+    def versions(self):
+        return (article_stats.watermark(self.session, ["mp1"])[1],
+                article_stats.watermark(self.session, ["mp2"])[1],
+                article_stats.watermark(self.session)[1])
+
+    def test_missing_total(self):
+        """Without the reconciled total row the watermark is unavailable."""
+        self.session.query(ArticleStats).filter(ArticleStats.mp_id == article_stats.TOTAL).delete()
+        self.assertIsNone(article_stats.watermark(self.session, ["mp1"]))
+
+    def test_add(self):
+        mp1, mp2, total = self.versions()
+        self.add("mp1-2", "mp1")
+        self.assertNotEqual(self.versions()[0], mp1)
+        self.assertEqual(self.versions()[1], mp2)
+        self.assertNotEqual(self.versions()[2], total)
+
+    def test_edit_without_counter_change(self):
+        """Editing a title changes no counter but still moves the watermark."""
+        mp1, mp2, total = self.versions()
+        with article_stats.track(self.session, ["mp1-1"]):
+            self.session.query(Article).filter(Article.id == "mp1-1").update({"title": "changed"})
+        self.assertNotEqual(self.versions()[0], mp1)
+        self.assertEqual(self.versions()[1], mp2)
+
+    def test_delete(self):
+        """Hard and soft deletes both change the version, even within the same second."""
+        mp1, _, total = self.versions()
+        with article_stats.track(self.session, ["mp1-1"]):
+            self.session.query(Article).filter(Article.id == "mp1-1").update({"status": DATA_STATUS.DELETED})
+        soft = self.versions()
+        self.assertNotEqual(soft[0], mp1)
+        self.assertNotEqual(soft[2], total)
+        article = self.session.get(Article, "mp1-1")
+        with article_stats.track(self.session, ["mp1-1"]):
+            self.session.delete(article)
+        self.assertNotEqual(self.versions()[0], soft[0])
+        self.assertNotEqual(self.versions()[2], soft[2])
+
+    def test_unchanged(self):
+        """Reading does not move the watermark."""
+        self.assertEqual(self.versions(), self.versions())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from core.models.base import Base
+from core.models.article import Article, ArticleContent, compress_content, decompress_content
+from core.content_store import content_row, save_content, pending_contents, migrate_contents
+
+BODY = "<p>正文内容</p>" * 200
+
+
+class TestCompression(unittest.TestCase):
+    """Article bodies survive compression unchanged."""
+
+    def test_round_trip(self):
+        codec, data = compress_content(BODY)
+        self.assertEqual(codec, "zlib")
+        self.assertLess(len(data), len(BODY.encode("utf-8")))
+        self.assertEqual(decompress_content(codec, data), BODY)
+
+    def test_incompressible(self):
+        """Short text is stored raw when compression does not make it smaller."""
+        value = "短"
+        codec, data = compress_content(value)
+        self.assertEqual(codec, "raw")
+        self.assertEqual(decompress_content(codec, data), value)
+        self.assertIsNone(decompress_content("zlib", None))
+
+    def test_content_row(self):
+        row = content_row("a1", BODY)
+        self.assertEqual(row["size"], len(BODY))
+        self.assertEqual(decompress_content(row["codec"], row["data"]), BODY)
+
+
+class TestContentStore(unittest.TestCase):
+    """Bodies written through the ORM, save_content and the migration read back the same."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine, tables=[Article.__table__, ArticleContent.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+
+    def reload(self, article_id):
+        self.session.expire_all()
+        return self.session.get(Article, article_id)
+
+    def test_orm(self):
+        article = Article(id="o1", mp_id="mp", title="t")
+        article.content = BODY
+        self.session.add(article)
+        self.session.commit()
+        self.assertEqual(self.reload("o1").content, BODY)
+        self.assertEqual(self.session.get(ArticleContent, "o1").size, len(BODY))
+        # 清空正文时删除正文行
+        self.reload("o1").content = ""
+        self.session.commit()
+        self.assertIsNone(self.reload("o1").content)
+        self.assertIsNone(self.session.get(ArticleContent, "o1"))
+
+    def test_save_content(self):
+        self.session.add(Article(id="s1", mp_id="mp", title="t"))
+        save_content(self.session, "s1", "first")
+        save_content(self.session, "s1", BODY)
+        self.session.commit()
+        self.assertEqual(self.reload("s1").content, BODY)
+        self.assertEqual(self.session.query(ArticleContent).filter(ArticleContent.article_id == "s1").count(), 1)
+
+    def test_migrate_legacy(self):
+        """Bodies left in articles.content move to the compressed table; newer bodies win."""
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO articles (id, mp_id, title, content) VALUES ('m1', 'mp', 't', :body), "
+                              "('m2', 'mp', 't', 'old'), ('m3', 'mp', 't', NULL)"), {"body": BODY})
+        save_content(self.session, "m2", "new")
+        self.session.commit()
+        self.assertEqual(self.reload("m1").content, BODY)
+        self.assertTrue(pending_contents(self.engine))
+        self.assertEqual(migrate_contents(self.engine, batch_size=1), 2)
+        self.assertFalse(pending_contents(self.engine))
+        self.assertEqual(self.reload("m1").content, BODY)
+        self.assertEqual(self.reload("m2").content, "new")
+        self.assertIsNone(self.reload("m3").content)
+
+
+if __name__ == "__main__":
+    unittest.main()
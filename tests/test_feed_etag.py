@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from core.db import DB
+from core.models.feed import Feed
+from core.models.article import Article
+import core.article_stats as article_stats
+from core.rss_feed import feed_validators
+from apis.rss import is_not_modified, feed_router
+
+
+def request(**headers) -> Request:
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+class TestConditionalGet(unittest.TestCase):
+    """Matching of If-None-Match / If-Modified-Since against feed validators."""
+
+    def setUp(self):
+        self.validators = feed_validators("seed", datetime(2024, 5, 1, 12, 0, 0).astimezone())
+        self.etag = self.validators["ETag"]
+
+    def test_if_none_match(self):
+        self.assertTrue(is_not_modified(request(if_none_match=self.etag), self.validators))
+        self.assertTrue(is_not_modified(request(if_none_match=f'"other", W/{self.etag}'), self.validators))
+        self.assertTrue(is_not_modified(request(if_none_match="*"), self.validators))
+        self.assertFalse(is_not_modified(request(if_none_match='"other"'), self.validators))
+
+    def test_encoded_variant(self):
+        """The ETag of a compressed variant validates the same content version."""
+        gzip_etag = self.etag[:-1] + '-gzip"'
+        self.assertTrue(is_not_modified(request(if_none_match=gzip_etag), self.validators))
+
+    def test_if_modified_since(self):
+        last_modified = self.validators["Last-Modified"]
+        self.assertTrue(is_not_modified(request(if_modified_since=last_modified), self.validators))
+        self.assertFalse(is_not_modified(request(if_modified_since="Mon, 01 Jan 2024 00:00:00 GMT"), self.validators))
+        # If-None-Match 优先
+        self.assertFalse(is_not_modified(request(if_none_match='"other"', if_modified_since=last_modified), self.validators))
+
+    def test_seed_changes_etag(self):
+        self.assertNotEqual(feed_validators("other")["ETag"], self.etag)
+
+
+class TestFeedEtag(unittest.TestCase):
+    """Feed endpoints answer 304 until an article of the feed changes."""
+
+    @classmethod
+    def setUpClass(cls):
+        DB.create_tables()
+        now = datetime.now()
+
+        def seed(session):
+            session.merge(Feed(id="MP_WXS_etag", mp_name="etag", mp_cover="c", mp_intro="i", status=1,
+                               created_at=now, updated_at=now, faker_id="f", update_time=0, sync_time=0))
+            for i in range(3):
+                session.merge(Article(id=f"etag-{i}", mp_id="MP_WXS_etag", title=f"title {i}", url=f"http://x/{i}",
+                                      description="d", status=1, publish_time=1700000000 + i,
+                                      created_at=now, updated_at=now))
+        DB.write(seed)
+        # 建立文章统计(版本水位)
+        article_stats.reconcile()
+        app = FastAPI()
+        app.include_router(feed_router)
+        cls.client = TestClient(app)
+
+    def get(self, etag=None, fresh=True):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(f"/feed/MP_WXS_etag.xml{'?is_update=true' if fresh else ''}", headers=headers)
+
+    def test_not_modified_until_delete(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        self.assertIn("Last-Modified", first.headers)
+        self.assertEqual(self.get(etag).status_code, 304)
+        # 缓存命中时同样支持条件请求
+        self.assertEqual(self.get(etag, fresh=False).status_code, 304)
+
+        def delete(session):
+            with article_stats.track(session, ["etag-0"]):
+                session.delete(session.get(Article, "etag-0"))
+        DB.write(delete)
+        changed = self.get(etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertNotIn("title 0", changed.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
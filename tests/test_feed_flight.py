@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import unittest
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.db import DB
+from core.models.feed import Feed
+from core.models.article import Article
+from core.rss_feed import SingleFlight, FeedSource, feed_flight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Concurrent calls with the same key run once and share the result."""
+
+    def test_coalesce(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def build():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return "content"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", build)))
+        leader.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=lambda: results.append(flight.do("k", build))) for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        # 等待其他调用进入等待状态
+        while flight.get_stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + waiters:
+            thread.join(5)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(sorted(results), [("content", False)] + [("content", True)] * 3)
+        self.assertEqual(flight.get_stats()["inflight"], 0)
+
+    def test_release(self):
+        """After finish the key is free again, and errors reach the waiters."""
+        flight = SingleFlight()
+        call, leader = flight.acquire("k")
+        waiter, is_leader = flight.acquire("k")
+        self.assertTrue(leader)
+        self.assertFalse(is_leader)
+        self.assertIs(waiter, call)
+        flight.finish("k", call, error=ValueError("failed"))
+        with self.assertRaises(ValueError):
+            flight.wait(waiter)
+        self.assertEqual(flight.get_stats()["inflight"], 0)
+        self.assertTrue(flight.acquire("k")[1])
+
+    def test_timeout(self):
+        flight = SingleFlight()
+        flight.acquire("k")
+        waiter, _ = flight.acquire("k")
+        with self.assertRaises(TimeoutError):
+            flight.wait(waiter, timeout=0.05)
+        self.assertEqual(flight.get_stats()["timeouts"], 1)
+
+
+class TestStreamWaiter(unittest.TestCase):
+    """A request waiting on a streamed response falls back to building the feed."""
+
+    @classmethod
+    def setUpClass(cls):
+        from apis.rss import feed_router
+        DB.create_tables()
+        now = datetime.now()
+
+        def seed(session):
+            session.merge(Feed(id="MP_WXS_flight", mp_name="flight", mp_cover="c", mp_intro="i", status=1,
+                               created_at=now, updated_at=now, faker_id="f", update_time=0, sync_time=0))
+            for i in range(3):
+                session.merge(Article(id=f"flight-{i}", mp_id="MP_WXS_flight", title=f"title {i}", url=f"http://x/{i}",
+                                      description="d", status=1, publish_time=1700000000 + i,
+                                      created_at=now, updated_at=now))
+        DB.write(seed)
+        app = FastAPI()
+        app.include_router(feed_router)
+        cls.client = TestClient(app)
+
+    def test_leader_without_cache(self):
+        """The leader streamed the feed but no cache was written: the waiter builds instead of returning 404."""
+        source = FeedSource(feed_id="MP_WXS_flight", ext="xml", limit=50)
+        if os.path.exists(source.rss.rss_file):
+            os.remove(source.rss.rss_file)
+        key = source.rss.rss_file
+        call, leader = feed_flight.acquire(key)
+        self.assertTrue(leader)
+        # 流式输出完成时结果为None
+        timer = threading.Timer(0.3, feed_flight.finish, (key, call, None))
+        timer.start()
+        try:
+            response = self.client.get("/feed/MP_WXS_flight.xml")
+        finally:
+            timer.join()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("title 2", response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
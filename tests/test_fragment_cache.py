@@ -0,0 +1,103 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+from conftest import DATA_DIR
+from core.db import DB
+from core.models.feed import Feed
+from core.models.article import Article
+from core.article_cache import ArticleCache
+from core.rss import RSS
+from core.rss_feed import FeedSource, fragment_version
+
+
+class TestArticleCache(unittest.TestCase):
+    """Per-article fragment storage keyed by slot and version."""
+
+    def setUp(self):
+        self.dir = os.path.join(DATA_DIR, f"fragments-{self._testMethodName}")
+        self.cache = ArticleCache(self.dir)
+
+    def test_version(self):
+        self.cache.put("a1", "rss_html", "v1", "<item>1</item>")
+        self.assertEqual(self.cache.get("a1", "rss_html", "v1"), "<item>1</item>")
+        self.assertIsNone(self.cache.get("a1", "rss_html", "v2"))
+        self.assertIsNone(self.cache.get("a1", "atom_html", "v1"))
+        self.assertIsNone(self.cache.get("a2", "rss_html", "v1"))
+
+    def test_slots_and_persistence(self):
+        """Slots of one article are kept side by side and survive a new process (instance)."""
+        self.cache.put("a1", "rss_html", "v1", "rss")
+        self.cache.put("a1", "atom_html", "v1", "atom")
+        cache = ArticleCache(self.dir)
+        self.assertEqual(cache.get("a1", "rss_html", "v1"), "rss")
+        self.assertEqual(cache.get("a1", "atom_html", "v1"), "atom")
+
+    def test_path_traversal(self):
+        """Ids escaping the cache directory are never read or written."""
+        self.cache.put("../escaped", "rss_html", "v1", "x")
+        self.assertFalse(os.path.exists(os.path.join(DATA_DIR, "escaped.json")))
+        self.assertIsNone(ArticleCache(self.dir).get("../escaped", "rss_html", "v1"))
+
+    def test_fragment_version(self):
+        feed = Feed(id="mp", mp_name="name", mp_cover="c", mp_intro="i")
+        version = fragment_version("config", feed, 1)
+        self.assertEqual(version, fragment_version("config", feed, 1))
+        self.assertNotEqual(version, fragment_version("other", feed, 1))
+        self.assertNotEqual(version, fragment_version("config", feed, 2))
+        self.assertNotEqual(version, fragment_version("config", Feed(id="mp", mp_name="renamed", mp_cover="c", mp_intro="i"), 1))
+
+
+class TestIncrementalAssembly(unittest.TestCase):
+    """Rebuilding a feed renders only the items whose article changed."""
+
+    @classmethod
+    def setUpClass(cls):
+        DB.create_tables()
+        now = datetime.now()
+
+        def seed(session):
+            session.merge(Feed(id="MP_WXS_frag", mp_name="frag", mp_cover="c", mp_intro="i", status=1,
+                               created_at=now, updated_at=now, faker_id="f", update_time=0, sync_time=0))
+            for i in range(5):
+                article = Article(id=f"frag-{i}", mp_id="MP_WXS_frag", title=f"title {i}", url=f"http://x/{i}",
+                                  description="d", status=1, publish_time=1700000000 + i,
+                                  created_at=now, updated_at=now)
+                article.content = f"<p>body {i}</p>"
+                session.merge(article)
+        DB.write(seed)
+
+    def setUp(self):
+        self.rendered = []
+        self.render_item = RSS.render_item
+        test = self
+
+        def render_item(rss, item):
+            test.rendered.append(item["id"])
+            return test.render_item(rss, item)
+        RSS.render_item = render_item
+
+    def tearDown(self):
+        RSS.render_item = self.render_item
+
+    def build(self):
+        content, _ = FeedSource(feed_id="MP_WXS_frag", ext="xml", limit=10, domain="http://test/").build()
+        return content.decode("utf-8") if isinstance(content, bytes) else content
+
+    def test_reuse(self):
+        first = self.build()
+        self.assertEqual(sorted(self.rendered), [f"frag-{i}" for i in range(5)])
+        self.rendered.clear()
+        self.assertEqual(first.count("<item>"), 5)
+        self.assertEqual(self.build(), first)
+        self.assertEqual(self.rendered, [])
+
+        def touch(session):
+            session.query(Article).filter(Article.id == "frag-2").update(
+                {"title": "changed", "updated_at": datetime.now() + timedelta(seconds=1)})
+        DB.write(touch)
+        self.assertIn("changed", self.build())
+        self.assertEqual(self.rendered, ["frag-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
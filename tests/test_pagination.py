@@ -0,0 +1,72 @@
+import unittest
+from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy.orm import declarative_base, sessionmaker
+from core.pagination import encode_cursor, decode_cursor, keyset_filter, keyset_page
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "rows"
+    id = Column(String(32), primary_key=True)
+    publish_time = Column(Integer, nullable=True)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Keyset pagination over rows with equal and NULL sort keys."""
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        rows = []
+        for i in range(23):
+            # 多条记录的排序字段相同，部分为空
+            publish_time = None if i % 5 == 0 else 1000 + i // 4
+            rows.append(Row(id=f"a{i:02d}", publish_time=publish_time))
+        self.session.add_all(rows)
+        self.session.commit()
+        self.expected = [row.id for row in sorted((row for row in rows if row.publish_time is not None),
+                                                  key=lambda row: (row.publish_time, row.id), reverse=True)]
+
+    def tearDown(self):
+        self.session.close()
+
+    def pages(self, limit):
+        columns = [Row.publish_time, Row.id]
+        ids, cursor, count = [], None, 0
+        while True:
+            rows, cursor = keyset_page(self.session.query(Row), columns, cursor=cursor, limit=limit)
+            ids.extend(row.id for row in rows)
+            count += 1
+            if cursor is None:
+                return ids, count
+
+    def test_no_duplicates_or_gaps(self):
+        """Every non-null row is returned exactly once, in (publish_time, id) DESC order."""
+        for limit in (1, 2, 3, 4, 7, 50):
+            ids, _ = self.pages(limit)
+            self.assertEqual(ids, self.expected, f"limit={limit}")
+
+    def test_null_keys_excluded(self):
+        """Rows whose sort key is NULL never appear, on the first page or later ones."""
+        ids, count = self.pages(3)
+        self.assertFalse(any(int(i[1:]) % 5 == 0 for i in ids))
+        self.assertEqual(count, -(-len(self.expected) // 3))
+
+    def test_filter_is_range_only(self):
+        """The cursor predicate has no IS NULL branch, so it can use an index range scan."""
+        sql = str(keyset_filter([Row.publish_time, Row.id], [1003, "a12"]).compile())
+        self.assertNotIn("IS NULL", sql.upper())
+
+    def test_cursor_round_trip(self):
+        """Cursors decode to the values they were built from; null or malformed cursors are rejected."""
+        self.assertEqual(decode_cursor(encode_cursor(1003, "a12")), [1003, "a12"])
+        with self.assertRaises(ValueError):
+            keyset_filter([Row.publish_time, Row.id], [None, "a12"])
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor")
+
+
+if __name__ == "__main__":
+    unittest.main()
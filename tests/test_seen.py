@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime
+from core.db import DB
+from core.models.article import Article
+from core.wx.seen import SeenIndex, CLAIMED, STORED
+from core.wx.base import WxGather
+
+
+class TestSeenIndex(unittest.TestCase):
+    """Claiming, storing and releasing articles in the seen index."""
+
+    @classmethod
+    def setUpClass(cls):
+        DB.create_tables()
+        DB.write(lambda session: session.merge(Article(id="mp1-stored", mp_id="mp1", title="t", status=1,
+                                                       created_at=datetime.now(), updated_at=datetime.now())))
+
+    def setUp(self):
+        self.seen = SeenIndex(max_items=1000)
+
+    def test_claim_once(self):
+        """A new article is claimed once; later claims are refused while it is claimed."""
+        self.assertTrue(self.seen.claim("mp1", "a1"))
+        self.assertFalse(self.seen.claim("mp1", "a1"))
+        self.assertEqual(self.seen._items["mp1-a1"], CLAIMED)
+
+    def test_stored_in_database(self):
+        """Articles already in the database are refused and cached as stored."""
+        self.assertFalse(self.seen.claim("mp1", "stored"))
+        self.assertEqual(self.seen._items["mp1-stored"], STORED)
+        self.assertEqual(self.seen.known("mp1", ["stored", "a2"]), {"stored"})
+
+    def test_release(self):
+        """A released claim can be claimed again and is not reported as known."""
+        self.assertTrue(self.seen.claim("mp1", "a3"))
+        self.assertEqual(self.seen.known("mp1", ["a3"]), set())
+        self.seen.release("mp1", "a3")
+        self.assertTrue(self.seen.claim("mp1", "a3"))
+
+    def test_release_keeps_stored(self):
+        self.assertTrue(self.seen.claim("mp1", "a4"))
+        self.seen.stored("mp1", "a4")
+        self.seen.release("mp1", "a4")
+        self.assertFalse(self.seen.claim("mp1", "a4"))
+        self.assertEqual(self.seen.known("mp1", ["a4"]), {"a4"})
+
+    def test_bounded(self):
+        seen = SeenIndex(max_items=1000)
+        for i in range(1500):
+            seen.stored("mp2", i)
+        self.assertEqual(seen.get_stats()["items"], 1000)
+
+
+class TestGatherRelease(unittest.TestCase):
+    """A gather run releases the claims of articles it failed to store."""
+
+    def gather(self):
+        gather = WxGather.__new__(WxGather)
+        gather._mp_id = "mp3"
+        gather._claims = set()
+        gather._pending = []
+        gather._deferred = set()
+        gather.articles = None
+        return gather
+
+    def item(self, aid):
+        return {"id": aid, "mp_id": "mp3", "title": "t", "link": "http://x", "cover": "", "update_time": 1}
+
+    def test_rejected_insert(self):
+        import core.wx.base as base
+        seen = base.seen_index
+        gather = self.gather()
+        self.assertFalse(gather.HasGathered("r1"))
+        gather.FillBack(CallBack=lambda art: False, data=self.item("r1"))
+        # 其他采集可以重新认领
+        self.assertTrue(seen.claim("mp3", "r1"))
+        seen.release("mp3", "r1")
+
+    def test_other_claim_untouched(self):
+        """Releasing only affects claims made by the same gather."""
+        import core.wx.base as base
+        seen = base.seen_index
+        self.assertTrue(seen.claim("mp3", "r2"))
+        gather = self.gather()
+        self.assertTrue(gather.HasGathered("r2"))
+        gather.FillBack(CallBack=lambda art: False, data=self.item("r2"))
+        self.assertFalse(seen.claim("mp3", "r2"))
+        seen.release("mp3", "r2")
+
+    def test_batch_failure(self):
+        import core.wx.base as base
+        seen = base.seen_index
+        gather = self.gather()
+
+        def batch(arts):
+            raise RuntimeError("write failed")
+        callback = lambda art: True
+        callback.batch = batch
+        self.assertFalse(gather.HasGathered("r3"))
+        gather.FillBack(CallBack=callback, data=self.item("r3"))
+        with self.assertRaises(RuntimeError):
+            gather.FlushBack()
+        self.assertTrue(seen.claim("mp3", "r3"))
+        seen.release("mp3", "r3")
+
+
+if __name__ == "__main__":
+    unittest.main()
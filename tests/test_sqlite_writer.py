@@ -0,0 +1,102 @@
+import os
+import threading
+import unittest
+from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy.orm import declarative_base, sessionmaker
+from conftest import DATA_DIR
+from core.db import SQLiteWriter, setup_sqlite
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(32))
+
+
+class TestSQLiteWriter(unittest.TestCase):
+    """Queued writes are committed together and a failing write does not sink the batch."""
+
+    def setUp(self):
+        path = os.path.join(DATA_DIR, f"writer-{self._testMethodName}.sqlite")
+        engine = create_engine(f"sqlite:///{path}")
+        setup_sqlite(engine, writer=True)
+        Base.metadata.create_all(engine)
+        self.engine = engine
+        self.writer = SQLiteWriter(sessionmaker(bind=engine), batch_size=50)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def block(self):
+        """提交一个阻塞的写操作，之后提交的写操作在队列中等待，放行后合并为一批"""
+        started, release = threading.Event(), threading.Event()
+
+        def wait(session):
+            started.set()
+            release.wait(5)
+        future = self.writer.submit(wait)
+        started.wait(5)
+        return future, release
+
+    def names(self):
+        with self.engine.connect() as conn:
+            return sorted(row[0] for row in conn.exec_driver_sql("SELECT name FROM items"))
+
+    def add(self, name):
+        def write(session):
+            session.add(Item(name=name))
+            session.flush()
+            return name
+        return write
+
+    def test_batch(self):
+        first, release = self.block()
+        futures = [self.writer.submit(self.add(f"n{i}")) for i in range(10)]
+        release.set()
+        self.assertEqual([future.result(5) for future in futures], [f"n{i}" for i in range(10)])
+        first.result(5)
+        self.assertEqual(self.names(), sorted(f"n{i}" for i in range(10)))
+        # 阻塞的写操作单独一批，其余10个合并为一批
+        self.assertEqual(self.writer.stats["batches"], 2)
+        self.assertEqual(self.writer.stats["jobs"], 11)
+        self.assertFalse(self.writer.in_writer())
+
+    def test_retry(self):
+        """When one write fails, the batch is rolled back and replayed one by one."""
+        def fail(session):
+            session.add(Item(name="bad"))
+            session.flush()
+            raise ValueError("bad write")
+        first, release = self.block()
+        futures = [self.writer.submit(self.add("a")), self.writer.submit(fail), self.writer.submit(self.add("b"))]
+        release.set()
+        self.assertEqual(futures[0].result(5), "a")
+        self.assertEqual(futures[2].result(5), "b")
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+        self.assertEqual(self.names(), ["a", "b"])
+        self.assertEqual(self.writer.stats["retries"], 1)
+        self.assertEqual(self.writer.stats["errors"], 1)
+
+    def test_db_write(self):
+        """Db.write goes through the writer thread; detach keeps the returned object readable."""
+        from core.db import Db, detach, get_sqlite_writer
+        url = str(self.engine.url)
+        db = Db(tag="test")
+        db.init(url)
+
+        def write(session):
+            item = Item(name="detached")
+            session.add(item)
+            return detach(session, item)
+        item = db.write(write)
+        self.assertEqual((item.id is not None, item.name), (True, "detached"))
+        self.assertGreaterEqual(get_sqlite_writer(url).stats["jobs"], 1)
+        # 写入线程中再调用 Db.write 时直接执行，不会等待自己
+        self.assertEqual(db.write(lambda session: db.write(lambda inner: "inner")), "inner")
+
+
+if __name__ == "__main__":
+    unittest.main()
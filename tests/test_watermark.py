@@ -0,0 +1,31 @@
+import unittest
+from core.wx.watermark import article_id, page_known
+
+
+def items(*times):
+    return [{"aid": f"a{i}", "update_time": t} for i, t in enumerate(times)]
+
+
+class TestPageKnown(unittest.TestCase):
+    """Incremental gathering stops paging at the first already gathered item."""
+
+    def test_all_new(self):
+        self.assertFalse(page_known(items(300, 200), set(), (100, "mp-x")))
+        self.assertFalse(page_known(items(300, 200), set(), None))
+        self.assertFalse(page_known([], set(), (100, "mp-x")))
+
+    def test_any_known(self):
+        """One stored item is enough, even if newer items precede it."""
+        self.assertTrue(page_known(items(300, 200, 150), {"a1"}, None))
+
+    def test_at_or_below_watermark(self):
+        self.assertTrue(page_known(items(300, 100), set(), (100, "mp-x")))
+        self.assertTrue(page_known(items(300, 50), set(), (100, "mp-x")))
+
+    def test_article_id(self):
+        self.assertEqual(article_id("MP_WXS_1", 7), "1-7")
+        self.assertEqual(article_id(None, 7), "7")
+
+
+if __name__ == "__main__":
+    unittest.main()
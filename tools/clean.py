@@ -1,14 +1,13 @@
 from core.models.article import Article
 from sqlalchemy import func
 import core.db as db
+import core.article_stats as article_stats
 DB=db.Db(tag="文章清理")
 def clean_duplicate_articles():
     """
     清理重复的文章
     """
-    try:
-        session = DB.get_session()
-        
+    def clean(session):
         # 查询所有文章的标题，并统计重复的标题
         duplicate_titles = session.query(
             Article.title,
@@ -17,7 +16,7 @@ def clean_duplicate_articles():
         
         # 如果没有重复的标题，直接返回
         if not duplicate_titles:
-            return "没有找到重复的文章"
+            return 0
         
         # 获取所有重复的标题列表
         titles = [item[0] for item in duplicate_titles]
@@ -38,13 +37,16 @@ def clean_duplicate_articles():
                 seen_articles.add(article_key)
         
         # 删除重复文章
-        for duplicate in duplicates:
-            print(f"删除重复文章: {duplicate.title}")
-            session.delete(duplicate)
-        session.commit()
-    except:
-        session.rollback()
-    return (f"已清理 {len(duplicates)} 篇重复文章", len(duplicates))
+        with article_stats.track(session, [duplicate.id for duplicate in duplicates]):
+            for duplicate in duplicates:
+                print(f"删除重复文章: {duplicate.title}")
+                session.delete(duplicate)
+        return len(duplicates)
+    # 通过写入线程执行，避免与采集写入争用SQLite锁
+    count = DB.write(clean)
+    if not count:
+        return ("没有找到重复的文章", 0)
+    return (f"已清理 {count} 篇重复文章", count)
 
 if __name__ == "__main__":
     result = clean_duplicate_articles()
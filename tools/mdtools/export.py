@@ -1,6 +1,7 @@
 from .md2doc import MarkdownToWordConverter
 from core.models import Article
 from core.db import DB
+from core.pagination import keyset_page
 from datetime import datetime
 import json
 import csv
@@ -16,10 +17,10 @@ def process_single_article(art, add_title, remove_images, remove_links, export_m
     处理单篇文章的导出逻辑
     返回是否成功处理
     """
-    from core.content_format import format_content
+    from core.content_format import format_article_content
     from core.common.file_tools import sanitize_filename
     
-    markdown_content = format_content(art.content, "markdown")
+    markdown_content = format_article_content(art.id, art.content, "markdown")
     
     # 转换为文档对象（不保存文件）
     # 只有在需要导出docx时才进行转换
@@ -110,25 +111,21 @@ def process_articles(session, mp_id=None,doc_id=None, page_size=10, page_count=1
     """
     record_count = 0
     i = 0
-    is_break=False
+    cursor = None
     while True:
-        if is_break:
-            break
         if page_count != 0 and i >= page_count:
             break
             
-        query = session.query(Article).filter(Article.content != None).where(Article.status == 1)
+        query = session.query(Article).options(*Article.load_content()).filter(Article.has_content()).where(Article.status == 1)
         if mp_id:
             query = query.where(Article.mp_id.in_(mp_id.split(",")))
         if doc_id:
             query = query.where(Article.id.in_(doc_id))
-            is_break=True   
-
-        query = query.order_by(Article.publish_time.desc(), Article.id.desc())
-        if is_break==False:
-            query=query.offset(i * page_size).limit(page_size)
+            arts = query.order_by(Article.publish_time.desc(), Article.id.desc()).all()
+        else:
+            # 按游标翻页，从上一页最后一篇之后继续查询，页数较多时不会越翻越慢
+            arts, cursor = keyset_page(query, [Article.publish_time, Article.id], cursor=cursor, limit=page_size)
         i = i + 1
-        arts = query.all()
         
         if arts is None or len(arts) == 0:
             break
@@ -138,6 +135,8 @@ def process_articles(session, mp_id=None,doc_id=None, page_size=10, page_count=1
                                     export_md, export_docx, export_json, export_csv, 
                                     export_pdf, docx_path, writer):
                 record_count += 1
+        if doc_id or cursor is None:
+            break
     
     return record_count
 